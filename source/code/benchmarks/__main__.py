@@ -0,0 +1,69 @@
+import argparse
+from benchmarks import fixtures, harness
+from benchmarks.suite import build_suite
+from utils import metrics
+
+def main(scales=("small",),
+         only: list[str] = None,
+         repeat: int = 5,
+         threshold: float = 0.10,
+         history_path=harness.HISTORY_PATH,
+         save: bool = True,
+         postgres_db: str = None) -> list[dict]:
+    """
+    Runs the suite (or the benchmarks whose name contains one of `only`) at the given scales, compares every result
+    with its baseline from the history and appends the run to the history. Returns the regressions found.
+    """
+    suite = [benchmark for benchmark in build_suite(postgres_db=postgres_db)
+             if not only or any(pattern in benchmark.name for pattern in only)]
+    environment = harness.environment()
+    environment["departures_fixture"] = fixtures.departures_fixture().name
+    results = []
+    for benchmark in suite:
+        for scale in scales:
+            print(f"🔄 {benchmark.name} [{scale}]")
+            results.append(harness.run_benchmark(benchmark, scale, repeat=repeat))
+    # Peak RSS is a process-lifetime high-water mark, so it belongs to the run, not to a single benchmark
+    environment["peak_rss_bytes"] = metrics.peak_rss_bytes()["self"]
+    history = harness.load_history(history_path)
+    regressions = harness.find_regressions(results, history, environment["host"], threshold=threshold)
+    print()
+    print(harness.format_results(results))
+    if save:
+        harness.append_history({"environment": environment, "results": results}, history_path)
+        print(f"\n📝 Results appended to {history_path}")
+    for result in regressions:
+        print(f"❌ Regression: {result['benchmark']} [{result['scale']}] {result['change']:+.1%} "
+              f"(median {result['median']:.4f}s vs baseline {result['baseline']:.4f}s)")
+    if not regressions:
+        print(f"✅ No regressions above {threshold:.0%}")
+    return regressions
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the CPH simulation and load benchmarks.")
+    parser.add_argument("--scale", action="append", choices=harness.SCALES,
+                        help="data scale to run (repeatable, default: small)")
+    parser.add_argument("--only", action="append", metavar="PATTERN",
+                        help="run only benchmarks whose name contains PATTERN (repeatable)")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per benchmark and scale")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="fail when a median is this much slower than its baseline (0.10 = 10%%)")
+    parser.add_argument("--history", default=str(harness.HISTORY_PATH), help="JSON-lines history file")
+    parser.add_argument("--no-save", action="store_true", help="do not append this run to the history")
+    parser.add_argument("--postgres", metavar="DB_NAME",
+                        help="also benchmark update_insert_dw against this PostgreSQL database")
+    parser.add_argument("--record-fixture", action="store_true",
+                        help="record an AeroDataBox fixture from the local response cache and exit")
+    args = parser.parse_args()
+    if args.record_fixture:
+        print(f"📝 Recorded {fixtures.record_departures_fixture()} departures to {fixtures.RECORDED_DEPARTURES_FIXTURE}")
+        raise SystemExit(0)
+    regressions = main(scales=args.scale or ["small"],
+                       only=args.only,
+                       repeat=args.repeat,
+                       threshold=args.threshold,
+                       history_path=args.history,
+                       save=not args.no_save,
+                       postgres_db=args.postgres)
+    if regressions:
+        raise SystemExit(1)
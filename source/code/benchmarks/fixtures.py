@@ -0,0 +1,87 @@
+import copy
+import json
+import numpy as np
+
+from datetime import datetime, timedelta
+from functools import lru_cache
+from pathlib import Path
+from utils.api_urls import HISTORICAL_FLIGHTS_BASE_URL
+from utils.http_client import RESPONSE_CACHE_DIR
+
+FIXTURES_DIR = Path(__file__).resolve().parent / "fixtures"
+# Hand-written payload in the AeroDataBox format; registrations and destination time zones are not real
+SYNTHETIC_DEPARTURES_FIXTURE = FIXTURES_DIR / "aerodatabox_cph_departures_synthetic.json"
+# Real responses from the local response cache, written by --record-fixture
+RECORDED_DEPARTURES_FIXTURE = FIXTURES_DIR / "aerodatabox_cph_departures_recorded.json"
+
+"""
+The departures fixture the benchmarks use: the recorded payload when one has been written, else the synthetic one.
+"""
+
+def departures_fixture() -> Path:
+    return RECORDED_DEPARTURES_FIXTURE if RECORDED_DEPARTURES_FIXTURE.exists() else SYNTHETIC_DEPARTURES_FIXTURE
+
+"""
+Loads an AeroDataBox departures payload (by default departures_fixture()) and scales it to `n` departures by repeating
+its flights with distinct flight numbers, so every departure keeps a unique transaction_id after cleaning.
+"""
+
+def departures_payload(n: int,
+                       path: Path = None) -> dict:
+    flights = json.loads(Path(path or departures_fixture()).read_text(encoding="utf-8"))["departures"]
+    departures = []
+    for i in range(n):
+        flight = copy.deepcopy(flights[i % len(flights)])
+        flight["number"] = f"{flight.get('number', '')}-{i // len(flights)}"
+        departures.append(flight)
+    return {"departures": departures}
+
+"""
+Writes the recorded departures fixture from the AeroDataBox payloads found in the local response cache
+(resource/cache), i.e. real responses recorded by earlier flights_api runs. Returns the number of departures written.
+"""
+
+def record_departures_fixture(cache_dir: Path = RESPONSE_CACHE_DIR,
+                              path: Path = RECORDED_DEPARTURES_FIXTURE,
+                              limit: int = 500) -> int:
+    import gzip
+    departures = []
+    for meta_path in sorted(Path(cache_dir).glob("*/*.meta.json")):
+        meta = json.loads(meta_path.read_text(encoding="utf-8"))
+        if not meta.get("url", "").startswith(HISTORICAL_FLIGHTS_BASE_URL):
+            continue
+        payload_path = meta_path.with_name(meta_path.name.replace(".meta.json", ".json.gz"))
+        with gzip.open(payload_path, "rb") as f:
+            departures.extend(json.loads(f.read()).get("departures", []))
+        if len(departures) >= limit:
+            break
+    if not departures:
+        raise FileNotFoundError(f"No cached AeroDataBox payloads found in {cache_dir}")
+    Path(path).write_text(json.dumps({"departures": departures[:limit]}, indent=1), encoding="utf-8")
+    return len(departures[:limit])
+
+"""
+Seeded synthetic flights in the shape flights_tickets reads from the database
+(transaction_id, status, scheduled_local, seats), one departure every 5 minutes.
+"""
+
+def synthetic_flights(n: int,
+                      seed: int = 1) -> list[dict]:
+    rng = np.random.default_rng(seed)
+    start = datetime(2025, 7, 1, 6, 0)
+    seats = rng.choice([76, 150, 180, 189, 220], size=n).tolist()
+    return [{"transaction_id": f"BENCH{i:07d}",
+             "status": "Departed",
+             "scheduled_local": start + timedelta(minutes=5 * i),
+             "seats": seats[i]}
+            for i in range(n)]
+
+"""
+Passport numbers for the ticket simulation benchmarks, generated once per size and seed.
+"""
+
+@lru_cache(maxsize=4)
+def passport_numbers(n: int,
+                     seed: int = 1) -> tuple:
+    from scripts.simulations import passport
+    return tuple(passport.generate_passport_columns(n, seed=seed)["passport_number"].tolist())
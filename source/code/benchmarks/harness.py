@@ -0,0 +1,152 @@
+import gc
+import json
+import platform
+import statistics
+import subprocess
+import time
+
+from datetime import datetime
+from pathlib import Path
+
+HISTORY_PATH = Path(__file__).resolve().parent / "results" / "history.jsonl"
+SCALES = ("small", "medium", "large")
+
+class Benchmark:
+    """
+    One benchmark: `setup(size)` builds the input outside the timed region, `run(state)` is timed and returns
+    the number of rows it processed, and the optional `teardown(state)` cleans up after every repeat.
+    `sizes` maps each scale (small/medium/large) to the size passed to setup.
+    """
+    def __init__(self, name: str, setup, run, sizes: dict, teardown=None):
+        self.name = name
+        self.setup = setup
+        self.run = run
+        self.sizes = sizes
+        self.teardown = teardown
+
+"""
+Runs a benchmark at one scale: `warmup` untimed runs (imports, name pools, reflected tables), then `repeat`
+timed runs, each on a freshly set up input. Returns min/median/mean/stdev seconds and rows/s at the median.
+"""
+
+def run_benchmark(benchmark: Benchmark,
+                  scale: str,
+                  repeat: int = 5,
+                  warmup: int = 1) -> dict:
+    size = benchmark.sizes[scale]
+    timings = []
+    rows = None
+    for index in range(warmup + repeat):
+        state = benchmark.setup(size)
+        gc.collect()
+        started = time.perf_counter()
+        rows = benchmark.run(state)
+        elapsed = time.perf_counter() - started
+        if benchmark.teardown is not None:
+            benchmark.teardown(state)
+        if index >= warmup:
+            timings.append(elapsed)
+    median = statistics.median(timings)
+    return {
+        "benchmark": benchmark.name,
+        "scale": scale,
+        "size": size,
+        "repeat": repeat,
+        "min": min(timings),
+        "median": median,
+        "mean": statistics.fmean(timings),
+        "stdev": statistics.stdev(timings) if len(timings) > 1 else 0.0,
+        "rows": rows,
+        "rows_per_second": rows / median if rows and median else None,
+    }
+
+"""
+Describes where a run happened, so history entries are only compared with runs from the same host.
+"""
+
+def environment() -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=Path(__file__).resolve().parent, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "commit": commit,
+        "host": platform.node(),
+        "machine": platform.machine(),
+        "python": platform.python_version(),
+    }
+
+"""
+Reads the benchmark history: one JSON object per line, each holding the environment and the results of one run.
+"""
+
+def load_history(path: Path = HISTORY_PATH) -> list[dict]:
+    path = Path(path)
+    if not path.exists():
+        return []
+    return [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines() if line.strip()]
+
+"""
+Appends one run to the history file.
+"""
+
+def append_history(run: dict,
+                   path: Path = HISTORY_PATH):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("a", encoding="utf-8") as f:
+        f.write(json.dumps(run, default=str) + "\n")
+
+"""
+Baseline for a benchmark at a scale: the median of the medians of the last `window` runs on the same host,
+so one noisy run neither triggers nor hides a regression. Returns None without history.
+"""
+
+def baseline(history: list[dict],
+             benchmark: str,
+             scale: str,
+             host: str,
+             window: int = 5) -> float | None:
+    medians = [result["median"]
+               for run in history if run["environment"].get("host") == host
+               for result in run["results"] if result["benchmark"] == benchmark and result["scale"] == scale]
+    if not medians:
+        return None
+    return statistics.median(medians[-window:])
+
+"""
+Compares results with their baselines and returns the ones slower than baseline * (1 + threshold),
+each with its baseline and the relative change.
+"""
+
+def find_regressions(results: list[dict],
+                     history: list[dict],
+                     host: str,
+                     threshold: float = 0.10) -> list[dict]:
+    regressions = []
+    for result in results:
+        reference = baseline(history, result["benchmark"], result["scale"], host)
+        if reference is None:
+            continue
+        change = result["median"] / reference - 1
+        result["baseline"] = reference
+        result["change"] = change
+        # Compared as a product: the ratio change can round past the threshold for a median exactly on it
+        if result["median"] > reference * (1 + threshold):
+            regressions.append(result)
+    return regressions
+
+"""
+Renders results as a table, with the change against the baseline when there is one.
+"""
+
+def format_results(results: list[dict]) -> str:
+    lines = [f"{'Benchmark':<40}{'Scale':<8}{'Size':>9}{'Median s':>11}{'Rows/s':>13}{'vs base':>9}"]
+    for result in results:
+        change = result.get("change")
+        rate = result["rows_per_second"]
+        lines.append(f"{result['benchmark']:<40}{result['scale']:<8}{result['size']:>9}{result['median']:>11.4f}"
+                     f"{'' if rate is None else f'{rate:,.0f}':>13}{'' if change is None else f'{change:+.1%}':>9}")
+    return "\n".join(lines)
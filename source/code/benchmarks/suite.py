@@ -0,0 +1,144 @@
+import sqlite3
+import tempfile
+
+from pathlib import Path
+from benchmarks import fixtures
+from benchmarks.harness import Benchmark
+
+# Columns of the cleaned AeroDataBox rows (clean_departures_extended), all loaded as text
+FLIGHT_COLUMNS = [
+    "transaction_id", "flight_number", "scheduled_utc", "airline", "airline_iata", "airline_icao",
+    "destination", "destination_iata", "destination_icao", "scheduled_local", "revised_utc", "revised_local",
+    "runway_utc", "runway_local", "status", "terminal", "gate", "aircraft_model", "aircraft_reg",
+]
+# SQLite allows 32766 bind parameters per statement; 1000 rows x 19 columns stays below it
+SQLITE_BATCH_SIZE = 1000
+BENCH_SCHEMA = "benchmarks"
+
+def _cleaned_departures(n: int) -> list[dict]:
+    from scripts.api import flights_api
+    return flights_api.clean_departures_extended(fixtures.departures_payload(n))
+
+def _generate_passports(n: int) -> int:
+    from scripts.simulations import passport
+    return len(passport.generate_passports_list(n, seed=1))
+
+def _simulate_tickets(state: tuple) -> int:
+    from scripts.simulations import flights_tickets
+    flights, passports = state
+    return len(flights_tickets.simulate_tickets(flights, list(passports), force_fill=True, seed=1))
+
+def _select_columns(rows: list[dict]) -> int:
+    from utils.orchestrator import select_columns
+    renames = {column: column for column in FLIGHT_COLUMNS}
+    return len(select_columns(rows, renames, extra_fields={"source": "aerodatabox"}))
+
+def _clean_departures(payload: dict) -> int:
+    from scripts.api import flights_api
+    return len(flights_api.clean_departures_extended(payload))
+
+def _sqlite_setup(n: int) -> dict:
+    directory = tempfile.mkdtemp(prefix="cph_bench_")
+    db_path = str(Path(directory) / "bench.db")
+    with sqlite3.connect(db_path) as connection:
+        columns = ", ".join(f"{column} TEXT" + (" PRIMARY KEY" if column == "transaction_id" else "")
+                            for column in FLIGHT_COLUMNS)
+        connection.execute(f"CREATE TABLE flights ({columns})")
+    return {"db_name": db_path, "rows": _cleaned_departures(n)}
+
+def _sqlite_upsert(state: dict) -> int:
+    from utils.orchestrator import update_insert_dw
+    rows = state["rows"]
+    total = 0
+    for start in range(0, len(rows), SQLITE_BATCH_SIZE):
+        total += update_insert_dw(db_name=state["db_name"],
+                                  schema="main",
+                                  table="flights",
+                                  new_data=rows[start:start + SQLITE_BATCH_SIZE],
+                                  pk=["transaction_id"],
+                                  update_fields=FLIGHT_COLUMNS[1:],
+                                  username=None,
+                                  password=None,
+                                  server=None,
+                                  port=None,
+                                  db_type="sqlite")
+    return total
+
+def _sqlite_teardown(state: dict):
+    import shutil
+    from classes.db_engine import DatabaseEngine
+    DatabaseEngine(db=state["db_name"], server=None, username=None, password=None, db_type="sqlite").dispose()
+    shutil.rmtree(Path(state["db_name"]).parent, ignore_errors=True)
+
+"""
+update_insert_dw_batches into a scratch table benchmarks.flights_<method> on a local PostgreSQL
+(credentials from utils.env), truncated after every run so each run measures inserts.
+"""
+
+def _postgres_benchmark(db_name: str, method: str) -> Benchmark:
+    from utils.db_types import TEXT
+
+    def setup(n: int) -> dict:
+        from utils.orchestrator import ensure_table_structure
+        fields_dict = {column: {"type": TEXT()} for column in FLIGHT_COLUMNS}
+        fields_dict["transaction_id"] = {"type": TEXT(), "primary_key": True, "autoincrement": False}
+        ensure_table_structure(db_name=db_name,
+                               schema_name=BENCH_SCHEMA,
+                               table_name=f"flights_{method}",
+                               fields_dict=fields_dict,
+                               create_table_if_not_exist=True)
+        return {"rows": _cleaned_departures(n)}
+
+    def run(state: dict) -> int:
+        from utils.orchestrator import update_insert_dw_batches
+        rows = state["rows"]
+        return update_insert_dw_batches(db_name=db_name,
+                                        schema=BENCH_SCHEMA,
+                                        table=f"flights_{method}",
+                                        batches=(rows[start:start + 5000] for start in range(0, len(rows), 5000)),
+                                        pk=["transaction_id"],
+                                        update_fields=FLIGHT_COLUMNS[1:],
+                                        method=method)
+
+    def teardown(state: dict):
+        from sqlalchemy import text
+        from classes.db_engine import DatabaseEngine
+        engine = DatabaseEngine(db=db_name, server=None, username=None, password=None).get_engine()
+        with engine.begin() as connection:
+            connection.execute(text(f"TRUNCATE {BENCH_SCHEMA}.flights_{method}"))
+
+    return Benchmark(f"update_insert_dw.postgres_{method}", setup, run,
+                     {"small": 2_000, "medium": 20_000, "large": 200_000}, teardown)
+
+"""
+The benchmark suite. `postgres_db` adds update_insert_dw against that PostgreSQL database (values and copy);
+without it the load path is measured on a throwaway SQLite database.
+"""
+
+def build_suite(postgres_db: str = None) -> list[Benchmark]:
+    suite = [
+        Benchmark("passport.generate_passports_list",
+                  setup=lambda n: n,
+                  run=_generate_passports,
+                  sizes={"small": 5_000, "medium": 50_000, "large": 500_000}),
+        Benchmark("flights_tickets.simulate_tickets",
+                  setup=lambda n: (fixtures.synthetic_flights(n), fixtures.passport_numbers(max(50_000, n * 40))),
+                  run=_simulate_tickets,
+                  sizes={"small": 200, "medium": 2_000, "large": 10_000}),
+        Benchmark("orchestrator.select_columns",
+                  setup=_cleaned_departures,
+                  run=_select_columns,
+                  sizes={"small": 10_000, "medium": 100_000, "large": 500_000}),
+        Benchmark("flights_api.clean_departures_extended",
+                  setup=fixtures.departures_payload,
+                  run=_clean_departures,
+                  sizes={"small": 5_000, "medium": 50_000, "large": 250_000}),
+        Benchmark("update_insert_dw.sqlite_values",
+                  setup=_sqlite_setup,
+                  run=_sqlite_upsert,
+                  teardown=_sqlite_teardown,
+                  sizes={"small": 2_000, "medium": 20_000, "large": 100_000}),
+    ]
+    if postgres_db:
+        suite += [_postgres_benchmark(postgres_db, "values"), _postgres_benchmark(postgres_db, "copy")]
+    return suite
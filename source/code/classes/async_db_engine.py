@@ -0,0 +1,98 @@
+import asyncio
+import threading
+from sqlalchemy.ext.asyncio import create_async_engine
+from utils import env
+
+class AsyncDatabaseEngine:
+    """
+    Async counterpart of DatabaseEngine: one cached AsyncEngine (asyncpg / aiosqlite) per connection target,
+    pool configuration and event loop. asyncpg connections belong to the loop that opened them, so every
+    asyncio.run() gets its own engine; engines of loops that have since closed are dropped on the next lookup.
+    """
+    _instances = {}
+    _lock = threading.Lock()
+
+    def __new__(cls, db, server, username, password, db_type='postgresql', port=None,
+                pool_size=None, max_overflow=None, pool_timeout=None, pool_recycle=None,
+                pool_pre_ping=None, statement_timeout=None):
+        if db_type != 'sqlite':
+            # Connection settings left as None fall back to the POSTGRES_* environment variables
+            server = env.POSTGRES_HOST if server is None else server
+            port = env.POSTGRES_PORT if port is None else port
+            username = env.POSTGRES_USERNAME if username is None else username
+            password = env.POSTGRES_PASSWORD if password is None else password
+        pool_options = {
+            "pool_size": env.POSTGRES_POOL_SIZE if pool_size is None else pool_size,
+            "max_overflow": env.POSTGRES_MAX_OVERFLOW if max_overflow is None else max_overflow,
+            "pool_timeout": env.POSTGRES_POOL_TIMEOUT if pool_timeout is None else pool_timeout,
+            "pool_recycle": env.POSTGRES_POOL_RECYCLE if pool_recycle is None else pool_recycle,
+            "pool_pre_ping": env.POSTGRES_POOL_PRE_PING if pool_pre_ping is None else pool_pre_ping,
+            "statement_timeout": env.POSTGRES_STATEMENT_TIMEOUT_MS if statement_timeout is None else statement_timeout,
+        }
+        loop = asyncio.get_running_loop()
+        key = (db, server, username, db_type, port, tuple(sorted(pool_options.items())), id(loop))
+        with cls._lock:
+            for stale_key in [k for k, instance in cls._instances.items() if instance.loop.is_closed()]:
+                del cls._instances[stale_key]
+            if key not in cls._instances:
+                instance = super(AsyncDatabaseEngine, cls).__new__(cls)
+                instance.db = db
+                instance.server = server
+                instance.username = username
+                instance.password = password
+                instance.db_type = db_type
+                instance.port = port
+                instance.pool_options = pool_options
+                instance.loop = loop
+                instance.engine = instance._create_engine()
+                instance._key = key
+                cls._instances[key] = instance
+            return cls._instances[key]
+
+    def _create_engine(self):
+        options = self.pool_options
+        pool_kwargs = {
+            "pool_size": options["pool_size"],
+            "max_overflow": options["max_overflow"],
+            "pool_timeout": options["pool_timeout"],
+            "pool_recycle": options["pool_recycle"],
+            "pool_pre_ping": options["pool_pre_ping"],
+        }
+        if self.db_type == 'postgresql':
+            port_part = f":{self.port}" if self.port else ""
+            connection_string = f"postgresql+asyncpg://{self.username}:{self.password}@{self.server}{port_part}/{self.db}"
+            connect_args = {}
+            if options["statement_timeout"]:
+                connect_args["server_settings"] = {"statement_timeout": str(int(options["statement_timeout"]))}
+            return create_async_engine(connection_string, connect_args=connect_args, **pool_kwargs)
+        elif self.db_type == 'sqlite':
+            connection_string = f"sqlite+aiosqlite:///{self.db}"
+            return create_async_engine(connection_string)
+        else:
+            raise ValueError(f"Unsupported db_type for async access: {self.db_type}")
+
+    def get_engine(self):
+        return self.engine
+
+    async def dispose(self):
+        """Closes this engine's pooled connections and drops it and its reflected tables from the caches."""
+        with AsyncDatabaseEngine._lock:
+            AsyncDatabaseEngine._instances.pop(self._key, None)
+        await self._dispose_engine()
+
+    async def _dispose_engine(self):
+        # Imported here: utils.orchestrator imports classes.db_engine; tables are cached per sync engine
+        from utils.orchestrator import invalidate_table_cache
+        invalidate_table_cache(engine=self.engine.sync_engine)
+        await self.engine.dispose()
+
+    @classmethod
+    async def dispose_all(cls):
+        """Closes the pools of every engine that belongs to the running event loop."""
+        loop = asyncio.get_running_loop()
+        with cls._lock:
+            instances = [instance for instance in cls._instances.values() if instance.loop is loop]
+            for instance in instances:
+                cls._instances.pop(instance._key, None)
+        for instance in instances:
+            await instance._dispose_engine()
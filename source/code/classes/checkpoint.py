@@ -0,0 +1,110 @@
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+class CheckpointStore:
+    """
+    Local JSON checkpoint file for a pipeline run (e.g. resource/checkpoints/cph_case_pipeline.json).
+    Per stage it records the status, the last committed batch index, an optional output artifact,
+    parameters needed to regenerate the same data (seeds) and the row count. Every update is written
+    atomically, so the file always reflects the last committed batch even if the process dies.
+    """
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        try:
+            self._state = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            self._state = {"stages": {}}
+
+    def reset(self, names: list[str] = None):
+        """Forgets every stage (or only `names`), for a fresh (non-resumed) run."""
+        with self._lock:
+            if names is None:
+                self._state = {"stages": {}}
+            else:
+                for name in names:
+                    self._state["stages"].pop(name, None)
+            self._save()
+
+    def stage(self, name: str) -> "StageCheckpoint":
+        return StageCheckpoint(self, name)
+
+    def _get(self, name: str) -> dict:
+        with self._lock:
+            return dict(self._state["stages"].get(name, {}))
+
+    def _update(self, name: str, **values):
+        with self._lock:
+            stage = self._state["stages"].setdefault(name, {"status": "pending", "batch": -1, "params": {}})
+            stage.update(values)
+            stage["updated_at"] = time.time()
+            self._save()
+
+    def _save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        tmp_path.write_text(json.dumps(self._state, indent=2, default=str), encoding="utf-8")
+        os.replace(tmp_path, self.path)
+
+class StageCheckpoint:
+    """
+    View of one stage in a CheckpointStore, handed to the upsert scripts.
+    Batches are numbered from 0; `last_batch` is -1 until the first batch is committed.
+    """
+    def __init__(self, store: CheckpointStore, name: str):
+        self.store = store
+        self.name = name
+
+    @property
+    def done(self) -> bool:
+        return self.store._get(self.name).get("status") == "done"
+
+    @property
+    def last_batch(self) -> int:
+        return self.store._get(self.name).get("batch", -1)
+
+    @property
+    def rows(self):
+        return self.store._get(self.name).get("rows")
+
+    @property
+    def artifact(self):
+        return self.store._get(self.name).get("artifact")
+
+    def param(self, key: str, default=None):
+        """
+        Returns a stored parameter, storing `default` first if it is missing, so a resumed run
+        regenerates exactly the data of the interrupted one (e.g. the simulation seed).
+        """
+        params = self.store._get(self.name).get("params", {})
+        if key not in params:
+            params = {**params, key: default}
+            self.store._update(self.name, params=params)
+        return params[key]
+
+    def restart_on_change(self, **params) -> bool:
+        """
+        Stores `params` like param(), but forgets the stage first when any of them differs from the value of an
+        earlier run, because its committed batches were laid out differently (e.g. a different worker count).
+        Returns True when the stage was restarted.
+        """
+        stored = self.store._get(self.name).get("params", {})
+        changed = [key for key, value in params.items() if key in stored and stored[key] != value]
+        if changed:
+            self.store.reset([self.name])
+        for key, value in params.items():
+            self.param(key, value)
+        return bool(changed)
+
+    def start(self):
+        if not self.done:
+            self.store._update(self.name, status="running")
+
+    def commit_batch(self, index: int):
+        self.store._update(self.name, batch=index)
+
+    def finish(self, rows=None, artifact=None):
+        self.store._update(self.name, status="done", rows=rows, artifact=artifact)
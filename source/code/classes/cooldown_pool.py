@@ -0,0 +1,94 @@
+import heapq
+import numpy as np
+
+class CooldownPool:
+    """
+    Tracks which passports (by index 0..size-1) are free to fly at a given time.
+
+    Free passports live in a dense array with a position index, so sampling k of them
+    and removing them again costs O(k). Assigned passports wait in buckets keyed by the
+    time their cooldown ends and rejoin the pool when advance() reaches that time.
+    Times are integers (e.g. epoch seconds) and must be passed in non-decreasing order.
+    """
+    def __init__(self, size: int, cooldown: int, rng: np.random.Generator):
+        self.size = size
+        self.cooldown = cooldown
+        self.rng = rng
+        self._free = np.arange(size, dtype=np.int64)
+        self._position = np.arange(size, dtype=np.int64)  # -1 while cooling down
+        self._n_free = size
+        self._release_at = np.full(size, np.iinfo(np.int64).min, dtype=np.int64)
+        self._buckets: dict[int, list[np.ndarray]] = {}
+        self._release_times: list[int] = []
+
+    @property
+    def n_free(self) -> int:
+        return self._n_free
+
+    def advance(self, t: int):
+        """Returns every passport whose cooldown has ended by time t to the free pool."""
+        while self._release_times and self._release_times[0] <= t:
+            release_time = heapq.heappop(self._release_times)
+            ids = np.unique(np.concatenate(self._buckets.pop(release_time)))
+            # Skip stale entries: passports re-assigned after they were bucketed
+            ids = ids[(self._release_at[ids] == release_time) & (self._position[ids] < 0)]
+            self._free[self._n_free:self._n_free + len(ids)] = ids
+            self._position[ids] = np.arange(self._n_free, self._n_free + len(ids))
+            self._n_free += len(ids)
+
+    def draw(self, k: int) -> np.ndarray:
+        """Samples up to k distinct free passports uniformly, without removing them."""
+        k = min(k, self._n_free)
+        if k <= 0:
+            return np.empty(0, dtype=np.int64)
+        positions = self.rng.choice(self._n_free, size=k, replace=False)
+        return self._free[positions]
+
+    def draw_any(self, k: int, exclude: np.ndarray) -> np.ndarray:
+        """
+        Samples k passports ignoring the cooldown, distinct and not in `exclude` while possible.
+        Once every other passport is taken the remainder is drawn with replacement.
+        """
+        available = self.size - len(exclude)
+        target = min(k, max(available, 0))
+        if target < k and target <= 0:
+            return self.rng.integers(0, self.size, size=k)
+        if available < self.size // 2:
+            pool = np.setdiff1d(np.arange(self.size), exclude)
+            taken = self.rng.choice(pool, size=target, replace=False)
+        else:
+            taken = np.empty(0, dtype=np.int64)
+            while len(taken) < target:
+                draw = self.rng.integers(0, self.size, size=2 * (target - len(taken)) + 16)
+                draw = draw[~np.isin(draw, exclude)]
+                candidates = np.concatenate([taken, draw])
+                _, first = np.unique(candidates, return_index=True)
+                taken = candidates[np.sort(first)][:target]
+        if target < k:
+            taken = np.concatenate([taken, self.rng.integers(0, self.size, size=k - target)])
+        return taken
+
+    def assign(self, ids: np.ndarray, t: int):
+        """Marks passports as flying at time t: they leave the pool until t + cooldown."""
+        if not len(ids):
+            return
+        free_ids = np.unique(ids[self._position[ids] >= 0])
+        self._remove(free_ids)
+        release_time = t + self.cooldown
+        self._release_at[ids] = release_time
+        if release_time not in self._buckets:
+            self._buckets[release_time] = []
+            heapq.heappush(self._release_times, release_time)
+        self._buckets[release_time].append(np.asarray(ids, dtype=np.int64))
+
+    def _remove(self, ids: np.ndarray):
+        # Swap-remove: fill the holes left by `ids` with the surviving entries from the tail
+        positions = self._position[ids]
+        self._position[ids] = -1
+        new_n_free = self._n_free - len(ids)
+        holes = positions[positions < new_n_free]
+        tail = np.arange(new_n_free, self._n_free)
+        survivors = tail[self._position[self._free[tail]] >= 0]
+        self._free[holes] = self._free[survivors]
+        self._position[self._free[holes]] = holes
+        self._n_free = new_n_free
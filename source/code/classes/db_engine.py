@@ -1,33 +1,113 @@
+import threading
+from contextlib import contextmanager
 from sqlalchemy import create_engine
+from utils import env
 
 class DatabaseEngine:
+    """
+    One cached SQLAlchemy engine per connection target and pool configuration.
+    Pool settings default to the POSTGRES_POOL_* values in utils.env and can be overridden per call site;
+    every call with the same target and settings shares the same bounded pool.
+    """
     _instances = {}
-    def __new__(cls, db, server, username, password, db_type='postgresql', port=None):
-        key = (db, server, username, db_type, port)
-        if key not in cls._instances:
-            instance = super(DatabaseEngine, cls).__new__(cls)
-            instance.db = db
-            instance.server = server
-            instance.username = username
-            instance.password = password
-            instance.db_type = db_type
-            instance.port = port
-            instance.engine = instance._create_engine()
-            cls._instances[key] = instance
-        return cls._instances[key]
+    _lock = threading.Lock()
+
+    def __new__(cls, db, server, username, password, db_type='postgresql', port=None,
+                pool_size=None, max_overflow=None, pool_timeout=None, pool_recycle=None,
+                pool_pre_ping=None, statement_timeout=None):
+        if db_type != 'sqlite':
+            # Connection settings left as None fall back to the POSTGRES_* environment variables
+            server = env.POSTGRES_HOST if server is None else server
+            port = env.POSTGRES_PORT if port is None else port
+            username = env.POSTGRES_USERNAME if username is None else username
+            password = env.POSTGRES_PASSWORD if password is None else password
+        pool_options = {
+            "pool_size": env.POSTGRES_POOL_SIZE if pool_size is None else pool_size,
+            "max_overflow": env.POSTGRES_MAX_OVERFLOW if max_overflow is None else max_overflow,
+            "pool_timeout": env.POSTGRES_POOL_TIMEOUT if pool_timeout is None else pool_timeout,
+            "pool_recycle": env.POSTGRES_POOL_RECYCLE if pool_recycle is None else pool_recycle,
+            "pool_pre_ping": env.POSTGRES_POOL_PRE_PING if pool_pre_ping is None else pool_pre_ping,
+            "statement_timeout": env.POSTGRES_STATEMENT_TIMEOUT_MS if statement_timeout is None else statement_timeout,
+        }
+        key = (db, server, username, db_type, port, tuple(sorted(pool_options.items())))
+        with cls._lock:
+            if key not in cls._instances:
+                instance = super(DatabaseEngine, cls).__new__(cls)
+                instance.db = db
+                instance.server = server
+                instance.username = username
+                instance.password = password
+                instance.db_type = db_type
+                instance.port = port
+                instance.pool_options = pool_options
+                instance.engine = instance._create_engine()
+                instance._key = key
+                cls._instances[key] = instance
+            return cls._instances[key]
 
     def _create_engine(self):
+        options = self.pool_options
+        pool_kwargs = {
+            "pool_size": options["pool_size"],
+            "max_overflow": options["max_overflow"],
+            "pool_timeout": options["pool_timeout"],
+            "pool_recycle": options["pool_recycle"],
+            "pool_pre_ping": options["pool_pre_ping"],
+        }
         if self.db_type == 'postgresql':
             port_part = f":{self.port}" if self.port else ""
             connection_string = f"postgresql+psycopg2://{self.username}:{self.password}@{self.server}{port_part}/{self.db}"
+            connect_args = {}
+            if options["statement_timeout"]:
+                connect_args["options"] = f"-c statement_timeout={int(options['statement_timeout'])}"
+            return create_engine(connection_string,
+                                 connect_args=connect_args,
+                                 **pool_kwargs)
         elif self.db_type == 'mysql':
             port_part = f":{self.port}" if self.port else ""
             connection_string = f"mysql+pymysql://{self.username}:{self.password}@{self.server}{port_part}/{self.db}"
+            return create_engine(connection_string, **pool_kwargs)
         elif self.db_type == 'sqlite':
             connection_string = f"sqlite:///{self.db}"  
+            return create_engine(connection_string)
         else:
             raise ValueError(f"Unsupported db_type: {self.db_type}")
-        return create_engine(connection_string)
 
     def get_engine(self):
         return self.engine
+
+    def dispose(self):
+        """Closes this engine's pooled connections and drops it and its reflected tables from the caches."""
+        with DatabaseEngine._lock:
+            DatabaseEngine._instances.pop(self._key, None)
+        self._dispose_engine()
+
+    def _dispose_engine(self):
+        # Imported here: utils.orchestrator imports this module
+        from utils.orchestrator import invalidate_table_cache
+        invalidate_table_cache(engine=self.engine)
+        self.engine.dispose()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.dispose()
+
+    @classmethod
+    def dispose_all(cls):
+        """Closes every cached engine's pool, e.g. at the end of a batch job or before forking workers."""
+        with cls._lock:
+            instances = list(cls._instances.values())
+            cls._instances.clear()
+        for instance in instances:
+            instance._dispose_engine()
+
+    @classmethod
+    @contextmanager
+    def scope(cls):
+        """Context manager for batch jobs: engines created inside share their pools and are disposed on exit."""
+        try:
+            yield cls
+        finally:
+            cls.dispose_all()
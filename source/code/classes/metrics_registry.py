@@ -0,0 +1,34 @@
+import threading
+import time
+
+class MetricsRegistry:
+    """
+    Thread-safe accumulator of per-operation counters (e.g. "db.upsert_copy", "http.get", "sim.tickets").
+    Every record() adds its values to the operation's totals under one short lock, so instrumented code
+    records once per call or batch, never per row. Counter names are free-form; the usual ones are
+    calls, seconds, rows, bytes_sent, bytes_received, round_trips, retries and errors.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._operations: dict[str, dict[str, float]] = {}
+        self.started_at = time.time()
+
+    def record(self, operation: str, **values):
+        with self._lock:
+            totals = self._operations.setdefault(operation, {})
+            for key, value in values.items():
+                totals[key] = totals.get(key, 0) + value
+
+    def snapshot(self) -> dict[str, dict]:
+        """Copy of the totals per operation, with rows_per_second derived where both are known."""
+        with self._lock:
+            operations = {name: dict(totals) for name, totals in self._operations.items()}
+        for totals in operations.values():
+            if totals.get("rows") and totals.get("seconds"):
+                totals["rows_per_second"] = totals["rows"] / totals["seconds"]
+        return operations
+
+    def reset(self):
+        with self._lock:
+            self._operations = {}
+            self.started_at = time.time()
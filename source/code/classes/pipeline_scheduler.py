@@ -0,0 +1,109 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from utils import metrics
+
+class Step:
+    """
+    One pipeline step: a callable plus the names of the steps that must succeed before it runs.
+    """
+    def __init__(self, name: str, run, depends_on: tuple = ()):
+        self.name = name
+        self.run = run
+        self.depends_on = tuple(depends_on)
+
+def count_rows(result) -> int | None:
+    """Best-effort row count from a step's return value (an int, a list, or a dict of counts)."""
+    if isinstance(result, bool):
+        return None
+    if isinstance(result, int):
+        return result
+    if isinstance(result, dict) and result and all(isinstance(v, int) for v in result.values()):
+        return sum(result.values())
+    if isinstance(result, (list, tuple)):
+        return len(result)
+    return None
+
+class PipelineScheduler:
+    """
+    Runs steps as a DAG on a thread pool: a step starts as soon as all of its dependencies have succeeded,
+    so independent steps overlap and wall-clock follows the critical path. When a step fails, every step
+    downstream of it is skipped instead of running against incomplete data.
+    Each step's status, duration, row count, error and the peak RSS at its end are recorded in `results`.
+    """
+    def __init__(self, steps: list[Step], max_workers: int = 4):
+        names = [step.name for step in steps]
+        if len(set(names)) != len(names):
+            raise ValueError(f"Duplicate step names in {names}")
+        for step in steps:
+            unknown = [dep for dep in step.depends_on if dep not in names]
+            if unknown:
+                raise ValueError(f"Step '{step.name}' depends on unknown step(s) {unknown}")
+        self.steps = {step.name: step for step in steps}
+        self.max_workers = max_workers
+        self.results: dict[str, dict] = {}
+        self._lock = threading.Lock()
+        self._check_acyclic()
+
+    def _check_acyclic(self):
+        state = {}
+        def visit(name, path):
+            if state.get(name) == "done":
+                return
+            if state.get(name) == "visiting":
+                raise ValueError(f"Dependency cycle: {' -> '.join(path + [name])}")
+            state[name] = "visiting"
+            for dep in self.steps[name].depends_on:
+                visit(dep, path + [name])
+            state[name] = "done"
+        for name in self.steps:
+            visit(name, [])
+
+    def _execute(self, step: Step):
+        print(f"🔄 Running: {step.name}")
+        started = time.perf_counter()
+        try:
+            result = step.run()
+        except Exception as e:
+            duration = time.perf_counter() - started
+            print(f"❌ Error in {step.name} after {duration:.1f}s: {e}\n")
+            return {"status": "failed", "duration": duration, "rows": None, "error": repr(e),
+                    "peak_rss_bytes": metrics.peak_rss_bytes()["self"]}
+        duration = time.perf_counter() - started
+        rows = count_rows(result)
+        print(f"✅ Completed: {step.name} in {duration:.1f}s" + (f" ({rows} rows)" if rows is not None else "") + "\n")
+        # Process-wide high-water mark when the step ended; steps running concurrently share it
+        return {"status": "success", "duration": duration, "rows": rows, "error": None,
+                "peak_rss_bytes": metrics.peak_rss_bytes()["self"]}
+
+    def run(self) -> dict[str, dict]:
+        pending = dict(self.steps)
+        running = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while pending or running:
+                for name, step in list(pending.items()):
+                    dep_status = [self.results.get(dep, {}).get("status") for dep in step.depends_on]
+                    if any(status in ("failed", "skipped") for status in dep_status):
+                        failed = [dep for dep, status in zip(step.depends_on, dep_status) if status in ("failed", "skipped")]
+                        print(f"⏭️ Skipping {name}: upstream {failed} did not succeed\n")
+                        self.results[name] = {"status": "skipped", "duration": 0.0, "rows": None,
+                                              "error": f"upstream {failed} did not succeed"}
+                        del pending[name]
+                    elif all(status == "success" for status in dep_status):
+                        running[executor.submit(self._execute, step)] = name
+                        del pending[name]
+                if not running:
+                    continue
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    self.results[running.pop(future)] = future.result()
+        return self.results
+
+    def summary(self) -> str:
+        lines = [f"{'Step':<28}{'Status':<10}{'Seconds':>10}{'Rows':>12}"]
+        for name in self.steps:
+            result = self.results.get(name, {})
+            rows = result.get("rows")
+            lines.append(f"{name:<28}{result.get('status', '-'):<10}{result.get('duration', 0.0):>10.1f}"
+                         f"{'' if rows is None else rows:>12}")
+        return "\n".join(lines)
@@ -0,0 +1,97 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+class ResponseCache:
+    """
+    Content-addressed on-disk cache for raw API payloads.
+
+    Entries are keyed by a SHA-256 of the endpoint and its query parameters and stored as
+    gzip-compressed JSON next to a small metadata sidecar (url, params, fetched/expiry time).
+    An entry with `ttl=None` never expires. Reads touch the payload's mtime, so once the
+    cache grows past `max_bytes` the least recently used entries are evicted first.
+    """
+    def __init__(self, directory: Path, max_bytes: int = 512 * 1024 * 1024):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._size = None  # bytes on disk, computed lazily on the first write
+
+    @staticmethod
+    def key(url: str, params: dict = None) -> str:
+        canonical = json.dumps({"url": url, "params": params or {}}, sort_keys=True, default=str)
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def _paths(self, key: str) -> tuple[Path, Path]:
+        folder = self.directory / key[:2]
+        return folder / f"{key}.json.gz", folder / f"{key}.meta.json"
+
+    def get(self, url: str, params: dict = None):
+        """Returns the cached payload, or None when it is missing, expired or unreadable."""
+        payload_path, meta_path = self._paths(self.key(url, params))
+        try:
+            meta = json.loads(meta_path.read_text(encoding="utf-8"))
+            expires_at = meta.get("expires_at")
+            if expires_at is not None and expires_at < time.time():
+                return None
+            with gzip.open(payload_path, "rb") as f:
+                data = json.loads(f.read())
+            os.utime(payload_path)
+            return data
+        except (OSError, ValueError, EOFError):
+            return None
+
+    def put(self, url: str, params: dict, data, ttl: float = None):
+        """Stores a payload; `ttl` in seconds, None keeps it forever."""
+        key = self.key(url, params)
+        payload_path, meta_path = self._paths(key)
+        payload_path.parent.mkdir(parents=True, exist_ok=True)
+        now = time.time()
+        meta = {
+            "url": url,
+            "params": params or {},
+            "fetched_at": now,
+            "expires_at": None if ttl is None else now + ttl,
+        }
+        body = gzip.compress(json.dumps(data).encode("utf-8"))
+        with self._lock:
+            previous = payload_path.stat().st_size if payload_path.exists() else 0
+            # Write-then-rename so a crash never leaves a truncated entry behind
+            tmp_path = payload_path.with_name(f"{payload_path.name}.{threading.get_ident()}.tmp")
+            tmp_path.write_bytes(body)
+            os.replace(tmp_path, payload_path)
+            meta_path.write_text(json.dumps(meta), encoding="utf-8")
+            if self._size is None:
+                self._size = self._disk_usage()
+            else:
+                self._size += len(body) - previous
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def clear(self):
+        with self._lock:
+            for payload_path in self.directory.glob("*/*.json.gz"):
+                self._remove(payload_path)
+            self._size = 0
+
+    def _disk_usage(self) -> int:
+        return sum(p.stat().st_size for p in self.directory.glob("*/*.json.gz"))
+
+    def _remove(self, payload_path: Path) -> int:
+        size = payload_path.stat().st_size
+        payload_path.unlink(missing_ok=True)
+        payload_path.with_name(payload_path.name.replace(".json.gz", ".meta.json")).unlink(missing_ok=True)
+        return size
+
+    def _evict(self):
+        # Least recently used first, down to 90% of the cap so eviction does not run on every write
+        target = int(self.max_bytes * 0.9)
+        entries = sorted(self.directory.glob("*/*.json.gz"), key=lambda p: p.stat().st_mtime)
+        for payload_path in entries:
+            if self._size <= target:
+                break
+            self._size -= self._remove(payload_path)
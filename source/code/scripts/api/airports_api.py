@@ -1,5 +1,13 @@
-import requests
-from utils.api_urls import OPENDATASOFT
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain
+from typing import Iterator
+from utils.api_urls import OPENDATASOFT, OPENDATASOFT_DOWNLOAD
+from utils import metrics
+from utils.http_client import build_session, default_response_cache, get_json, stream_json_array
+
+# The airports dataset changes rarely; cached pages are refreshed weekly
+AIRPORTS_CACHE_TTL = 7 * 24 * 60 * 60
+DATASET = "airports-code@public"
 
 def safe_int(val):
     try:
@@ -7,56 +15,91 @@ def safe_int(val):
     except (ValueError, TypeError):
         return None
 
-def fetch_airports(limit=100, total_count: int = None) -> list[dict]:
+def flatten_record(rec: dict) -> dict:
+    row = rec.get("fields", {})
+    return {
+        "icao": row.get("column_1"),                       # TEXT
+        "name": row.get("airport_name"),                   # TEXT
+        "city": row.get("city_name"),                      # TEXT
+        "country": row.get("country_name"),                # TEXT
+        "country_code": row.get("country_code"),           # TEXT
+        "latitude": row.get("latitude"),                   # Numeric
+        "longitude": row.get("longitude"),                 # Numeric
+        "world_area_code": safe_int(row.get("world_area_code")),             # BIGINT
+        "city_name_geo_name_id": safe_int(row.get("city_name_geo_name_id")), # BIGINT
+        "country_name_geo_name_id": safe_int(row.get("country_name_geo_name_id")), # BIGINT
+    }
+
+def iter_airports_export(use_cache: bool = True) -> Iterator[dict]:
     """
-    Fetch all airports from OpenDataSoft dataset, in pages of size `limit`.
-    Returns a list of dicts (flattened records).
+    Stream the whole dataset from the bulk export endpoint in a single request.
+    The JSON array is decoded incrementally, so rows are yielded while the download is running.
     """
-    base_url = OPENDATASOFT
-    dataset = "airports-code@public"
-    all_records: list[dict] = []
+    cache = default_response_cache() if use_cache else None
+    for n, rec in enumerate(stream_json_array(OPENDATASOFT_DOWNLOAD,
+                                              params={"dataset": DATASET, "format": "json"},
+                                              cache=cache,
+                                              ttl=AIRPORTS_CACHE_TTL), start=1):
+        yield flatten_record(rec)
+        if n % 10000 == 0:
+            print(f"Streamed {n} airports")
 
-    resp = requests.get(base_url, params={"dataset": dataset, "rows": 1})
-    resp.raise_for_status()
-    if total_count is None:
-        total_count = resp.json().get("nhits", 0)
-    print(f"Total records reported: {total_count}")
+def iter_airports_pages(limit: int = 100, workers: int = 8, use_cache: bool = True) -> Iterator[dict]:
+    """
+    Fetch the dataset as offset pages of size `limit`, with up to `workers` pages in flight.
+    The first page also reports the total count, so no separate probe request is needed.
+    Pages are yielded in order as soon as each one (and every page before it) has arrived.
+    """
+    cache = default_response_cache() if use_cache else None
+    session = build_session(pool_size=workers)
 
-    offset = 0
-    while offset < total_count:
-        resp = requests.get(
-            base_url,
+    def fetch_page(offset: int) -> dict:
+        return get_json(
+            OPENDATASOFT,
             params={
-                "dataset": dataset,
+                "dataset": DATASET,
                 "rows": limit,
                 "start": offset,
                 "sort": "column_1"
             },
+            session=session,
+            cache=cache,
+            ttl=AIRPORTS_CACHE_TTL,
         )
-        resp.raise_for_status()
-        data = resp.json()
-        records = data.get("records", [])
-        for rec in records:
-            row = rec.get("fields", {})
-            all_records.append({
-                "icao": row.get("column_1"),                       # TEXT
-                "name": row.get("airport_name"),                   # TEXT
-                "city": row.get("city_name"),                      # TEXT
-                "country": row.get("country_name"),                # TEXT
-                "country_code": row.get("country_code"),           # TEXT
-                "latitude": row.get("latitude"),                   # Numeric
-                "longitude": row.get("longitude"),                 # Numeric
-                "world_area_code": safe_int(row.get("world_area_code")),             # BIGINT
-                "city_name_geo_name_id": safe_int(row.get("city_name_geo_name_id")), # BIGINT
-                "country_name_geo_name_id": safe_int(row.get("country_name_geo_name_id")), # BIGINT
-            })
-        offset += limit
-        print(f"Fetched {len(all_records)} / {total_count}")
-
-    return all_records
+
+    with session, ThreadPoolExecutor(max_workers=workers) as executor:
+        first = fetch_page(0)
+        total_count = first.get("nhits", 0)
+        print(f"Total records reported: {total_count}")
+        fetched = 0
+        pages = executor.map(fetch_page, range(limit, total_count, limit))
+        for data in chain([first], pages):
+            records = data.get("records", [])
+            for rec in records:
+                yield flatten_record(rec)
+            fetched += len(records)
+            print(f"Fetched {fetched} / {total_count}")
+
+def iter_airports(method: str = "export", limit: int = 100, workers: int = 8, use_cache: bool = True) -> Iterator[dict]:
+    """
+    Yield flattened airport rows as they arrive, from the bulk export (`method='export'`)
+    or from concurrently fetched offset pages (`method='pages'`).
+    """
+    if method == "export":
+        return metrics.timed_iter("api.airports", iter_airports_export(use_cache=use_cache))
+    if method == "pages":
+        return metrics.timed_iter("api.airports", iter_airports_pages(limit=limit, workers=workers, use_cache=use_cache))
+    raise ValueError(f"Unsupported method: {method}")
+
+def fetch_airports(limit=100, method: str = "export", workers: int = 8, use_cache: bool = True) -> list[dict]:
+    """
+    Fetch all airports from OpenDataSoft dataset.
+    Returns a list of dicts (flattened records).
+    """
+    return list(iter_airports(method=method, limit=limit, workers=workers, use_cache=use_cache))
 
 def main():
     return fetch_airports()
 
 if __name__ == "__main__":
-    print(main()[:2])
\ No newline at end of file
+    print(main()[:2])
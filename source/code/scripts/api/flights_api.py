@@ -1,14 +1,39 @@
 import requests
-from utils import api_urls, env
+from utils import api_urls, env, metrics, timestamps
+from utils.http_client import build_session, default_response_cache, get_json
+from classes.rate_limiter import TokenBucket
 import json
 import hashlib
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 
-def generate_transaction_id(flight: dict) -> str:
-    movement = flight.get("movement", {})
-    scheduled = movement.get("scheduledTime", {})
-    airline = flight.get("airline", {})
-    key = f"{flight.get('number', '')}_{scheduled.get('utc', '')}_{airline.get('iata', '')}_{movement.get('gate', '')}_{movement.get('terminal', '')}_{flight.get('status', '')}"
+# api.market quota for the AeroDataBox endpoints
+DEFAULT_CONCURRENCY = 4
+DEFAULT_RATE_PER_SECOND = 2.0
+DEFAULT_BURST = 4
+
+# Windows ending within this many days of now may still change (delays, cancellations),
+# so their cached payload expires; older windows are historical and cached forever.
+RECENT_WINDOW_DAYS = 3
+RECENT_WINDOW_TTL = 60 * 60
+
+def window_ttl(date_to: str, now: datetime = None):
+    """Cache TTL in seconds for a window ending at `date_to` (YYYY-MM-DDTHH:mm); None = forever."""
+    now = now or datetime.now()
+    if datetime.strptime(date_to, "%Y-%m-%dT%H:%M") < now - timedelta(days=RECENT_WINDOW_DAYS):
+        return None
+    return RECENT_WINDOW_TTL
+
+def generate_transaction_id(flight_number: str | None,
+                            scheduled_utc: datetime | None,
+                            airline_iata: str | None) -> str:
+    """
+    Stable key of a departure: flight number, scheduled UTC time and airline, none of which change while
+    the flight's status, gate or terminal do, so a re-fetched flight updates its row instead of adding one.
+    upsert_flights.TRANSACTION_ID_SQL computes the same key in SQL; keep the two in step.
+    """
+    scheduled = "" if scheduled_utc is None else scheduled_utc.strftime("%Y-%m-%d %H:%M:%S")
+    key = f"{flight_number or ''}_{scheduled}_{airline_iata or ''}"
     return hashlib.md5(key.encode("utf-8")).hexdigest()
 
 def fetch_flights(
@@ -23,6 +48,10 @@ def fetch_flights(
     withCargo: bool = True,
     withPrivate: bool = True,
     withLocation: bool = False,
+    session: requests.Session = None,
+    limiter: TokenBucket = None,
+    base_url: str = api_urls.HISTORICAL_FLIGHTS_BASE_URL,
+    use_cache: bool = True,
     ):
     """
     Call AeroDataBox API for airport flights.
@@ -30,8 +59,12 @@ def fetch_flights(
     :param code: Airport IATA code, e.g. "CPH"
     :param date_from: Start of range, format YYYY-MM-DDTHH:mm
     :param date_to: End of range, format YYYY-MM-DDTHH:mm
+    :param session: Optional pooled session shared between calls
+    :param limiter: Optional token bucket shared between calls
+    :param base_url: API base URL, overridable to point at a mock server
+    :param use_cache: Read through the on-disk response cache (see window_ttl)
     """
-    url = f"{api_urls.HISTORICAL_FLIGHTS_BASE_URL}/{codetype}/{code}/{date_from}/{date_to}"
+    url = f"{base_url}/{codetype}/{code}/{date_from}/{date_to}"
     headers = {
         "accept": "application/json",
         "x-api-market-key": env.API_MARKET_KEY,
@@ -45,15 +78,30 @@ def fetch_flights(
         "withPrivate": str(withPrivate).lower(),
         "withLocation": str(withLocation).lower(),
     }
-    resp = requests.get(url, headers=headers, params=params, timeout=30)
-    resp.raise_for_status()
-    return resp.json()
-
+    with metrics.timed("api.flights") as sample:
+        data = get_json(
+            url,
+            params=params,
+            headers=headers,
+            session=session,
+            limiter=limiter,
+            timeout=30,
+            cache=default_response_cache() if use_cache else None,
+            ttl=window_ttl(date_to),
+        )
+        sample["rows"] = sum(len(value) for value in data.values() if isinstance(value, list))
+    return data
+
+
+TIME_COLUMNS = ("scheduled_utc", "scheduled_local", "revised_utc", "revised_local", "runway_utc", "runway_local")
 
 def clean_departures_extended(raw_data: dict) -> list[dict]:
     """
     Clean and normalize flight data from AeroDataBox response.
-    Adds a stable transaction_id field.
+    Adds a stable transaction_id field (see generate_transaction_id).
+    Times are parsed per column in one vectorized pass (utils.timestamps) into naive datetimes:
+    *_utc in UTC and *_local in the airport's wall-clock time. A missing or malformed time is None
+    for that flight only (a *_utc time without an offset too); it never drops the rest of the window.
     """
     departures = raw_data.get("departures", [])
     cleaned = []
@@ -68,7 +116,6 @@ def clean_departures_extended(raw_data: dict) -> list[dict]:
         airline = flight.get("airline", {})
 
         cleaned.append({
-            "transaction_id": generate_transaction_id(flight),
             "flight_number": flight.get("number"),
             "scheduled_utc": scheduled.get("utc"),
             "airline": airline.get("name"),
@@ -89,13 +136,20 @@ def clean_departures_extended(raw_data: dict) -> list[dict]:
             "aircraft_reg": aircraft.get("reg")
         })
 
-    # Deduplicate by transaction_id
+    for column in TIME_COLUMNS:
+        wall, offsets = timestamps.parse_offset_timestamps([flight[column] for flight in cleaned])
+        parsed = timestamps.to_utc(wall, offsets) if column.endswith("_utc") else wall
+        for flight, value in zip(cleaned, timestamps.to_datetimes(parsed)):
+            flight[column] = value
+
+    # Deduplicate by transaction_id, which hashes the parsed scheduled_utc
     deduplicated = {}
     for flight in cleaned:
-        deduplicated[flight["transaction_id"]] = flight
-
-    return list(deduplicated.values())
+        transaction_id = generate_transaction_id(flight["flight_number"], flight["scheduled_utc"], flight["airline_iata"])
+        deduplicated[transaction_id] = {"transaction_id": transaction_id, **flight}
+    cleaned = list(deduplicated.values())
 
+    return cleaned
 
 def main(dt_from: datetime,
         days: int = 1,
@@ -108,44 +162,68 @@ def main(dt_from: datetime,
         withCargo: bool = True,
         withPrivate: bool = True,
         withLocation: bool = False,
+        concurrency: int = DEFAULT_CONCURRENCY,
+        rate_per_second: float = DEFAULT_RATE_PER_SECOND,
+        burst: int = DEFAULT_BURST,
+        base_url: str = api_urls.HISTORICAL_FLIGHTS_BASE_URL,
+        use_cache: bool = True,
+        dt_to: datetime = None,
+        raise_on_error: bool = False,
     ) -> list[dict]:
         """
-        Fetch and clean flight data in 12-hour intervals starting from `dt_from` over `days` days.
-        Returns a deduplicated list of cleaned flights.
+        Fetch and clean flight data in 12-hour intervals starting from `dt_from` over `days` days,
+        or up to `dt_to` (exclusive) when it is given.
+        Windows are fetched concurrently (at most `concurrency` in flight) over one pooled session,
+        throttled by a token bucket of `rate_per_second` with bursts of `burst`.
+        Raw payloads are read through the on-disk response cache unless `use_cache` is False.
+        A failed window is logged and skipped, or re-raised when `raise_on_error` is True.
+        Returns a deduplicated list of cleaned flights, in window order.
         """
-        all_cleaned = []
+        if dt_to is None:
+            dt_to = dt_from + timedelta(days=days)
+        windows = []
+        window_start = dt_from
+        while window_start < dt_to:
+            window_end = window_start + timedelta(hours=11, minutes=59)
+            windows.append((window_start.strftime("%Y-%m-%dT%H:%M"), window_end.strftime("%Y-%m-%dT%H:%M")))
+            window_start += timedelta(hours=12)
+
+        session = build_session(pool_size=concurrency)
+        limiter = TokenBucket(rate=rate_per_second, capacity=burst)
+
+        def fetch_window(window: tuple) -> list[dict]:
+            date_from, date_to = window
+            try:
+                flights = fetch_flights(
+                    code=code,
+                    date_from=date_from,
+                    date_to=date_to,
+                    codetype=codetype,
+                    direction=direction,
+                    withLeg=withLeg,
+                    withCancelled=withCancelled,
+                    withCodeshared=withCodeshared,
+                    withCargo=withCargo,
+                    withPrivate=withPrivate,
+                    withLocation=withLocation,
+                    session=session,
+                    limiter=limiter,
+                    base_url=base_url,
+                    use_cache=use_cache,
+                )
+                cleaned = clean_departures_extended(flights)
+                print(f"📡 {date_from} → {date_to}: {len(cleaned)} cleaned flights")
+                return cleaned
+            except Exception as e:
+                print(f"⚠️ Error during fetch {date_from} → {date_to}: {e}")
+                if raise_on_error:
+                    raise
+                return []
 
-        for day_offset in range(days):
-            for hour in [0, 12]:
-                window_start = dt_from + timedelta(days=day_offset, hours=hour)
-                window_end = window_start + timedelta(hours=11, minutes=59)
-
-                date_from = window_start.strftime("%Y-%m-%dT%H:%M")
-                date_to = window_end.strftime("%Y-%m-%dT%H:%M")
-
-                print(f"📡 Fetching {date_from} → {date_to}")
-
-                try:
-                    flights = fetch_flights(
-                        code=code,
-                        date_from=date_from,
-                        date_to=date_to,
-                        codetype=codetype,
-                        direction=direction,
-                        withLeg=withLeg,
-                        withCancelled=withCancelled,
-                        withCodeshared=withCodeshared,
-                        withCargo=withCargo,
-                        withPrivate=withPrivate,
-                        withLocation=withLocation,
-                    )
-                    cleaned = clean_departures_extended(flights)
-                    print(f"{len(cleaned)} cleaned flights")
-                    all_cleaned.extend(cleaned)
-
-                except Exception as e:
-                    print(f"⚠️ Error during fetch: {e}")
-                    continue
+        all_cleaned = []
+        with session, ThreadPoolExecutor(max_workers=concurrency) as executor:
+            for cleaned in executor.map(fetch_window, windows):
+                all_cleaned.extend(cleaned)
 
         # Final deduplication (just in case)
         deduplicated = {f["transaction_id"]: f for f in all_cleaned}
@@ -1,21 +1,105 @@
+import argparse
 from scripts import upserts
+from utils import metrics
+from utils.path_config import FILES_DIR
+from classes.checkpoint import CheckpointStore
+from classes.db_engine import DatabaseEngine
+from classes.pipeline_scheduler import PipelineScheduler, Step, count_rows
 
-run_modules = [
-    ("Upsert Aircraft Models", upserts.upsert_aircraft_models),
-    ("Upsert Aircraft Models", upserts.upsert_airports),
-    ("Upsert Flights", upserts.upsert_flights),
-    ("Simulate Passports", upserts.upsert_passport),
-    ("Simulate Tickets", upserts.upsert_tickets),
+CHECKPOINT_PATH = FILES_DIR / "checkpoints" / "cph_case_pipeline.json"
+METRICS_REPORT_PATH = FILES_DIR / "metrics" / "cph_case_pipeline.json"
+
+# (step, module in scripts.upserts, output table, dependencies): a step depends on the steps whose tables it reads,
+# independent steps run concurrently. Modules are imported only when their step runs.
+STAGES = [
+    ("Upsert Aircraft Models", "upsert_aircraft_models", "cph_airport.aircraft_models", ()),
+    ("Upsert Airports", "upsert_airports", "cph_airport.airports", ()),
+    ("Upsert Flights", "upsert_flights", "cph_airport.flights", ()),
+    ("Simulate Passports", "upsert_passport", "cph_airport.passports", ()),
+    ("Simulate Tickets", "upsert_tickets", "cph_airport.tickets",
+     ("Upsert Aircraft Models", "Upsert Flights", "Simulate Passports")),
 ]
 
-def main():
-    for name, module in run_modules:
-        try:
-            print(f"🔄 Running: {name}")
-            module.main()
-            print(f"✅ Completed: {name}\n")
-        except Exception as e:
-            print(f"❌ Error in {name}: {e}\n")
+# Steps that can resume from their last committed batch receive their stage checkpoint
+BATCH_CHECKPOINTED = {"Simulate Passports", "Simulate Tickets"}
+
+def checkpointed(store: CheckpointStore, name: str, module: str, table: str):
+    """
+    Wraps a step so it is skipped when its stage is already done and marked done when it succeeds.
+    The step's module is imported when the step starts. The data itself lives in the step's table,
+    which is recorded as the stage artifact.
+    """
+    def run_step():
+        stage = store.stage(name)
+        if stage.done:
+            print(f"⏩ {name} already completed in the interrupted run, skipping")
+            return stage.rows
+        stage.start()
+        run = getattr(upserts, module).main
+        result = run(checkpoint=stage) if name in BATCH_CHECKPOINTED else run()
+        stage.finish(rows=count_rows(result), artifact=table)
+        return result
+    return run_step
+
+def select_stages(selected: list[str] = None) -> list[tuple]:
+    """
+    Returns the STAGES to run, matching `selected` against step names or module names.
+    Dependencies on stages that are not selected are dropped, i.e. their tables are assumed to be loaded.
+    """
+    if not selected:
+        return STAGES
+    unknown = [s for s in selected if not any(s in (name, module) for name, module, _, _ in STAGES)]
+    if unknown:
+        raise ValueError(f"Unknown step(s) {unknown}; use --list to see the available steps")
+    stages = [stage for stage in STAGES if stage[0] in selected or stage[1] in selected]
+    names = {stage[0] for stage in stages}
+    return [(name, module, table, tuple(dep for dep in depends_on if dep in names))
+            for name, module, table, depends_on in stages]
+
+def build_steps(store: CheckpointStore, stages: list[tuple] = STAGES) -> list[Step]:
+    return [Step(name, checkpointed(store, name, module, table), depends_on=depends_on)
+            for name, module, table, depends_on in stages]
+
+def main(max_workers: int = 4, resume: bool = False, steps: list[str] = None,
+         report_path=METRICS_REPORT_PATH, openmetrics_path=None) -> dict[str, dict]:
+    """
+    Runs the pipeline, or only the given `steps` (step or module names). With resume=True, stages finished by
+    the previous run are skipped and batch-checkpointed stages continue after their last committed batch;
+    otherwise the checkpoint of the stages being run starts fresh.
+    Per-step results and the totals recorded by utils.metrics are written to a JSON run report at `report_path`
+    and, when `openmetrics_path` is given, to an OpenMetrics text file.
+    """
+    stages = select_stages(steps)
+    store = CheckpointStore(CHECKPOINT_PATH)
+    if not resume:
+        store.reset([name for name, _, _, _ in stages])
+    scheduler = PipelineScheduler(build_steps(store, stages), max_workers=max_workers)
+    # All steps share one pool per database; connections are closed when the run ends
+    with DatabaseEngine.scope():
+        results = scheduler.run()
+    print(scheduler.summary())
+    if report_path is not None:
+        metrics.write_report(report_path, steps=results, pipeline="cph_case_pipeline", max_workers=max_workers)
+        print(f"📊 Run report written to {report_path}")
+    if openmetrics_path is not None:
+        metrics.write_openmetrics(openmetrics_path, steps=results)
+    return results
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Run the CPH airport simulation and load pipeline.")
+    parser.add_argument("--resume", action="store_true", help="continue the last run from its checkpoint")
+    parser.add_argument("--workers", type=int, default=4, help="number of steps that may run concurrently")
+    parser.add_argument("--step", action="append", dest="steps", metavar="STEP",
+                        help="run only this step (step or module name, repeatable); its dependencies are not run")
+    parser.add_argument("--list", action="store_true", help="list the steps and exit")
+    parser.add_argument("--report", default=str(METRICS_REPORT_PATH), help="path of the JSON run report")
+    parser.add_argument("--openmetrics", help="also write the metrics to this OpenMetrics/Prometheus text file")
+    args = parser.parse_args()
+    if args.list:
+        for name, module, table, depends_on in STAGES:
+            print(f"{module:<26}{name:<26}{table:<30}" + (f"after {', '.join(depends_on)}" if depends_on else ""))
+        raise SystemExit(0)
+    results = main(max_workers=args.workers, resume=args.resume, steps=args.steps,
+                   report_path=args.report, openmetrics_path=args.openmetrics)
+    if any(result["status"] != "success" for result in results.values()):
+        raise SystemExit(1)
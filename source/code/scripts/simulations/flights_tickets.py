@@ -1,190 +1,432 @@
 from __future__ import annotations
-from utils import orchestrator
-import random
-from datetime import datetime, timedelta
+import asyncio
+from utils import async_orchestrator, metrics, timestamps
+from scripts.simulations.passport import PassportNumbers
+from classes.async_db_engine import AsyncDatabaseEngine
+from classes.cooldown_pool import CooldownPool
+import numpy as np
+import pyarrow as pa
+from concurrent.futures import ProcessPoolExecutor
 from typing import List, Dict, Iterable, Optional
 from tqdm import tqdm
 
-def _load_passports() -> List[Dict]:
+async def _load_passports() -> np.ndarray:
     db_name='cph_airport'
-    sql_stmt = 'SELECT passport_number FROM cph_airport.passports'
-    passports = orchestrator.get_data_from_db(db_name=db_name,
-                                            sql_query=sql_stmt)
-    return passports
+    # Fixed order so a seeded simulation is reproducible (checkpoint resume)
+    sql_stmt = 'SELECT passport_number FROM cph_airport.passports ORDER BY passport_number'
+    # Batches are kept as arrays and concatenated once, instead of growing one Python list
+    batches: List[np.ndarray] = []
+    async for batch in async_orchestrator.iter_data_from_db(db_name=db_name,
+                                                            sql_query=sql_stmt,
+                                                            as_columns=True):
+        batches.append(np.asarray(batch["passport_number"], dtype=object))
+    return np.concatenate(batches) if batches else np.empty(0, dtype=object)
 
-def _load_flights() -> List[Dict]:
+async def _load_flights() -> List[Dict]:
     db_name='cph_airport'
     sql_stmt = '''SELECT transaction_id,
                             status,
                             scheduled_local,
                             seats
                     FROM cph_airport.flights fl
-                    JOIN cph_airport.aircraft_models am ON am.aircraft_model = fl.aircraft_model'''
-    flights = orchestrator.get_data_from_db(db_name=db_name,
-                                            sql_query=sql_stmt)
+                    JOIN cph_airport.aircraft_models am ON am.aircraft_model = fl.aircraft_model
+                    ORDER BY transaction_id'''
+    flights = await async_orchestrator.get_data_from_db(db_name=db_name,
+                                                        sql_query=sql_stmt)
     return flights
 
-def _occupancy_prob(dt: datetime) -> float:
-    wd = dt.weekday()  # 0=Mon ... 6=Sun
-    hour = dt.hour
-
-    base_map = {0: 0.82, 1: 0.83, 2: 0.84, 3: 0.85, 4: 0.88, 5: 0.78, 6: 0.90}
-    base = base_map.get(wd, 0.82)
-
-    adj = 0.0
-    if 6 <= hour <= 9:     
-        adj += 0.1
-    if 16 <= hour <= 20:   
-        adj += 0.1
-    if 11 <= hour <= 14:  
-        adj -= 0.02
-    if hour >= 22 or hour <= 5:  
-        adj -= 0.04
-
-    return max(0.75, min(0.98, base + adj))
-
-def _binomial(n: int, p: float) -> int:
-    if n <= 0 or p <= 0:
-        return 0
-    if p >= 1:
-        return n
-    return sum(1 for _ in range(n) if random.random() < p)
-
-def _sample_checkin_time(dt_sched_local: datetime, check_in_type: str) -> datetime:
-    if check_in_type == "online":
-        earliest = dt_sched_local - timedelta(hours=24)
-        latest = dt_sched_local - timedelta(hours=2)
-        delta_s = (latest - earliest).total_seconds()
-        return earliest + timedelta(seconds=random.uniform(0, delta_s))
-    else:
-        mean = 2 * 3600
-        std = 40 * 60
-        # sample seconds before scheduled
-        for _ in range(10):
-            secs = random.gauss(mean, std)
-            if 30*60 <= secs <= 6*3600:
-                return dt_sched_local - timedelta(seconds=secs)
-        # fallback clamp
-        secs = max(30*60, min(6*3600, random.gauss(mean, std)))
-        return dt_sched_local - timedelta(seconds=secs)
-
-def _sample_security_time(dt_sched_local: datetime, 
-                          checkin_time: datetime) -> Optional[datetime]:
-    upper = dt_sched_local - timedelta(minutes=20)
-    earliest_allowed = dt_sched_local - timedelta(hours=4)
-    lower = max(checkin_time, earliest_allowed)
-    if lower >= upper:
-        # Degenerate window; try 30m before if possible
-        candidate = dt_sched_local - timedelta(minutes=30)
-        return candidate if candidate > checkin_time else None
-    delta_s = (upper - lower).total_seconds()
-    return lower + timedelta(seconds=random.uniform(0, delta_s))
+async def _load_inputs_async() -> tuple[List[Dict], np.ndarray]:
+    # Both reads wait on the database; run them concurrently on separate pooled connections
+    try:
+        flights, passports = await asyncio.gather(_load_flights(), _load_passports())
+    finally:
+        await AsyncDatabaseEngine.dispose_all()
+    return flights, passports
+
+def _load_inputs() -> tuple[List[Dict], np.ndarray]:
+    return asyncio.run(_load_inputs_async())
+
+# Base occupancy per weekday, 0=Mon ... 6=Sun
+_BASE_OCCUPANCY = np.array([0.82, 0.83, 0.84, 0.85, 0.88, 0.78, 0.90])
+CHECK_IN_TYPES = np.array(["online", "onsite"])
+FLIGHT_BLOCK_SIZE = 500
+TICKET_COLUMNS = ["unique_id", "transaction_id", "seat_number", "passport_number",
+                  "check_in_type", "checkin_time", "passed_security_time"]
+
+def _occupancy_prob(dt_sched: np.ndarray) -> np.ndarray:
+    days = dt_sched.astype("datetime64[D]")
+    weekday = (days.astype(np.int64) + 3) % 7  # 1970-01-01 was a Thursday
+    hour = (dt_sched - days).astype("timedelta64[h]").astype(np.int64)
+
+    adj = np.zeros(len(dt_sched))
+    adj += np.where((hour >= 6) & (hour <= 9), 0.1, 0.0)
+    adj += np.where((hour >= 16) & (hour <= 20), 0.1, 0.0)
+    adj -= np.where((hour >= 11) & (hour <= 14), 0.02, 0.0)
+    adj -= np.where((hour >= 22) | (hour <= 5), 0.04, 0.0)
+
+    return np.clip(_BASE_OCCUPANCY[weekday] + adj, 0.75, 0.98)
+
+def _empty_tickets() -> Dict[str, np.ndarray]:
+    tickets = {column: np.empty(0, dtype=object) for column in TICKET_COLUMNS}
+    tickets["seat_number"] = np.empty(0, dtype=np.int64)
+    tickets["checkin_time"] = np.empty(0, dtype="datetime64[s]")
+    tickets["passed_security_time"] = np.empty(0, dtype="datetime64[s]")
+    return tickets
+
+def _sample_checkin_offsets(rng: np.random.Generator, online: np.ndarray) -> np.ndarray:
+    """
+    Seconds between check-in and scheduled departure.
+    Online: uniform between 24h and 2h before. Onsite: N(2h, 40m) redrawn up to
+    10 times until it falls within [30m, 6h], then clamped.
+    """
+    offsets = np.empty(len(online))
+    offsets[online] = rng.uniform(2 * 3600, 24 * 3600, int(online.sum()))
+
+    mean = 2 * 3600
+    std = 40 * 60
+    pending = np.flatnonzero(~online)
+    for _ in range(10):
+        if not pending.size:
+            break
+        secs = rng.normal(mean, std, pending.size)
+        ok = (secs >= 30 * 60) & (secs <= 6 * 3600)
+        offsets[pending[ok]] = secs[ok]
+        pending = pending[~ok]
+    if pending.size:
+        offsets[pending] = np.clip(rng.normal(mean, std, pending.size), 30 * 60, 6 * 3600)
+    return offsets
 
+def _sample_security_offsets(rng: np.random.Generator,
+                             checkin_offsets: np.ndarray,
+                             departed: np.ndarray) -> np.ndarray:
+    """
+    Seconds between passing security and scheduled departure, NaN when not passed.
+    Uniform between max(check-in, 4h before) and 20m before departure; for a
+    degenerate window 30m before departure if that is after check-in.
+    """
+    upper = 20 * 60
+    lower = np.minimum(checkin_offsets, 4 * 3600)
+    u = rng.uniform(0, 1, len(checkin_offsets))
+    fallback = np.where(checkin_offsets > 30 * 60, 30 * 60, np.nan)
+    offsets = np.where(lower > upper, lower - u * (lower - upper), fallback)
+    offsets[~departed] = np.nan
+    return offsets
+
+def _passport_array(passports: List[Dict[str, str]] | List[str] | np.ndarray | PassportNumbers) -> np.ndarray | PassportNumbers:
+    # PassportNumbers computes numbers from indexes, so large populations are never materialized
+    if isinstance(passports, (np.ndarray, PassportNumbers)):
+        return passports
+    # Accept plain passport numbers or dicts with a 'passport_number' key
+    return np.array([p if isinstance(p, str) else p["passport_number"]
+                     for p in passports if isinstance(p, str) or "passport_number" in p], dtype=object)
+
+def _flight_arrays(flights: Iterable[Dict[str, object]] | Dict[str, np.ndarray]) -> tuple:
+    if isinstance(flights, dict):
+        # Columns, e.g. the synthetic flights of scripts.simulations.scale_factor
+        return (np.asarray(flights["transaction_id"], dtype=object),
+                np.char.lower(np.asarray(flights["status"], dtype=str)) == "departed",
+                np.asarray(flights["scheduled_local"], dtype="datetime64[s]"),
+                np.asarray(flights["seats"], dtype=np.int64))
+    flights = list(flights)
+    tx_ids = np.array([str(fl["transaction_id"]) for fl in flights], dtype=object)
+    departed = np.array([str(fl["status"]).lower() == "departed" for fl in flights], dtype=bool)
+    dt_sched = np.array([fl["scheduled_local"] for fl in flights], dtype="datetime64[s]")
+    seats = np.array([int(fl["seats"]) for fl in flights], dtype=np.int64)
+    return tx_ids, departed, dt_sched, seats
+
+def _iter_simulated_indexes(dt_sched: np.ndarray,
+                            seats: np.ndarray,
+                            departed: np.ndarray,
+                            n_passports: int,
+                            *,
+                            rng: np.random.Generator,
+                            cooldown_days: int,
+                            force_fill: bool,
+                            block_size: int = FLIGHT_BLOCK_SIZE,
+                            progress: bool = True):
+    """
+    Simulation core on plain arrays. Walks the flights in chronological order and yields,
+    per block of `block_size` flights, the per-ticket flight and passport indexes, seat
+    numbers, online flags and timestamps; identifiers are attached by _ticket_columns.
+    """
+    # Passports leave the pool when assigned and return when their cooldown ends,
+    # so flights are processed in chronological order
+    sched_s = dt_sched.astype(np.int64)
+    order = np.argsort(sched_s, kind="stable")
+    pool = CooldownPool(n_passports, cooldown_days * 24 * 3600, rng)
+
+    with tqdm(total=len(order), disable=not progress) as bar:
+        # Always yield at least one (possibly empty) block so callers can concatenate
+        for start in range(0, max(len(order), 1), block_size):
+            block = order[start:start + block_size]
+            # Seats sold via binomial
+            seats_sold = np.minimum(seats[block], rng.binomial(np.maximum(seats[block], 0), _occupancy_prob(dt_sched[block])))
+
+            flight_idx = [np.empty(0, dtype=np.int64)]
+            seat_numbers = [np.empty(0, dtype=np.int64)]
+            passenger_idx = [np.empty(0, dtype=np.int64)]
+            for i, k in zip(block.tolist(), seats_sold.tolist()):
+                if k <= 0:
+                    continue
+                t = int(sched_s[i])
+                pool.advance(t)
+                chosen = pool.draw(k)
+                # Optional relaxed pass: force-fill remaining seats_sold ignoring the cooldown
+                if force_fill and len(chosen) < k:
+                    chosen = np.concatenate([chosen, pool.draw_any(k - len(chosen), exclude=chosen)])
+                pool.assign(chosen, t)
+                flight_idx.append(np.full(len(chosen), i, dtype=np.int64))
+                seat_numbers.append(rng.choice(seats[i], size=k, replace=False)[:len(chosen)] + 1)
+                passenger_idx.append(chosen)
+
+            flight_idx = np.concatenate(flight_idx)
+            online = rng.random(len(flight_idx)) < 0.75
+            checkin_offsets = _sample_checkin_offsets(rng, online)
+            security_offsets = _sample_security_offsets(rng, checkin_offsets, departed[flight_idx])
+
+            # Whole seconds, the resolution of the TIMESTAMP columns they are loaded into
+            sched = dt_sched[flight_idx]
+            checkin_time = sched - np.ceil(checkin_offsets).astype("timedelta64[s]")
+            security_time = np.full(len(flight_idx), np.datetime64("NaT"), dtype="datetime64[s]")
+            passed = ~np.isnan(security_offsets)
+            security_time[passed] = sched[passed] - np.ceil(security_offsets[passed]).astype("timedelta64[s]")
+
+            yield {
+                "flight_idx": flight_idx,
+                "passenger_idx": np.concatenate(passenger_idx),
+                "seat_number": np.concatenate(seat_numbers),
+                "online": online,
+                "checkin_time": checkin_time,
+                "passed_security_time": security_time,
+            }
+            bar.update(len(block))
+
+def _concat_columns(blocks: Iterable[Dict[str, np.ndarray]]) -> Dict[str, np.ndarray]:
+    blocks = list(blocks)
+    return {column: np.concatenate([block[column] for block in blocks]) for column in blocks[0]}
+
+def _ticket_columns(core: Dict[str, np.ndarray],
+                    tx_ids: np.ndarray,
+                    passport_ids: np.ndarray) -> Dict[str, np.ndarray]:
+    tx = tx_ids[core["flight_idx"]]
+    seat_numbers = core["seat_number"]
+    return {
+        "unique_id": np.char.add(np.char.add(tx.astype(str), "-S:"), seat_numbers.astype(str)),
+        "transaction_id": tx,
+        "seat_number": seat_numbers,
+        "passport_number": passport_ids[core["passenger_idx"]],
+        "check_in_type": CHECK_IN_TYPES[(~core["online"]).astype(np.int64)],
+        "checkin_time": core["checkin_time"],
+        "passed_security_time": core["passed_security_time"],
+    }
+
+def iter_ticket_columns(
+        flights: Iterable[Dict[str, object]],
+        passports: List[Dict[str, str]] | List[str] | np.ndarray,
+        *,
+        cooldown_days: int = 2,
+        force_fill: bool = False,
+        seed: Optional[int] = None,
+        block_size: int = FLIGHT_BLOCK_SIZE,
+    ):
+    """
+    Batch ticket simulation with NumPy, as a generator. Flights are row dicts or a dict of columns
+    (transaction_id, status, scheduled_local, seats); passports are numbers, passport dicts or a
+    PassportNumbers population. Yields one dict of arrays keyed by
+    TICKET_COLUMNS per block of `block_size` flights, in chronological order; checkin_time and
+    passed_security_time are datetime64[s] (NaT when security was not passed).
+    Seats sold, check-in types and check-in/security offsets are drawn per block as arrays;
+    only the passport assignment runs per flight, drawing uniformly from the passports
+    whose cooldown has ended (see CooldownPool).
+    """
+    tx_ids, departed, dt_sched, seats = _flight_arrays(flights)
+    passport_ids = _passport_array(passports)
+    if not len(tx_ids) or not passport_ids.size:
+        return
+
+    blocks = (_ticket_columns(core, tx_ids, passport_ids)
+              for core in _iter_simulated_indexes(dt_sched,
+                                                  seats,
+                                                  departed,
+                                                  len(passport_ids),
+                                                  rng=np.random.default_rng(seed),
+                                                  cooldown_days=cooldown_days,
+                                                  force_fill=force_fill,
+                                                  block_size=block_size))
+    yield from metrics.timed_iter("sim.tickets", blocks, count=lambda block: len(block["unique_id"]))
+
+def simulate_ticket_columns(
+        flights: Iterable[Dict[str, object]],
+        passports: List[Dict[str, str]] | List[str] | np.ndarray,
+        *,
+        cooldown_days: int = 2,
+        force_fill: bool = False,
+        seed: Optional[int] = None,
+    ) -> Dict[str, np.ndarray]:
+    """
+    Runs iter_ticket_columns to completion and returns a single dict of arrays.
+    """
+    blocks = iter_ticket_columns(flights,
+                                 passports,
+                                 cooldown_days=cooldown_days,
+                                 force_fill=force_fill,
+                                 seed=seed)
+    return _concat_columns([_empty_tickets(), *blocks])
+
+def _simulate_shard(shard: tuple) -> Dict[str, np.ndarray]:
+    dt_sched, seats, departed, n_passports, seed, cooldown_days, force_fill = shard
+    return _concat_columns(_iter_simulated_indexes(dt_sched,
+                                                   seats,
+                                                   departed,
+                                                   n_passports,
+                                                   rng=np.random.default_rng(seed),
+                                                   cooldown_days=cooldown_days,
+                                                   force_fill=force_fill,
+                                                   progress=False))
+
+def simulate_ticket_columns_parallel(
+        flights: Iterable[Dict[str, object]],
+        passports: List[Dict[str, str]] | List[str] | np.ndarray,
+        *,
+        workers: int,
+        seed: Optional[int] = None,
+        cooldown_days: int = 2,
+        force_fill: bool = False,
+    ) -> Dict[str, np.ndarray]:
+    """
+    Runs the simulation in a process pool. Flights are split into `workers` consecutive
+    time windows of roughly equal seat capacity and passports into as many disjoint
+    partitions, so each worker keeps its own cooldown state with no cross-process locking.
+    Workers only exchange arrays of indexes and timestamps; identifiers are attached here.
+    Worker seeds are spawned from SeedSequence(seed) and shards are merged in window order,
+    so the output is identical for a given seed and worker count.
+    The worker count is capped at the number of passports, so no partition is empty.
+    """
+    tx_ids, departed, dt_sched, seats = _flight_arrays(flights)
+    passport_ids = _passport_array(passports)
+    if not len(tx_ids) or not passport_ids.size:
+        return _empty_tickets()
+    workers = max(1, min(workers, passport_ids.size))
+
+    order = np.argsort(dt_sched, kind="stable")
+    capacity = np.cumsum(np.maximum(seats[order], 0))
+    bounds = np.searchsorted(capacity, capacity[-1] * np.arange(1, workers) / workers, side="right")
+    windows = np.split(order, bounds)
+    partitions = np.array_split(np.arange(len(passport_ids)), workers)
+    seeds = np.random.SeedSequence(seed).spawn(workers)
+
+    shards = [(dt_sched[windows[w]], seats[windows[w]], departed[windows[w]], len(partitions[w]),
+               seeds[w], cooldown_days, force_fill)
+              for w in range(workers)]
+    with metrics.timed("sim.tickets") as sample:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(tqdm(executor.map(_simulate_shard, shards), total=workers))
+
+        core = {column: np.concatenate([result[column] for result in results]) for column in results[0]}
+        # Map shard-local indexes back to the global flight list and passport partitions
+        core["flight_idx"] = np.concatenate([windows[w][result["flight_idx"]]
+                                             for w, result in enumerate(results)])
+        core["passenger_idx"] = np.concatenate([partitions[w][result["passenger_idx"]]
+                                                for w, result in enumerate(results)])
+        tickets = _ticket_columns(core, tx_ids, passport_ids)
+        sample["rows"] = len(tickets["unique_id"])
+    return tickets
+
+def ticket_records(tickets: Dict[str, np.ndarray]) -> List[Dict[str, object]]:
+    """
+    Converts the columnar output of simulate_ticket_columns to a list of dicts,
+    with timestamps as naive datetimes (None when missing).
+    """
+    columns = {column: tickets[column].tolist() for column in TICKET_COLUMNS}
+    for column in ("checkin_time", "passed_security_time"):
+        columns[column] = timestamps.to_datetimes(tickets[column])
+    return [dict(zip(TICKET_COLUMNS, values)) for values in zip(*columns.values())]
 
 def simulate_tickets(
         flights: Iterable[Dict[str, object]],
-        passports: List[Dict[str, str]],
+        passports: List[Dict[str, str]] | List[str] | np.ndarray,
         *,
         cooldown_days: int = 2,
-        force_fill: bool = False,              
+        force_fill: bool = False,
+        seed: Optional[int] = None,
+        workers: int = 1,
     ) -> List[Dict[str, object]]:
     """
     Returns list[dict] with:
       unique_id, transaction_id, seat_number, passport_number,
       check_in_type, checkin_time, passed_security_time
+    With workers > 1 the flights are simulated in parallel shards (see simulate_ticket_columns_parallel).
     """
-    
-    # Expect only 'passport_number' in each dict
-    passport_ids = [p["passport_number"] for p in passports if "passport_number" in p]
-    if not passport_ids:
-        return []
-
-    # Track last flight time to enforce cooldown
-    last_flight_at: Dict[str, datetime] = {pid: datetime.min for pid in passport_ids}
-
-    out: List[Dict[str, object]] = []
-
-    for fl in tqdm(flights):
-        tx_id: str = str(fl["transaction_id"])
-        status: str = str(fl["status"])
-        dt_sched: datetime = fl["scheduled_local"]  # already a datetime
-        seats: int = int(fl["seats"])
-
-        # Seats sold via binomial
-        p_occ = _occupancy_prob(dt_sched)
-        seats_sold = min(seats, _binomial(seats, p_occ))
-
-        # Pre-generate randomized seat numbers (unique)
-        seat_numbers = random.sample(range(1, seats + 1), k=seats_sold)
-
-        # Assign passports respecting cooldown
-        chosen_for_flight: set[str] = set()
-        assigned = 0
-        attempts = 0
-        max_attempts = seats_sold * 25 if seats_sold > 0 else 0
-
-        def eligible(pid: str) -> bool:
-            return (dt_sched - last_flight_at.get(pid, datetime.min)) >= timedelta(days=cooldown_days)
-
-        # First pass: strict cooldown
-        while assigned < seats_sold and attempts < max_attempts:
-            attempts += 1
-            pid = random.choice(passport_ids)
-            if pid in chosen_for_flight:
-                continue
-            if not eligible(pid):
-                continue
-            seat_no = seat_numbers[assigned]
-            chosen_for_flight.add(pid)
-            last_flight_at[pid] = dt_sched
-
-            check_in_type = "online" if random.random() < 0.75 else "onsite"
-            checkin_dt = _sample_checkin_time(dt_sched, check_in_type)
-            sec_dt = _sample_security_time(dt_sched, checkin_dt) if status.lower() == "departed" else None
-
-            out.append({
-                "unique_id": f"{tx_id}-S:{seat_no}",
-                "transaction_id": tx_id,
-                "seat_number": seat_no,
-                "passport_number": pid,
-                "check_in_type": check_in_type,
-                "checkin_time": checkin_dt.isoformat(timespec="seconds"),
-                "passed_security_time": None if sec_dt is None else sec_dt.isoformat(timespec="seconds"),
-            })
-            assigned += 1
-
-        # Optional second pass: relax cooldown to force-fill remaining seats_sold
-        if force_fill and assigned < seats_sold:
-            remaining = seats_sold - assigned
-            # pick from those not yet chosen for this flight
-            pool = [pid for pid in passport_ids if pid not in chosen_for_flight]
-            # if pool is too small (unlikely with big passport table), reuse allowed
-            for i in range(remaining):
-                pid = random.choice(pool) if pool else random.choice(passport_ids)
-                seat_no = seat_numbers[assigned]
-                chosen_for_flight.add(pid)
-                last_flight_at[pid] = dt_sched  # still update latest
-
-                check_in_type = "online" if random.random() < 0.75 else "onsite"
-                checkin_dt = _sample_checkin_time(dt_sched, check_in_type)
-                sec_dt = _sample_security_time(dt_sched, checkin_dt) if status.lower() == "departed" else None
-
-                out.append({
-                    "unique_id": f"{tx_id}-S:{seat_no}",
-                    "transaction_id": tx_id,
-                    "seat_number": seat_no,
-                    "passport_number": pid,
-                    "check_in_type": check_in_type,
-                    "checkin_time": checkin_dt.isoformat(timespec="seconds"),
-                    "passed_security_time": None if sec_dt is None else sec_dt.isoformat(timespec="seconds"),
-                })
-                assigned += 1
-    return out
-
-def main():
-    flights = _load_flights()       
-    passports = _load_passports()   
-    tickets = simulate_tickets(flights, passports, force_fill=True)
+    if workers > 1:
+        tickets = simulate_ticket_columns_parallel(flights,
+                                                   passports,
+                                                   workers=workers,
+                                                   seed=seed,
+                                                   cooldown_days=cooldown_days,
+                                                   force_fill=force_fill)
+    else:
+        tickets = simulate_ticket_columns(flights,
+                                          passports,
+                                          cooldown_days=cooldown_days,
+                                          force_fill=force_fill,
+                                          seed=seed)
+    return ticket_records(tickets)
+
+def iter_tickets(
+        flights: Iterable[Dict[str, object]],
+        passports: List[Dict[str, str]] | List[str] | np.ndarray,
+        *,
+        cooldown_days: int = 2,
+        force_fill: bool = False,
+        seed: Optional[int] = None,
+        block_size: int = FLIGHT_BLOCK_SIZE,
+    ):
+    """
+    Generator version of simulate_tickets: yields the tickets of each block of flights
+    as a list of dicts, so only one block is held in memory at a time.
+    """
+    for block in iter_ticket_columns(flights,
+                                     passports,
+                                     cooldown_days=cooldown_days,
+                                     force_fill=force_fill,
+                                     seed=seed,
+                                     block_size=block_size):
+        yield ticket_records(block)
+
+def stream(seed: Optional[int] = None,
+           block_size: int = FLIGHT_BLOCK_SIZE):
+    flights, passports = _load_inputs()
+    yield from iter_tickets(flights, passports, force_fill=True, seed=seed, block_size=block_size)
+
+def iter_ticket_batches(
+        flights: Iterable[Dict[str, object]],
+        passports: List[Dict[str, str]] | List[str] | np.ndarray,
+        *,
+        cooldown_days: int = 2,
+        force_fill: bool = False,
+        seed: Optional[int] = None,
+        block_size: int = FLIGHT_BLOCK_SIZE,
+    ):
+    """
+    Arrow version of iter_tickets: yields the tickets of each block of flights as a pyarrow RecordBatch
+    built directly from the simulated arrays (timestamps as timestamp[s], NaT as null), with no per-row objects.
+    """
+    for block in iter_ticket_columns(flights,
+                                     passports,
+                                     cooldown_days=cooldown_days,
+                                     force_fill=force_fill,
+                                     seed=seed,
+                                     block_size=block_size):
+        yield pa.RecordBatch.from_pydict({column: block[column] for column in TICKET_COLUMNS})
+
+def stream_batches(seed: Optional[int] = None,
+                   block_size: int = FLIGHT_BLOCK_SIZE):
+    flights, passports = _load_inputs()
+    yield from iter_ticket_batches(flights, passports, force_fill=True, seed=seed, block_size=block_size)
+
+def main(workers: int = 1, seed: Optional[int] = None):
+    flights, passports = _load_inputs()
+    tickets = simulate_tickets(flights, passports, force_fill=True, seed=seed, workers=workers)
     return tickets
 
 if __name__ == "__main__":
@@ -1,6 +1,11 @@
 import random, string
-from typing import List, Dict
-from faker import Faker
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from typing import TYPE_CHECKING, List, Dict
+from utils import metrics
+
+if TYPE_CHECKING:
+    from faker import Faker
 
 EUROPEAN_COUNTRIES = [
     "Albania","Andorra","Armenia","Austria","Azerbaijan","Belarus","Belgium","Bosnia and Herzegovina",
@@ -46,9 +51,18 @@ WORLD_SAMPLE = [
     "India","China","Japan","South Korea","Australia","New Zealand","Saudi Arabia","United Arab Emirates"
 ]
 
+_OTHER_EUROPEAN = [c for c in EUROPEAN_COUNTRIES if c not in ("Denmark", "Sweden")]
+
+PASSPORT_NUMBER_LENGTH = 9
+_BASE36_DIGITS = np.frombuffer((string.digits + string.ascii_uppercase).encode("ascii"), dtype=np.uint8)
+_PASSPORT_NUMBER_SPACE = 36 ** PASSPORT_NUMBER_LENGTH
+
 _FAKERS = {}
+_NAME_POOLS = {}
 
-def _get_faker(locale: str) -> Faker:
+def _get_faker(locale: str) -> "Faker":
+    # Faker (and its locale providers) is imported on first use; it is slow to import
+    from faker import Faker
     if locale not in _FAKERS:
         try:
             _FAKERS[locale] = Faker(locale)
@@ -71,7 +85,7 @@ def pick_country() -> str:
     elif r < 0.6:
         return "Sweden"
     elif r < 0.90:
-        return random.choice([c for c in EUROPEAN_COUNTRIES if c not in ("Denmark", "Sweden")])
+        return random.choice(_OTHER_EUROPEAN)
     else:
         return random.choice(WORLD_SAMPLE)
 
@@ -80,35 +94,222 @@ def make_name_for_country(country: str) -> str:
     f = _get_faker(locale)
     return f.name()
 
-def generate_passports_list(n: int, seed: int | None = None) -> List[Dict[str, str]]:
+def _country_locale_table() -> tuple[np.ndarray, np.ndarray, np.ndarray]:
     """
-    Return a list of dicts with unique passport numbers.
+    (country, locale, probability) rows matching pick_country + pick_locale_for_country:
+    40% Denmark, 20% Sweden, 30% other European, 10% world sample,
+    with each country's share split evenly over its locales.
     """
+    weights = [("Denmark", 0.4), ("Sweden", 0.2)]
+    weights += [(c, 0.3 / len(_OTHER_EUROPEAN)) for c in _OTHER_EUROPEAN]
+    weights += [(c, 0.1 / len(WORLD_SAMPLE)) for c in WORLD_SAMPLE]
+    countries, locales, probs = [], [], []
+    for country, weight in weights:
+        candidates = COUNTRY_TO_LOCALES.get(country) or COUNTRY_TO_LOCALES["_WORLD"]
+        for locale in candidates:
+            countries.append(country)
+            locales.append(locale)
+            probs.append(weight / len(candidates))
+    probs = np.array(probs)
+    return np.array(countries, dtype=object), np.array(locales, dtype=object), probs / probs.sum()
+
+def _new_faker(locale: str, seed: int | None) -> "Faker":
+    from faker import Faker
+    try:
+        f = Faker(locale)
+    except Exception:
+        f = Faker("en_GB")
     if seed is not None:
-        random.seed(seed)
-
-    results: List[Dict[str, str]] = []
-    used_passports: set[str] = set()
-
-    while len(results) < n:
-        country = pick_country()
-        name = make_name_for_country(country)
-
-        # Ensure uniqueness
-        pno = random_passport_number()
-        while pno in used_passports:
-            pno = random_passport_number()
-
-        used_passports.add(pno)
-        results.append({
-            "passport_number": pno,
-            "name": name,
-            "country": country
-        })
-    return results
-
-def main(n=1000000):
-    return generate_passports_list(n = n)
+        f.seed_instance(seed)
+    return f
+
+def _name_pool(locale: str, size: int, seed: int | None) -> np.ndarray:
+    key = (locale, size, seed)
+    if key not in _NAME_POOLS:
+        f = _new_faker(locale, seed)
+        _NAME_POOLS[key] = np.array([f.name() for _ in range(size)], dtype=object)
+    return _NAME_POOLS[key]
+
+def _encode_base36(codes: np.ndarray, length: int = PASSPORT_NUMBER_LENGTH) -> np.ndarray:
+    digits = np.empty((len(codes), length), dtype=np.uint8)
+    remaining = codes.astype(np.int64)
+    for pos in range(length - 1, -1, -1):
+        digits[:, pos] = _BASE36_DIGITS[remaining % 36]
+        remaining //= 36
+    return digits.view(f"S{length}").ravel().astype(f"U{length}")
+
+def _feistel(x: np.ndarray, half_bits: int, keys: np.ndarray) -> np.ndarray:
+    # Keyed bijection on [0, 2**(2*half_bits)): a Feistel network over two halves
+    mask = np.uint64((1 << half_bits) - 1)
+    left = x >> np.uint64(half_bits)
+    right = x & mask
+    for key in keys:
+        f = ((right * np.uint64(0x9E3779B1) + key) ^ (right >> np.uint64(5))) & mask
+        left, right = right, left ^ f
+    return (left << np.uint64(half_bits)) | right
+
+def _permutation_keys(rng: np.random.Generator, span: int) -> tuple[int, np.ndarray]:
+    half_bits = max(1, ((span - 1).bit_length() + 1) // 2)
+    return half_bits, rng.integers(0, 1 << half_bits, size=4, dtype=np.uint64)
+
+def _permute(indexes: np.ndarray, span: int, half_bits: int, keys: np.ndarray) -> np.ndarray:
+    # Cycle-walking: values that land outside [0, span) are permuted again until they fall inside
+    codes = _feistel(indexes.astype(np.uint64), half_bits, keys)
+    outside = codes >= span
+    while outside.any():
+        codes[outside] = _feistel(codes[outside], half_bits, keys)
+        outside = codes >= span
+    return codes.astype(np.int64)
+
+def _unique_passport_codes(rng: np.random.Generator,
+                           n: int,
+                           start: int = 0,
+                           stop: int = _PASSPORT_NUMBER_SPACE) -> np.ndarray:
+    """
+    n distinct integers in [start, stop) with no retries: the range 0..n-1 is pushed through a
+    keyed permutation of [0, stop - start) (a Feistel network with cycle-walking), so the codes
+    look random while staying unique by construction.
+    """
+    span = stop - start
+    if n > span:
+        raise ValueError(f"Cannot draw {n} unique passport numbers from a range of {span}")
+    half_bits, keys = _permutation_keys(rng, span)
+    return _permute(np.arange(n, dtype=np.uint64), span, half_bits, keys) + start
+
+def _passport_identities(rng: np.random.Generator,
+                         n: int,
+                         name_seed: int | None,
+                         name_pool_size: int,
+                         exact_names: bool) -> Dict[str, np.ndarray]:
+    countries, locales, probs = _country_locale_table()
+    rows = rng.choice(len(probs), size=n, p=probs)
+
+    # Group rows by locale through integer codes so each locale's names are drawn once
+    names = np.empty(n, dtype=object)
+    unique_locales, locale_codes = np.unique(locales, return_inverse=True)
+    row_locales = locale_codes[rows]
+    order = np.argsort(row_locales, kind="stable")
+    starts = np.searchsorted(row_locales[order], np.arange(len(unique_locales) + 1))
+    for code, locale in enumerate(unique_locales):
+        group = order[starts[code]:starts[code + 1]]
+        if not len(group):
+            continue
+        if exact_names:
+            f = _new_faker(locale, int(rng.integers(0, 2 ** 63)))
+            names[group] = [f.name() for _ in range(len(group))]
+        else:
+            pool = _name_pool(locale, name_pool_size, name_seed)
+            names[group] = pool[rng.integers(0, len(pool), size=len(group))]
+    return {"name": names, "country": countries[rows]}
+
+def _passport_columns(rng: np.random.Generator,
+                      n: int,
+                      start: int,
+                      stop: int,
+                      name_seed: int | None,
+                      name_pool_size: int,
+                      exact_names: bool) -> Dict[str, np.ndarray]:
+    identities = _passport_identities(rng, n, name_seed, name_pool_size, exact_names)
+    return {
+        "passport_number": _encode_base36(_unique_passport_codes(rng, n, start, stop)),
+        **identities,
+    }
+
+def _generate_shard(shard: tuple) -> Dict[str, np.ndarray]:
+    n, seed_sequence, start, stop, name_pool_size, exact_names = shard
+    rng = np.random.default_rng(seed_sequence)
+    name_seed = int(seed_sequence.generate_state(1)[0])
+    return _passport_columns(rng, n, start, stop, name_seed, name_pool_size, exact_names)
+
+def generate_passport_columns(n: int,
+                              seed: int | None = None,
+                              name_pool_size: int = 2000,
+                              workers: int = 1,
+                              exact_names: bool = False) -> Dict[str, np.ndarray]:
+    """
+    Bulk passport generator. Returns a dict of arrays (passport_number, name, country).
+    Countries and locales follow the same distribution as pick_country, names are sampled
+    from per-locale pools of `name_pool_size` Faker names built once (or one Faker.name()
+    per row with exact_names=True), and passport numbers are base-36 encodings of a
+    permuted integer range, unique without retries.
+
+    With workers > 1, n is split across processes. Each worker gets its own seed stream
+    spawned from SeedSequence(seed), its own Faker instances and a disjoint slice of the
+    passport-number space, so shards need no cross-worker dedup and are merged in order.
+    Output is reproducible for a given seed and worker count.
+    """
+    with metrics.timed("sim.passports", rows=n):
+        if workers <= 1:
+            rng = np.random.default_rng(seed)
+            return _passport_columns(rng, n, 0, _PASSPORT_NUMBER_SPACE, seed, name_pool_size, exact_names)
+        return _generate_passport_columns_parallel(n, seed, name_pool_size, workers, exact_names)
+
+def _generate_passport_columns_parallel(n: int,
+                                        seed: int | None,
+                                        name_pool_size: int,
+                                        workers: int,
+                                        exact_names: bool) -> Dict[str, np.ndarray]:
+    sizes = [len(part) for part in np.array_split(np.arange(n), workers)]
+    bounds = [_PASSPORT_NUMBER_SPACE * w // workers for w in range(workers + 1)]
+    seeds = np.random.SeedSequence(seed).spawn(workers)
+    shards = [(sizes[w], seeds[w], bounds[w], bounds[w + 1], name_pool_size, exact_names)
+              for w in range(workers)]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(_generate_shard, shards))
+    return {column: np.concatenate([result[column] for result in results]) for column in results[0]}
+
+def generate_passports_list(n: int,
+                            seed: int | None = None,
+                            workers: int = 1,
+                            exact_names: bool = False) -> List[Dict[str, str]]:
+    """
+    Return a list of dicts with unique passport numbers.
+    """
+    columns = generate_passport_columns(n, seed=seed, workers=workers, exact_names=exact_names)
+    keys = list(columns)
+    return [dict(zip(keys, values)) for values in zip(*(columns[key].tolist() for key in keys))]
+
+class PassportNumbers:
+    """
+    The passport numbers of a population of n passports, computed from the passport index instead of stored:
+    index i maps to the base-36 encoding of a keyed permutation of i, so numbers are unique, reproducible for
+    a seed and cost no memory. Indexing with an array of indexes returns the numbers as an array, which lets
+    the ticket simulation draw passengers from populations too large to hold as strings.
+    """
+    def __init__(self, n: int, seed: int):
+        if n > _PASSPORT_NUMBER_SPACE:
+            raise ValueError(f"Cannot draw {n} unique passport numbers from a range of {_PASSPORT_NUMBER_SPACE}")
+        self.n = n
+        self.size = n
+        rng = np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(0,)))
+        self._half_bits, self._keys = _permutation_keys(rng, _PASSPORT_NUMBER_SPACE)
+
+    def __len__(self) -> int:
+        return self.n
+
+    def __getitem__(self, indexes) -> np.ndarray:
+        indexes = np.atleast_1d(np.asarray(indexes, dtype=np.int64))
+        return _encode_base36(_permute(indexes, _PASSPORT_NUMBER_SPACE, self._half_bits, self._keys))
+
+def iter_passport_chunks(n: int,
+                         seed: int,
+                         chunk_size: int = 500000,
+                         name_pool_size: int = 2000):
+    """
+    Generates n passports as consecutive chunks of columns (passport_number, name, country), one chunk in
+    memory at a time. Passport numbers come from PassportNumbers(n, seed) and chunk k draws its countries
+    and names from its own seed stream, so the output depends only on n, seed and chunk_size.
+    """
+    numbers = PassportNumbers(n, seed)
+    for index, start in enumerate(range(0, n, chunk_size)):
+        stop = min(start + chunk_size, n)
+        with metrics.timed("sim.passports", rows=stop - start):
+            rng = np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(1, index)))
+            identities = _passport_identities(rng, stop - start, seed, name_pool_size, exact_names=False)
+            yield {"passport_number": numbers[np.arange(start, stop)], **identities}
+
+def main(n=1000000, workers=1):
+    return generate_passports_list(n = n, workers = workers)
 
 if __name__ == "__main__":
     data = main(n = 10)
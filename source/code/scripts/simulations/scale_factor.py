@@ -0,0 +1,297 @@
+import argparse
+import hashlib
+import numpy as np
+from pathlib import Path
+from typing import Dict, Iterator, List
+from utils import columnar, metrics
+from utils.timestamps import utc_offsets
+from utils.orchestrator import load_json_file
+from utils.path_config import FILES_DIR
+from scripts.simulations import flights_tickets, passport
+
+# TPC-style scale factors: SF=1 is the current volume (passport.main's 1M passports and 61 days of CPH departures),
+# every size grows linearly with SF and fractional SFs (e.g. 0.01) give small, consistent samples.
+PASSPORTS_PER_SF = 1_000_000
+DAYS_PER_SF = 61
+FLIGHTS_PER_DAY = 380
+START_DATE = np.datetime64("2025-07-01T00:00:00", "s")
+DEFAULT_SEED = 2025
+AIRCRAFT_MODELS_FILE = "aircraft_models_structured_full.json"
+SCALE_FACTOR_DIR = FILES_DIR / "scale_factor"
+
+# Rows generated per seed stream. Fixed (not the writers' batch size) so the data only depends on SF and seed
+PASSPORT_CHUNK = 500_000
+FLIGHT_CHUNK = 50_000
+
+# Departures are spread evenly between 05:30 and 23:30 local time, on 5-minute slots
+FIRST_DEPARTURE_MINUTE = 5 * 60 + 30
+DEPARTURE_SPAN_MINUTES = 18 * 60
+CANCELLED_SHARE = 0.015
+ON_TIME_SHARE = 0.55
+MEAN_DELAY_MINUTES = 15
+
+# (name, IATA, ICAO, registration prefix, share of departures)
+AIRLINES = [
+    ("SAS", "SK", "SAS", "OY", 0.35),
+    ("Norwegian Air Sweden", "D8", "NSZ", "SE", 0.12),
+    ("Lufthansa", "LH", "DLH", "D", 0.06),
+    ("KLM", "KL", "KLM", "PH", 0.05),
+    ("easyJet", "U2", "EZY", "G", 0.05),
+    ("Ryanair", "FR", "RYR", "EI", 0.05),
+    ("Air France", "AF", "AFR", "F", 0.04),
+    ("British Airways", "BA", "BAW", "G", 0.04),
+    ("Finnair", "AY", "FIN", "OH", 0.04),
+    ("Wizz Air", "W6", "WZZ", "HA", 0.03),
+    ("Turkish Airlines", "TK", "THY", "TC", 0.03),
+    ("Vueling", "VY", "VLG", "EC", 0.03),
+    ("Swiss", "LX", "SWR", "HB", 0.03),
+    ("Emirates", "EK", "UAE", "A6", 0.02),
+    ("Qatar Airways", "QR", "QTR", "A7", 0.02),
+    ("Icelandair", "FI", "ICE", "TF", 0.02),
+    ("Brussels Airlines", "SN", "BEL", "OO", 0.02),
+]
+
+# (name, IATA, ICAO) as in the AeroDataBox departures payload
+DESTINATIONS = [
+    ("London", "LHR", "EGLL"), ("Oslo", "OSL", "ENGM"), ("Stockholm", "ARN", "ESSA"), ("Amsterdam", "AMS", "EHAM"),
+    ("Paris", "CDG", "LFPG"), ("Frankfurt", "FRA", "EDDF"), ("Berlin", "BER", "EDDB"), ("Helsinki", "HEL", "EFHK"),
+    ("Munich", "MUC", "EDDM"), ("Zurich", "ZRH", "LSZH"), ("Brussels", "BRU", "EBBR"), ("Aalborg", "AAL", "EKYY"),
+    ("Aarhus", "AAR", "EKAH"), ("Billund", "BLL", "EKBI"), ("Bergen", "BGO", "ENBR"), ("Gothenburg", "GOT", "ESGG"),
+    ("Reykjavik", "KEF", "BIKF"), ("Istanbul", "IST", "LTFM"), ("Dubai", "DXB", "OMDB"), ("Doha", "DOH", "OTHH"),
+    ("Barcelona", "BCN", "LEBL"), ("Madrid", "MAD", "LEMD"), ("Rome", "FCO", "LIRF"), ("Milan", "MXP", "LIMC"),
+    ("Vienna", "VIE", "LOWW"), ("Warsaw", "WAW", "EPWA"), ("Prague", "PRG", "LKPR"), ("Budapest", "BUD", "LHBP"),
+    ("Nice", "NCE", "LFMN"), ("Palma de Mallorca", "PMI", "LEPA"), ("Malaga", "AGP", "LEMG"), ("Athens", "ATH", "LGAV"),
+    ("Lisbon", "LIS", "LPPT"), ("Dublin", "DUB", "EIDW"), ("Manchester", "MAN", "EGCC"), ("Edinburgh", "EDI", "EGPH"),
+    ("New York", "JFK", "KJFK"), ("Chicago", "ORD", "KORD"), ("Bangkok", "BKK", "VTBS"), ("Tokyo", "NRT", "RJAA"),
+]
+
+GATE_PIERS = np.array(["A", "B", "C", "D", "F"])
+REGISTRATION_LETTERS = np.array(list("ABCDEFGHIJKLMNOPQRSTUVWXYZ"))
+
+# Dataset -> module in scripts.upserts whose FIELDS_DICT describes its table, in load order
+DATASETS = {
+    "aircraft_models": "upsert_aircraft_models",
+    "passports": "upsert_passport",
+    "flights": "upsert_flights",
+    "tickets": "upsert_tickets",
+}
+
+def dataset_sizes(sf: float) -> Dict[str, int]:
+    """
+    Passports and flights for a scale factor. Flights keep a realistic daily density (FLIGHTS_PER_DAY),
+    so a larger SF covers a longer period; tickets follow from the simulated occupancy, about 140 per flight.
+    """
+    if sf <= 0:
+        raise ValueError(f"Scale factor must be positive, got {sf}")
+    return {
+        "passports": max(1, round(PASSPORTS_PER_SF * sf)),
+        "flights": max(1, round(DAYS_PER_SF * FLIGHTS_PER_DAY * sf)),
+    }
+
+def _seed_stream(seed: int, *key: int) -> np.random.Generator:
+    return np.random.default_rng(np.random.SeedSequence(seed, spawn_key=key))
+
+def load_aircraft_models() -> List[Dict]:
+    """
+    The aircraft models reference table. Like TPC-H's nation and region tables it is the same at every SF.
+    """
+    return load_json_file(FILES_DIR, AIRCRAFT_MODELS_FILE)
+
+def _passenger_models(models: List[Dict]) -> tuple[np.ndarray, np.ndarray]:
+    # Freighters and business jets carry no ticketed passengers; narrow-bodies fly most departures
+    models = [model for model in models if (model.get("seats") or 0) >= 30]
+    names = np.array([model["aircraft_model"] for model in models], dtype=object)
+    seats = np.array([model["seats"] for model in models], dtype=np.int64)
+    weights = np.where(seats <= 240, 4.0, 1.0)
+    return names, weights / weights.sum()
+
+def _flight_chunk(seed: int,
+                  index: int,
+                  start: int,
+                  stop: int,
+                  model_names: np.ndarray,
+                  model_weights: np.ndarray) -> Dict[str, np.ndarray]:
+    rng = _seed_stream(seed, 2, index)
+    n = stop - start
+    flight_index = np.arange(start, stop, dtype=np.int64)
+    day, slot = np.divmod(flight_index, FLIGHTS_PER_DAY)
+    minute = FIRST_DEPARTURE_MINUTE + slot * DEPARTURE_SPAN_MINUTES // FLIGHTS_PER_DAY
+    scheduled_local = (START_DATE + day.astype("timedelta64[D]")
+                       + (minute - minute % 5).astype("timedelta64[m]")).astype("datetime64[s]")
+    scheduled_utc = scheduled_local - utc_offsets(scheduled_local, local=True)
+
+    airline = rng.choice(len(AIRLINES), size=n, p=np.array([a[4] for a in AIRLINES]) / sum(a[4] for a in AIRLINES))
+    destination = rng.integers(0, len(DESTINATIONS), size=n)
+    model = rng.choice(len(model_names), size=n, p=model_weights)
+    cancelled = rng.random(n) < CANCELLED_SHARE
+    delay = np.where(rng.random(n) < ON_TIME_SHARE, 0, rng.exponential(MEAN_DELAY_MINUTES, size=n)).astype(np.int64)
+    taxi = rng.integers(8, 21, size=n)
+    revised_utc = scheduled_utc + delay.astype("timedelta64[m]")
+    runway_utc = revised_utc + taxi.astype("timedelta64[m]")
+    runway_utc[cancelled] = np.datetime64("NaT")
+
+    airlines = np.array(AIRLINES, dtype=object)[airline]
+    destinations = np.array(DESTINATIONS, dtype=object)[destination]
+    registration = np.char.add(np.char.add(airlines[:, 3].astype(str), "-"),
+                               np.char.add(np.char.add(REGISTRATION_LETTERS[rng.integers(0, 26, size=n)],
+                                                       REGISTRATION_LETTERS[rng.integers(0, 26, size=n)]),
+                                           REGISTRATION_LETTERS[rng.integers(0, 26, size=n)]))
+    return {
+        # Stable across runs like the md5 transaction_id of the API cleaner, but keyed by seed and flight index
+        "transaction_id": np.array([hashlib.md5(f"sf:{seed}:{i}".encode("ascii")).hexdigest()
+                                    for i in range(start, stop)], dtype=object),
+        "flight_number": np.char.add(np.char.add(airlines[:, 1].astype(str), " "),
+                                     rng.integers(100, 3000, size=n).astype(str)),
+        "scheduled_utc": scheduled_utc,
+        "airline": airlines[:, 0],
+        "airline_iata": airlines[:, 1],
+        "airline_icao": airlines[:, 2],
+        "destination": destinations[:, 0],
+        "destination_iata": destinations[:, 1],
+        "destination_icao": destinations[:, 2],
+        "scheduled_local": scheduled_local,
+        "revised_utc": revised_utc,
+        "revised_local": revised_utc + utc_offsets(revised_utc, local=False),
+        "runway_utc": runway_utc,
+        "runway_local": runway_utc + utc_offsets(runway_utc, local=False),
+        "status": np.where(cancelled, "Canceled", "Departed").astype(object),
+        "terminal": np.where(rng.random(n) < 0.7, "3", "2").astype(object),
+        "gate": np.char.add(GATE_PIERS[rng.integers(0, len(GATE_PIERS), size=n)],
+                            rng.integers(1, 40, size=n).astype(str)),
+        "aircraft_model": model_names[model],
+        "aircraft_reg": registration,
+    }
+
+def iter_aircraft_models(sf: float, seed: int = DEFAULT_SEED) -> Iterator[Dict[str, list]]:
+    models = load_aircraft_models()
+    yield {column: [model.get(column) for model in models] for column in models[0]}
+
+def iter_passports(sf: float, seed: int = DEFAULT_SEED) -> Iterator[Dict[str, np.ndarray]]:
+    """
+    Passports as chunks of columns; numbers are those of passport.PassportNumbers(n, seed), which the tickets use.
+    """
+    yield from passport.iter_passport_chunks(dataset_sizes(sf)["passports"], seed=seed, chunk_size=PASSPORT_CHUNK)
+
+def iter_flights(sf: float, seed: int = DEFAULT_SEED) -> Iterator[Dict[str, np.ndarray]]:
+    """
+    Synthetic departures in the shape of the flights table, generated offline in chronological chunks:
+    airline, destination and aircraft model are drawn from fixed pools and the aircraft models table,
+    times are wall-clock local (Europe/Copenhagen) with matching UTC, about 1.5% of flights are cancelled.
+    """
+    n = dataset_sizes(sf)["flights"]
+    model_names, model_weights = _passenger_models(load_aircraft_models())
+    chunks = (_flight_chunk(seed, index, start, min(start + FLIGHT_CHUNK, n), model_names, model_weights)
+              for index, start in enumerate(range(0, n, FLIGHT_CHUNK)))
+    yield from metrics.timed_iter("sim.flights", chunks, count=lambda chunk: len(chunk["transaction_id"]))
+
+def iter_tickets(sf: float, seed: int = DEFAULT_SEED):
+    """
+    Tickets simulated by flights_tickets on the flights of iter_flights and the passports of iter_passports,
+    as Arrow record batches. Only the four flight columns the simulation reads are kept in memory,
+    and passport numbers are computed from the passenger indexes instead of being loaded.
+    """
+    sizes = dataset_sizes(sf)
+    flights = {"transaction_id": [], "status": [], "scheduled_local": [], "seats": []}
+    seats_by_model = {model["aircraft_model"]: model["seats"] for model in load_aircraft_models()}
+    for chunk in iter_flights(sf, seed):
+        for column in ("transaction_id", "status", "scheduled_local"):
+            flights[column].append(chunk[column])
+        flights["seats"].append(np.array([seats_by_model[model] for model in chunk["aircraft_model"]], dtype=np.int64))
+    flights = {column: np.concatenate(parts) for column, parts in flights.items()}
+    ticket_seed = int(np.random.SeedSequence(seed, spawn_key=(3,)).generate_state(1)[0])
+    yield from flights_tickets.iter_ticket_batches(flights,
+                                                   passport.PassportNumbers(sizes["passports"], seed),
+                                                   force_fill=True,
+                                                   seed=ticket_seed)
+
+GENERATORS = {
+    "aircraft_models": iter_aircraft_models,
+    "passports": iter_passports,
+    "flights": iter_flights,
+    "tickets": iter_tickets,
+}
+
+def write_parquet(sf: float,
+                  seed: int = DEFAULT_SEED,
+                  out_dir: Path = None,
+                  datasets: List[str] = None) -> Dict[str, int]:
+    """
+    Streams each dataset to <out_dir>/<dataset>.parquet (default resource/scale_factor/sf<SF>/),
+    one chunk in memory at a time. Returns the rows written per dataset.
+    """
+    out_dir = Path(out_dir or SCALE_FACTOR_DIR / f"sf{sf:g}")
+    rows = {}
+    for name in datasets or DATASETS:
+        path = out_dir / f"{name}.parquet"
+        rows[name] = columnar.write_parquet(GENERATORS[name](sf, seed), path)
+        print(f"💾 {name}: {rows[name]:,} rows → {path}")
+    return rows
+
+def load_db(sf: float,
+            seed: int = DEFAULT_SEED,
+            db_name: str = "cph_airport",
+            schema_name: str = "cph_airport",
+            datasets: List[str] = None,
+            chunk_size: int = 100000,
+            create_table_if_not_exist: bool = False) -> Dict[str, int]:
+    """
+    Streams each dataset straight into its warehouse table through COPY, in batches of `chunk_size` rows
+    written while the next batch is generated. Tables have the structure of the pipeline's upserts
+    (their FIELDS_DICT); point `schema_name` at a scratch schema to keep scaled data apart from the real load.
+    row_hash columns are left empty, so a later pipeline run rewrites any overlapping rows.
+    """
+    from scripts import upserts
+    from utils.orchestrator import ensure_table_structure, update_insert_dw_batches
+    rows = {}
+    for name in datasets or DATASETS:
+        fields_dict = getattr(upserts, DATASETS[name]).FIELDS_DICT
+        table_name = name
+        test_table_structure = ensure_table_structure(db_name=db_name,
+                                                      schema_name=schema_name,
+                                                      table_name=table_name,
+                                                      fields_dict=fields_dict,
+                                                      create_table_if_not_exist=create_table_if_not_exist)
+        if not test_table_structure:
+            raise RuntimeError(f"Table '{schema_name}.{table_name}' does not exist or has incorrect structure.")
+        pk = [col for col, config in fields_dict.items() if isinstance(config, dict) and config.get("primary_key", False)]
+        update_fields = [col for col in fields_dict if col not in pk and col != "row_hash"]
+        rows[name] = update_insert_dw_batches(db_name=db_name,
+                                              schema=schema_name,
+                                              table=table_name,
+                                              batches=columnar.rebatch_tables(GENERATORS[name](sf, seed), chunk_size),
+                                              pk=pk,
+                                              update_fields=update_fields,
+                                              not_included_in_update_fields=[],
+                                              method='copy')
+        print(f"✅ {name}: {rows[name]:,} rows → {schema_name}.{table_name}")
+    return rows
+
+def main(sf: float = 1,
+         seed: int = DEFAULT_SEED,
+         target: str = "parquet",
+         out_dir: Path = None,
+         datasets: List[str] = None,
+         **db_options) -> Dict[str, int]:
+    sizes = dataset_sizes(sf)
+    print(f"🔄 SF {sf:g} (seed {seed}): {sizes['passports']:,} passports, {sizes['flights']:,} flights")
+    if target == "parquet":
+        return write_parquet(sf, seed=seed, out_dir=out_dir, datasets=datasets)
+    return load_db(sf, seed=seed, datasets=datasets, **db_options)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate seeded CPH datasets at a TPC-style scale factor.")
+    parser.add_argument("--sf", type=float, default=1, help="scale factor; 1 = current volume (default 1)")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED, help=f"dataset seed (default {DEFAULT_SEED})")
+    parser.add_argument("--to", dest="target", choices=("parquet", "db"), default="parquet",
+                        help="write Parquet files or load the warehouse tables")
+    parser.add_argument("--out", help="output directory for Parquet (default resource/scale_factor/sf<SF>)")
+    parser.add_argument("--dataset", action="append", dest="datasets", choices=list(DATASETS),
+                        help="generate only this dataset (repeatable)")
+    parser.add_argument("--db", default="cph_airport", help="database for --to db")
+    parser.add_argument("--schema", default="cph_airport", help="schema for --to db")
+    parser.add_argument("--create-tables", action="store_true", help="create missing tables for --to db")
+    args = parser.parse_args()
+    db_options = {}
+    if args.target == "db":
+        db_options = {"db_name": args.db, "schema_name": args.schema, "create_table_if_not_exist": args.create_tables}
+    main(sf=args.sf, seed=args.seed, target=args.target, out_dir=args.out, datasets=args.datasets, **db_options)
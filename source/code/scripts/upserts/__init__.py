@@ -1,5 +1,19 @@
-from .upsert_aircraft_models import main
-from .upsert_airports import main
-from .upsert_flights import main
-from .upsert_passport import main
-from .upsert_tickets import main
\ No newline at end of file
+import importlib
+
+# Upsert modules are imported on first attribute access (PEP 562), so running one step
+# does not import the dependencies of the others (Faker, requests, NumPy simulations, ...)
+__all__ = [
+    "upsert_aircraft_models",
+    "upsert_airports",
+    "upsert_flights",
+    "upsert_passport",
+    "upsert_tickets",
+]
+
+def __getattr__(name: str):
+    if name in __all__:
+        return importlib.import_module(f".{name}", __name__)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
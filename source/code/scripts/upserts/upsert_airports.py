@@ -1,10 +1,14 @@
-from utils.orchestrator import update_insert_dw, ensure_table_structure
+from utils.orchestrator import ensure_table_structure, rebatch, update_insert_dw_batches
 from utils.db_types import TEXT, TIMESTAMP, Numeric, BIGINT
 from scripts.api import airports_api
 from datetime import datetime
 
-def upsert(create_table_if_not_exist=False):
-    flights = airports_api.main()
+def upsert(create_table_if_not_exist=False, chunk_size=5000, method="export"):
+    """
+    Streams airports from the API straight into the table in batches of `chunk_size`,
+    so loading starts while the download is still running. Rows whose row_hash matches the stored one
+    are left untouched. Returns the inserted/updated/unchanged counts.
+    """
     db_name='cph_airport'
     schema_name='cph_airport'
     table_name='airports'
@@ -19,26 +23,32 @@ def upsert(create_table_if_not_exist=False):
         "world_area_code": {"type": BIGINT()},
         "city_name_geo_name_id": {"type": BIGINT()},
         "country_name_geo_name_id": {"type": BIGINT()},
+        "row_hash": {"type": TEXT()},
     }
     test_table_structure = ensure_table_structure(db_name=db_name,
                                 schema_name=schema_name,
                                 table_name=table_name,
                                 fields_dict=fields_dict,
-                                create_table_if_not_exist=create_table_if_not_exist)
+                                create_table_if_not_exist=create_table_if_not_exist,
+                                add_missing_columns=True)
     if not test_table_structure:
         raise RuntimeError(f"Table '{schema_name}.{table_name}' does not exist or has incorrect structure.")
     
     pk = [col for col, config in fields_dict.items() if isinstance(config, dict) and config.get("primary_key", False)]
-    update_fields = [col for col in fields_dict if col not in pk]
-    update_insert_dw(db_name=db_name,
-                     schema=schema_name,
-                     table=table_name,
-                     new_data=flights,
-                     pk=pk,
-                     update_fields=update_fields,
-                     not_included_in_update_fields=[])
-    
-    return flights
+    update_fields = [col for col in fields_dict if col not in pk and col != "row_hash"]
+    airports = airports_api.iter_airports(method=method)
+    counts = update_insert_dw_batches(db_name=db_name,
+                                      schema=schema_name,
+                                      table=table_name,
+                                      batches=rebatch([airports], chunk_size),
+                                      pk=pk,
+                                      update_fields=update_fields,
+                                      not_included_in_update_fields=[],
+                                      method='copy',
+                                      row_hash_column="row_hash",
+                                      return_counts=True)
+    print(f"✅ Airports: {counts['inserted']} inserted, {counts['updated']} updated, {counts['unchanged']} unchanged")
+    return counts
 
 def main(create_table_if_not_exist=False):
     return upsert(create_table_if_not_exist=create_table_if_not_exist)
@@ -1,59 +1,195 @@
-from utils.orchestrator import update_insert_dw, ensure_table_structure
+from utils.orchestrator import update_insert_dw, ensure_table_structure, get_data_from_db, compute_row_hash, get_watermark, set_watermark
 from utils.db_types import TEXT, TIMESTAMP
 from scripts.api import flights_api
-from datetime import datetime
+from utils import timestamps
+from classes.db_engine import DatabaseEngine
+from sqlalchemy import text
+from datetime import datetime, timedelta
+
+WATERMARK_SOURCE = "aerodatabox"
+
+# SQL counterpart of flights_api.generate_transaction_id, used to re-key rows stored under the old key
+TRANSACTION_ID_SQL = ("md5(coalesce(flight_number, '') || '_' || "
+                      "coalesce(to_char(scheduled_utc, 'YYYY-MM-DD HH24:MI:SS'), '') || '_' || "
+                      "coalesce(airline_iata, ''))")
+
+FIELDS_DICT = {
+    "transaction_id": {"type": TEXT(), "primary_key": True, "autoincrement": False},
+    "flight_number": {"type": TEXT()},
+    "scheduled_utc": {"type": TIMESTAMP()}, 
+    "airline": {"type": TEXT()},
+    "airline_iata": {"type": TEXT()},
+    "airline_icao": {"type": TEXT()},
+    "destination": {"type": TEXT()},
+    "destination_iata": {"type": TEXT()},
+    "destination_icao": {"type": TEXT()},
+    "scheduled_local": {"type": TIMESTAMP()},
+    "revised_utc": {"type": TIMESTAMP()},
+    "revised_local": {"type": TIMESTAMP()},
+    "runway_utc": {"type": TIMESTAMP()},
+    "runway_local": {"type": TIMESTAMP()},
+    "status": {"type": TEXT()},
+    "terminal": {"type": TEXT()},
+    "gate": {"type": TEXT()},
+    "aircraft_model": {"type": TEXT()},
+    "aircraft_reg": {"type": TEXT()},
+    "row_hash": {"type": TEXT()},
+}
+
+def floor_to_window(dt: datetime) -> datetime:
+    """Rounds down to the start of the 12-hour fetch window (00:00 or 12:00) containing `dt`."""
+    return dt.replace(hour=0 if dt.hour < 12 else 12, minute=0, second=0, microsecond=0)
+
+def migrate_transaction_ids(db_name: str,
+                            schema_name: str,
+                            table_name: str = "flights",
+                            tickets_table: str = "tickets") -> int:
+    """
+    One-off re-keying of flights stored under the old transaction_id, which also hashed status, gate and terminal,
+    so a flight was stored again every time one of them changed. Of the rows sharing a stable key, the one furthest
+    along (latest runway time, then revised time) keeps it and the others are deleted. Tickets move to their flight's
+    new key (unique_id included) and tickets of deleted duplicates are deleted. Runs in one transaction and does
+    nothing once every row carries its stable key. Returns the number of flight rows re-keyed or deleted.
+    """
+    engine = DatabaseEngine(db=db_name, server=None, username=None, password=None).get_engine()
+    flights = f"{schema_name}.{table_name}"
+    with engine.begin() as connection:
+        stale = connection.execute(text(f"SELECT count(*) FROM {flights} WHERE transaction_id <> {TRANSACTION_ID_SQL}")).scalar()
+        if not stale:
+            return 0
+        connection.execute(text(f"""
+            CREATE TEMPORARY TABLE flight_rekey ON COMMIT DROP AS
+            SELECT transaction_id AS old_id,
+                   {TRANSACTION_ID_SQL} AS new_id,
+                   row_number() OVER (PARTITION BY {TRANSACTION_ID_SQL}
+                                      ORDER BY runway_utc DESC NULLS LAST, revised_utc DESC NULLS LAST,
+                                               transaction_id) AS rank
+            FROM {flights}
+        """))
+        if connection.execute(text("SELECT to_regclass(:name)"), {"name": f"{schema_name}.{tickets_table}"}).scalar():
+            tickets = f"{schema_name}.{tickets_table}"
+            connection.execute(text(f"""
+                DELETE FROM {tickets} t USING flight_rekey m
+                WHERE t.transaction_id = m.old_id AND m.rank > 1
+            """))
+            connection.execute(text(f"""
+                UPDATE {tickets} t
+                SET transaction_id = m.new_id,
+                    unique_id = m.new_id || substr(t.unique_id, length(m.old_id) + 1)
+                FROM flight_rekey m
+                WHERE t.transaction_id = m.old_id AND m.rank = 1 AND m.old_id <> m.new_id
+            """))
+        deleted = connection.execute(text(f"""
+            DELETE FROM {flights} f USING flight_rekey m
+            WHERE f.transaction_id = m.old_id AND m.rank > 1
+        """)).rowcount
+        rekeyed = connection.execute(text(f"""
+            UPDATE {flights} f SET transaction_id = m.new_id
+            FROM flight_rekey m
+            WHERE f.transaction_id = m.old_id AND m.rank = 1 AND m.old_id <> m.new_id
+        """)).rowcount
+    print(f"🔁 Re-keyed {rekeyed} flights to their stable transaction_id and removed {deleted} duplicates")
+    return rekeyed + deleted
 
 def upsert(create_table_if_not_exist=False,
            dt_from= datetime(2025, 7, 1),
-           days = 61):
-    flights = flights_api.main(dt_from= dt_from,
-                              days = days)
+           days = 61,
+           incremental=False,
+           recheck_hours=48,
+           dt_to=None,
+           code="CPH",
+           direction="Departure"):
+    """
+    Full mode fetches `days` days from `dt_from`. Incremental mode fetches from the stored watermark
+    minus a trailing `recheck_hours` window (flights there may still change status) up to `dt_to`,
+    by default the start of the current 12-hour window, and moves the watermark forward on success.
+    The first incremental run, with no watermark yet, backfills from `dt_from`.
+    `dt_from` and `dt_to` are airport-local times, as the API takes them; the watermark is stored as UTC.
+    Only rows whose row_hash differs from the stored one are upserted. Flights are keyed on number, scheduled time
+    and airline, so a status or gate change in the re-checked window updates the flight's row.
+    """
     db_name='cph_airport'
     schema_name='cph_airport'
     table_name='flights'
-    fields_dict = {
-        "transaction_id": {"type": TEXT(), "primary_key": True, "autoincrement": False},
-        "flight_number": {"type": TEXT()},
-        "scheduled_utc": {"type": TIMESTAMP()}, 
-        "airline": {"type": TEXT()},
-        "airline_iata": {"type": TEXT()},
-        "airline_icao": {"type": TEXT()},
-        "destination": {"type": TEXT()},
-        "destination_iata": {"type": TEXT()},
-        "destination_icao": {"type": TEXT()},
-        "scheduled_local": {"type": TIMESTAMP()},
-        "revised_utc": {"type": TIMESTAMP()},
-        "revised_local": {"type": TIMESTAMP()},
-        "runway_utc": {"type": TIMESTAMP()},
-        "runway_local": {"type": TIMESTAMP()},
-        "status": {"type": TEXT()},
-        "terminal": {"type": TEXT()},
-        "gate": {"type": TEXT()},
-        "aircraft_model": {"type": TEXT()},
-        "aircraft_reg": {"type": TEXT()},
-    }
     test_table_structure = ensure_table_structure(db_name=db_name,
                                 schema_name=schema_name,
                                 table_name=table_name,
-                                fields_dict=fields_dict,
-                                create_table_if_not_exist=create_table_if_not_exist)
+                                fields_dict=FIELDS_DICT,
+                                create_table_if_not_exist=create_table_if_not_exist,
+                                add_missing_columns=True)
     if not test_table_structure:
         raise RuntimeError(f"Table '{schema_name}.{table_name}' does not exist or has incorrect structure.")
-    
-    pk = [col for col, config in fields_dict.items() if isinstance(config, dict) and config.get("primary_key", False)]
-    update_fields = [col for col in fields_dict if col not in pk]
-    update_insert_dw(db_name=db_name,
-                     schema=schema_name,
-                     table=table_name,
-                     new_data=flights,
-                     pk=pk,
-                     update_fields=update_fields,
-                     not_included_in_update_fields=[])
-    
+    migrate_transaction_ids(db_name=db_name, schema_name=schema_name, table_name=table_name)
+
+    if incremental:
+        watermark = get_watermark(db_name=db_name,
+                                  schema_name=schema_name,
+                                  source=WATERMARK_SOURCE,
+                                  code=code,
+                                  direction=direction,
+                                  create_table_if_not_exist=True)
+        # Fetch windows are in the airport's local time, as AeroDataBox takes them; the watermark is stored in UTC
+        dt_to = dt_to or floor_to_window(datetime.now(timestamps.AIRPORT_TIMEZONE).replace(tzinfo=None))
+        if watermark is not None:
+            dt_from = floor_to_window(timestamps.utc_to_local(watermark) - timedelta(hours=recheck_hours))
+        if dt_from >= dt_to:
+            print(f"✅ Flights already loaded up to {watermark} UTC, nothing to fetch")
+            return []
+        print(f"📡 Incremental fetch {dt_from} → {dt_to} (watermark: {watermark})")
+        flights = flights_api.main(dt_from=dt_from,
+                                   dt_to=dt_to,
+                                   code=code,
+                                   direction=direction,
+                                   raise_on_error=True)
+    else:
+        flights = flights_api.main(dt_from= dt_from,
+                                  days = days,
+                                  code=code,
+                                  direction=direction)
+
+    pk = [col for col, config in FIELDS_DICT.items() if isinstance(config, dict) and config.get("primary_key", False)]
+    update_fields = [col for col in FIELDS_DICT if col not in pk and col != "row_hash"]
+    for flight in flights:
+        flight["row_hash"] = compute_row_hash(flight, update_fields)
+
+    existing_hashes = {}
+    if flights:
+        existing = get_data_from_db(db_name=db_name,
+                                    sql_query=f"""
+                                        SELECT transaction_id, row_hash FROM {schema_name}.{table_name}
+                                        WHERE transaction_id = ANY(:ids)
+                                    """,
+                                    params={"ids": [flight["transaction_id"] for flight in flights]})
+        existing_hashes = {row["transaction_id"]: row["row_hash"] for row in existing}
+    changed = [flight for flight in flights if existing_hashes.get(flight["transaction_id"]) != flight["row_hash"]]
+    print(f"🔁 {len(changed)} of {len(flights)} flights new or changed")
+
+    counts = update_insert_dw(db_name=db_name,
+                              schema=schema_name,
+                              table=table_name,
+                              new_data=changed,
+                              pk=pk,
+                              update_fields=update_fields,
+                              not_included_in_update_fields=[],
+                              method='copy',
+                              row_hash_column="row_hash",
+                              return_counts=True)
+    print(f"✅ Flights: {counts['inserted']} inserted, {counts['updated']} updated, {counts['unchanged'] + len(flights) - len(changed)} unchanged")
+
+    if incremental:
+        set_watermark(db_name=db_name,
+                      schema_name=schema_name,
+                      source=WATERMARK_SOURCE,
+                      code=code,
+                      direction=direction,
+                      watermark=timestamps.local_to_utc(dt_to))
+
     return flights
 
-def main(create_table_if_not_exist=False):
-    return upsert(create_table_if_not_exist=create_table_if_not_exist)
+def main(create_table_if_not_exist=False, incremental=False, recheck_hours=48):
+    return upsert(create_table_if_not_exist=create_table_if_not_exist,
+                  incremental=incremental,
+                  recheck_hours=recheck_hours)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
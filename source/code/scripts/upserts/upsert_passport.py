@@ -1,42 +1,84 @@
-from utils.orchestrator import update_insert_dw, ensure_table_structure
+import secrets
+from pathlib import Path
+from utils import columnar
+from utils.orchestrator import update_insert_dw_batches, ensure_table_structure
 from utils.db_types import TEXT
 from scripts.simulations import passport
+from classes.checkpoint import StageCheckpoint
+
+FIELDS_DICT = {
+    "passport_number": {"type": TEXT(), "primary_key": True, "autoincrement": False},
+    "name": {"type": TEXT()},
+    "country": {"type": TEXT()},
+}
 
 def upsert(n: int,
-           create_table_if_not_exist=False):
-    flights = passport.main(n = n)
+           create_table_if_not_exist=False,
+           chunk_size=500000,
+           seed=None,
+           workers=1,
+           checkpoint: StageCheckpoint = None):
+    """
+    Passports are generated as columns and written as Arrow record batches through COPY.
+    With a checkpoint, n, chunk size and seed are pinned in it on the first run and the generated
+    passports are saved as a Parquet dataset next to it, so a resumed run memory-maps the identical
+    passports instead of regenerating them and only writes the batches after the last committed one.
+    The worker count shapes the generated passports too, so resuming with a different one restarts the stage.
+    """
+    skip_batches = 0
+    dataset = None
+    if checkpoint is not None:
+        if checkpoint.restart_on_change(workers=workers):
+            print(f"🔁 Passport worker count changed to {workers}, restarting the stage")
+        n = checkpoint.param("n", n)
+        chunk_size = checkpoint.param("chunk_size", chunk_size)
+        seed = checkpoint.param("seed", seed if seed is not None else secrets.randbits(63))
+        dataset = Path(checkpoint.param("dataset", str(checkpoint.store.path.parent / "passports.parquet")))
+        skip_batches = checkpoint.last_batch + 1
+        checkpoint.start()
+        if skip_batches:
+            print(f"⏩ Resuming passports after batch {skip_batches - 1}")
+    if skip_batches and dataset.exists():
+        print(f"📂 Reusing passports from {dataset}")
+        passports = columnar.read_parquet(dataset)
+    else:
+        passports = passport.generate_passport_columns(n, seed=seed, workers=workers)
+        if dataset is not None:
+            columnar.write_parquet(passports, dataset)
     db_name='cph_airport'
     schema_name='cph_airport'
     table_name='passports'
-    fields_dict = {
-        "passport_number": {"type": TEXT(), "primary_key": True, "autoincrement": False},
-        "name": {"type": TEXT()},
-        "country": {"type": TEXT()},
-    }
     test_table_structure = ensure_table_structure(db_name=db_name,
                                 schema_name=schema_name,
                                 table_name=table_name,
-                                fields_dict=fields_dict,
+                                fields_dict=FIELDS_DICT,
                                 create_table_if_not_exist=create_table_if_not_exist)
     if not test_table_structure:
         raise RuntimeError(f"Table '{schema_name}.{table_name}' does not exist or has incorrect structure.")
     
-    pk = [col for col, config in fields_dict.items() if isinstance(config, dict) and config.get("primary_key", False)]
-    update_fields = [col for col in fields_dict if col not in pk]
-    update_insert_dw(db_name=db_name,
-                     schema=schema_name,
-                     table=table_name,
-                     new_data=flights,
-                     pk=pk,
-                     update_fields=update_fields,
-                     not_included_in_update_fields=[])
+    pk = [col for col, config in FIELDS_DICT.items() if isinstance(config, dict) and config.get("primary_key", False)]
+    update_fields = [col for col in FIELDS_DICT if col not in pk]
+    total = update_insert_dw_batches(db_name=db_name,
+                                     schema=schema_name,
+                                     table=table_name,
+                                     batches=columnar.iter_record_batches(passports, chunk_size, skip_batches=skip_batches),
+                                     pk=pk,
+                                     update_fields=update_fields,
+                                     not_included_in_update_fields=[],
+                                     method='copy',
+                                     skip_batches=skip_batches,
+                                     on_batch_committed=checkpoint.commit_batch if checkpoint is not None else None)
     
-    return flights
+    return total
 
 def main(n = 5000000,
-         create_table_if_not_exist=False):
+         create_table_if_not_exist=False,
+         workers=1,
+         checkpoint: StageCheckpoint = None):
     return upsert(n = n,
-                  create_table_if_not_exist=create_table_if_not_exist)
+                  create_table_if_not_exist=create_table_if_not_exist,
+                  workers=workers,
+                  checkpoint=checkpoint)
 
 if __name__ == "__main__":
     main(n = 5000000)
\ No newline at end of file
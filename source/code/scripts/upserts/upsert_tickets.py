@@ -1,50 +1,66 @@
-from utils.orchestrator import update_insert_dw, ensure_table_structure
+import secrets
+from utils import columnar
+from utils.orchestrator import update_insert_dw_batches, ensure_table_structure
 from utils.db_types import TEXT, BIGINT, TIMESTAMP
 from scripts.simulations import flights_tickets
-from tqdm import tqdm
+from classes.checkpoint import StageCheckpoint
 
-def upsert(create_table_if_not_exist=False, chunk_size=100000):
-    flights = flights_tickets.main()
+FIELDS_DICT = {
+    "unique_id": {"type": TEXT(), "primary_key": True, "autoincrement": False},
+    "transaction_id": {"type": TEXT()},
+    "seat_number": {"type": BIGINT()},
+    "passport_number": {"type": TEXT()},
+    "check_in_type": {"type": TEXT()},
+    "checkin_time": {"type": TIMESTAMP()},
+    "passed_security_time": {"type": TIMESTAMP()},
+}
+
+def upsert(create_table_if_not_exist=False, chunk_size=100000, queue_size=2, seed=None,
+           checkpoint: StageCheckpoint = None):
+    """
+    With a checkpoint, the seed and chunk size are pinned in it on the first run. A resumed run
+    re-simulates the same tickets (inputs are read in a fixed order) and skips writing every batch
+    up to the last committed one.
+    """
+    skip_batches = 0
+    if checkpoint is not None:
+        chunk_size = checkpoint.param("chunk_size", chunk_size)
+        seed = checkpoint.param("seed", seed if seed is not None else secrets.randbits(63))
+        skip_batches = checkpoint.last_batch + 1
+        checkpoint.start()
+        if skip_batches:
+            print(f"⏩ Resuming tickets after batch {skip_batches - 1}")
     db_name='cph_airport'
     schema_name='cph_airport'
     table_name='tickets'
-    fields_dict = {
-        "unique_id": {"type": TEXT(), "primary_key": True, "autoincrement": False},
-        "transaction_id": {"type": TEXT()},
-        "seat_number": {"type": BIGINT()},
-        "passport_number": {"type": TEXT()},
-        "check_in_type": {"type": TEXT()},
-        "checkin_time": {"type": TIMESTAMP()},
-        "passed_security_time": {"type": TIMESTAMP()},
-    }
     test_table_structure = ensure_table_structure(db_name=db_name,
                                 schema_name=schema_name,
                                 table_name=table_name,
-                                fields_dict=fields_dict,
+                                fields_dict=FIELDS_DICT,
                                 create_table_if_not_exist=create_table_if_not_exist)
     if not test_table_structure:
         raise RuntimeError(f"Table '{schema_name}.{table_name}' does not exist or has incorrect structure.")
     
-    pk = [col for col, config in fields_dict.items() if isinstance(config, dict) and config.get("primary_key", False)]
-    update_fields = [col for col in fields_dict if col not in pk]
-    total = len(flights)
-    for start in tqdm(range(0, total, chunk_size)):
-        end = start + chunk_size
-        batch = flights[start:end]
-        update_insert_dw(
-            db_name=db_name,
-            schema=schema_name,
-            table=table_name,
-            new_data=batch,
-            pk=pk,
-            update_fields=update_fields,
-            not_included_in_update_fields=[]
-        )
+    pk = [col for col, config in FIELDS_DICT.items() if isinstance(config, dict) and config.get("primary_key", False)]
+    update_fields = [col for col in FIELDS_DICT if col not in pk]
+    # Tickets are simulated block by block as Arrow record batches and written while the next block is simulated
+    tickets = flights_tickets.stream_batches(seed=seed)
+    total = update_insert_dw_batches(db_name=db_name,
+                                     schema=schema_name,
+                                     table=table_name,
+                                     batches=columnar.rebatch_tables(tickets, chunk_size),
+                                     pk=pk,
+                                     update_fields=update_fields,
+                                     not_included_in_update_fields=[],
+                                     queue_size=queue_size,
+                                     method='copy',
+                                     skip_batches=skip_batches,
+                                     on_batch_committed=checkpoint.commit_batch if checkpoint is not None else None)
 
-    return flights
+    return total
 
-def main(create_table_if_not_exist=False):
-    return upsert(create_table_if_not_exist=create_table_if_not_exist)
+def main(create_table_if_not_exist=False, checkpoint: StageCheckpoint = None):
+    return upsert(create_table_if_not_exist=create_table_if_not_exist, checkpoint=checkpoint)
 
 if __name__ == "__main__":
     main(True)
\ No newline at end of file
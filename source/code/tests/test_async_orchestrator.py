@@ -0,0 +1,83 @@
+import asyncio
+
+import pytest
+
+from sqlalchemy.exc import OperationalError
+from utils import async_orchestrator
+
+
+class FailingEngine:
+    """
+    Stands in for AsyncDatabaseEngine: every connect() fails with OperationalError until `failures` attempts
+    have been made, after which queries return one row.
+    """
+    def __init__(self, failures: int):
+        self.failures = failures
+        self.attempts = 0
+
+    def __call__(self, **kwargs):
+        return self
+
+    def get_engine(self):
+        return self
+
+    def connect(self):
+        self.attempts += 1
+        if self.attempts <= self.failures:
+            raise OperationalError("SELECT 1", {}, Exception("connection refused"))
+        return FakeConnection()
+
+
+class FakeConnection:
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self, statement, params):
+        return FakeResult()
+
+
+class FakeResult:
+    def keys(self):
+        return ["value"]
+
+    def __iter__(self):
+        return iter([(1,)])
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    recorded = []
+
+    async def fake_sleep(seconds):
+        recorded.append(seconds)
+
+    monkeypatch.setattr(async_orchestrator.asyncio, "sleep", fake_sleep)
+    # No jitter, so the backoff is exactly delay * 2 ** attempt
+    monkeypatch.setattr(async_orchestrator.orchestrator.random, "uniform", lambda low, high: 1.0)
+    return recorded
+
+
+@pytest.mark.parametrize("failures", [1, 2, 3])
+def test_get_data_from_db_retries_with_backoff(monkeypatch, sleeps, failures):
+    engine = FailingEngine(failures)
+    monkeypatch.setattr(async_orchestrator, "AsyncDatabaseEngine", engine)
+
+    rows = asyncio.run(async_orchestrator.get_data_from_db("db", "SELECT 1", retries=3, delay=2))
+
+    assert rows == [{"value": 1}]
+    assert engine.attempts == failures + 1
+    assert sleeps == [2 * 2 ** attempt for attempt in range(failures)]
+
+
+def test_get_data_from_db_raises_after_last_retry(monkeypatch, sleeps):
+    engine = FailingEngine(failures=10)
+    monkeypatch.setattr(async_orchestrator, "AsyncDatabaseEngine", engine)
+
+    with pytest.raises(OperationalError):
+        asyncio.run(async_orchestrator.get_data_from_db("db", "SELECT 1", retries=2, delay=1))
+
+    assert engine.attempts == 3
+    assert sleeps == [1, 2]
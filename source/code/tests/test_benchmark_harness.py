@@ -0,0 +1,66 @@
+import pytest
+
+from benchmarks import harness
+
+
+def run(host: str, median: float, benchmark: str = "bench", scale: str = "small") -> dict:
+    return {"environment": {"host": host},
+            "results": [{"benchmark": benchmark, "scale": scale, "median": median}]}
+
+
+def result(median: float, benchmark: str = "bench", scale: str = "small") -> dict:
+    return {"benchmark": benchmark, "scale": scale, "median": median}
+
+
+def test_baseline_only_uses_runs_from_the_same_host():
+    history = [run("ci", 1.0), run("laptop", 9.0), run("ci", 3.0)]
+
+    assert harness.baseline(history, "bench", "small", "ci") == 2.0
+    assert harness.baseline(history, "bench", "small", "laptop") == 9.0
+    assert harness.baseline(history, "bench", "small", "other") is None
+
+
+def test_baseline_matches_benchmark_and_scale():
+    history = [run("ci", 1.0), run("ci", 5.0, scale="large"), run("ci", 7.0, benchmark="other")]
+
+    assert harness.baseline(history, "bench", "small", "ci") == 1.0
+    assert harness.baseline(history, "bench", "large", "ci") == 5.0
+
+
+def test_baseline_is_median_of_last_window_runs():
+    history = [run("ci", median) for median in (100.0, 100.0, 1.0, 2.0, 3.0, 4.0, 50.0)]
+
+    assert harness.baseline(history, "bench", "small", "ci", window=5) == 3.0
+    assert harness.baseline(history, "bench", "small", "ci", window=2) == 27.0
+
+
+def test_find_regressions_without_history_reports_nothing():
+    results = [result(10.0)]
+
+    assert harness.find_regressions(results, [], "ci") == []
+    assert "baseline" not in results[0]
+
+
+@pytest.mark.parametrize("median, regressed", [(1.09, False), (1.10, False), (1.11, True), (0.5, False)])
+def test_find_regressions_threshold_boundary(median, regressed):
+    results = [result(median)]
+
+    regressions = harness.find_regressions(results, [run("ci", 1.0)], "ci", threshold=0.10)
+
+    assert (regressions == results) is regressed
+    assert results[0]["baseline"] == 1.0
+    assert results[0]["change"] == pytest.approx(median - 1.0)
+
+
+def test_find_regressions_ignores_other_hosts():
+    assert harness.find_regressions([result(5.0)], [run("laptop", 1.0)], "ci") == []
+
+
+def test_history_round_trip(tmp_path):
+    path = tmp_path / "results" / "history.jsonl"
+    assert harness.load_history(path) == []
+
+    harness.append_history(run("ci", 1.0), path)
+    harness.append_history(run("ci", 2.0), path)
+
+    assert harness.load_history(path) == [run("ci", 1.0), run("ci", 2.0)]
@@ -0,0 +1,32 @@
+from classes.checkpoint import CheckpointStore
+
+
+def interrupted_stage(path):
+    stage = CheckpointStore(path).stage("passports")
+    stage.restart_on_change(workers=4)
+    stage.param("seed", 123)
+    stage.start()
+    stage.commit_batch(2)
+
+
+def test_restart_on_change_keeps_progress_for_same_params(tmp_path):
+    path = tmp_path / "checkpoint.json"
+    interrupted_stage(path)
+
+    stage = CheckpointStore(path).stage("passports")
+
+    assert stage.restart_on_change(workers=4) is False
+    assert stage.last_batch == 2
+    assert stage.param("seed", 456) == 123
+
+
+def test_restart_on_change_forgets_stage_for_different_params(tmp_path):
+    path = tmp_path / "checkpoint.json"
+    interrupted_stage(path)
+
+    stage = CheckpointStore(path).stage("passports")
+
+    assert stage.restart_on_change(workers=8) is True
+    assert stage.last_batch == -1
+    assert stage.param("seed", 456) == 456
+    assert CheckpointStore(path).stage("passports").param("workers") == 8
@@ -0,0 +1,31 @@
+import pytest
+
+from utils.orchestrator import _CopyRowStream
+
+ROWS = [{"id": index, "name": f"name {index}", "score": None if index % 7 == 0 else index / 4} for index in range(2000)]
+COLUMNS = ["id", "name", "score"]
+
+
+def drain(stream, size: int) -> str:
+    parts = []
+    while True:
+        data = stream.read(size)
+        if not data:
+            return "".join(parts)
+        parts.append(data)
+
+
+@pytest.mark.parametrize("size", [1, 7, 8192])
+def test_copy_row_stream_small_reads_match_one_read(size):
+    expected = _CopyRowStream(ROWS, COLUMNS, rows_per_fill=100).read()
+    stream = _CopyRowStream(ROWS, COLUMNS, rows_per_fill=100)
+
+    assert drain(stream, size) == expected
+    assert stream.bytes_read == len(expected)
+    assert expected.count("\n") == len(ROWS)
+
+
+def test_copy_row_stream_reads_never_exceed_size():
+    stream = _CopyRowStream(ROWS, COLUMNS, rows_per_fill=100)
+
+    assert all(len(stream.read(500)) <= 500 for _ in range(200))
@@ -0,0 +1,50 @@
+import asyncio
+import sqlite3
+
+from classes.async_db_engine import AsyncDatabaseEngine
+from classes.db_engine import DatabaseEngine
+from utils import orchestrator
+
+
+def sqlite_db(tmp_path) -> str:
+    path = str(tmp_path / "test.db")
+    with sqlite3.connect(path) as connection:
+        connection.execute("CREATE TABLE flights (transaction_id TEXT PRIMARY KEY, status TEXT)")
+    return path
+
+
+def cached_tables(engine) -> list:
+    return [key for key in orchestrator._TABLES if key[0] is engine]
+
+
+def test_dispose_drops_reflected_tables(tmp_path):
+    engine = DatabaseEngine(db=sqlite_db(tmp_path), server=None, username=None, password=None, db_type="sqlite")
+    orchestrator.get_table(engine.get_engine(), "main", "flights")
+    assert cached_tables(engine.get_engine())
+
+    engine.dispose()
+
+    assert not cached_tables(engine.get_engine())
+
+
+def test_dispose_all_drops_reflected_tables(tmp_path):
+    engine = DatabaseEngine(db=sqlite_db(tmp_path), server=None, username=None, password=None, db_type="sqlite")
+    orchestrator.get_table(engine.get_engine(), "main", "flights")
+
+    DatabaseEngine.dispose_all()
+
+    assert not cached_tables(engine.get_engine())
+
+
+def test_async_dispose_drops_reflected_tables(tmp_path):
+    path = sqlite_db(tmp_path)
+
+    async def reflect_and_dispose():
+        engine = AsyncDatabaseEngine(db=path, server=None, username=None, password=None, db_type="sqlite")
+        async with engine.get_engine().connect() as connection:
+            await connection.run_sync(orchestrator.get_table, "main", "flights")
+        assert cached_tables(engine.get_engine().sync_engine)
+        await engine.dispose()
+        return engine.get_engine().sync_engine
+
+    assert not cached_tables(asyncio.run(reflect_and_dispose()))
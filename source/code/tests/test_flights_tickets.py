@@ -0,0 +1,40 @@
+import asyncio
+
+import numpy as np
+
+from scripts.simulations import flights_tickets
+from scripts.simulations.flights_tickets import simulate_ticket_columns_parallel
+
+FLIGHTS = {
+    "transaction_id": np.array([f"tx{index}" for index in range(6)], dtype=object),
+    "status": np.array(["Departed"] * 6),
+    "scheduled_local": np.arange(6) * np.timedelta64(3, "D") + np.datetime64("2025-07-01T06:00:00"),
+    "seats": np.array([2, 1, 2, 1, 2, 1]),
+}
+
+
+def test_parallel_with_more_workers_than_passports():
+    tickets = simulate_ticket_columns_parallel(FLIGHTS, ["P1", "P2"], workers=4, seed=7, force_fill=True)
+
+    assert len(tickets["unique_id"]) == FLIGHTS["seats"].sum()
+    assert set(tickets["passport_number"]) <= {"P1", "P2"}
+
+
+def test_parallel_capped_workers_match_explicit_worker_count():
+    capped = simulate_ticket_columns_parallel(FLIGHTS, ["P1", "P2"], workers=8, seed=7, force_fill=True)
+    explicit = simulate_ticket_columns_parallel(FLIGHTS, ["P1", "P2"], workers=2, seed=7, force_fill=True)
+
+    assert capped["unique_id"].tolist() == explicit["unique_id"].tolist()
+
+
+def test_load_passports_concatenates_batches(monkeypatch):
+    async def iter_data_from_db(**kwargs):
+        for batch in (["P1", "P2"], ["P3"]):
+            yield {"passport_number": batch}
+
+    monkeypatch.setattr(flights_tickets.async_orchestrator, "iter_data_from_db", iter_data_from_db)
+
+    passports = asyncio.run(flights_tickets._load_passports())
+
+    assert isinstance(passports, np.ndarray)
+    assert passports.tolist() == ["P1", "P2", "P3"]
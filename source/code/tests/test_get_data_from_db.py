@@ -0,0 +1,84 @@
+import threading
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy.exc import OperationalError, TimeoutError
+
+from utils import metrics, orchestrator
+
+
+class HangingEngine:
+    """
+    Engine whose queries block until released. With `hang_on_connect` the connection is never handed out;
+    with `cancellable` the DBAPI connection's cancel() aborts the running query.
+    """
+
+    def __init__(self, hang_on_connect=False, cancellable=False):
+        self.hang_on_connect = hang_on_connect
+        self.cancellable = cancellable
+        self.release = threading.Event()
+        self.connects = 0
+
+    def get_engine(self):
+        return self
+
+    def connect(self):
+        self.connects += 1
+        if self.hang_on_connect:
+            self.release.wait()
+        return HangingConnection(self)
+
+
+class HangingConnection:
+    def __init__(self, engine: HangingEngine):
+        self.engine = engine
+        self.cancelled = threading.Event()
+        cancel = self.cancelled.set if engine.cancellable else lambda: None
+        self.connection = SimpleNamespace(dbapi_connection=SimpleNamespace(cancel=cancel))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, statement, params=None):
+        while not (self.cancelled.wait(0.01) or self.engine.release.is_set()):
+            pass
+        raise OperationalError(str(statement), params, Exception("canceling statement due to user request"))
+
+
+@pytest.fixture
+def engine(monkeypatch, request):
+    engine = HangingEngine(**request.param)
+    monkeypatch.setattr(orchestrator, "DatabaseEngine", lambda **kwargs: engine)
+    monkeypatch.setattr(orchestrator, "_CANCEL_GRACE_SECONDS", 0.05)
+    monkeypatch.setattr(orchestrator, "_retry_delay", lambda delay, attempt: 0)
+    metrics.registry().reset()
+    yield engine
+    engine.release.set()
+
+
+def query(timeout=0.05, retries=2):
+    return orchestrator.get_data_from_db("db", "SELECT pg_sleep(60)", db_type="sqlite", retries=retries,
+                                         timeout=timeout)
+
+
+@pytest.mark.parametrize("engine", [{"hang_on_connect": True}, {"cancellable": False}], indirect=True)
+def test_query_that_cannot_be_cancelled_is_not_retried(engine):
+    with pytest.raises(TimeoutError, match="could not be cancelled"):
+        query()
+
+    assert engine.connects == 1
+    totals = metrics.registry().snapshot()["db.query"]
+    assert (totals["calls"], totals["errors"], totals["retries"]) == (1, 1, 0)
+
+
+@pytest.mark.parametrize("engine", [{"cancellable": True}], indirect=True)
+def test_cancelled_query_is_retried(engine):
+    with pytest.raises(OperationalError):
+        query()
+
+    assert engine.connects == 3
+    totals = metrics.registry().snapshot()["db.query"]
+    assert (totals["calls"], totals["errors"], totals["retries"]) == (1, 1, 2)
@@ -0,0 +1,61 @@
+import struct
+
+import pyarrow as pa
+import pytest
+
+from sqlalchemy import BigInteger, Float, Integer, REAL, String
+from utils import pg_binary
+
+
+def decode(payload: bytes, formats: list[str]) -> list[tuple]:
+    """
+    Decodes binary COPY tuples (as produced by encode_batch) whose fields are fixed-width values
+    in the given struct formats; NULL fields become None.
+    """
+    rows, position = [], 0
+    while position < len(payload):
+        (count,) = struct.unpack_from(">h", payload, position)
+        position += 2
+        row = []
+        for fmt in formats[:count]:
+            (length,) = struct.unpack_from(">i", payload, position)
+            position += 4
+            if length < 0:
+                row.append(None)
+                continue
+            row.append(struct.unpack_from(fmt, payload, position)[0])
+            position += length
+        rows.append(tuple(row))
+    return rows
+
+
+@pytest.mark.parametrize("arrow_type, column_type, expected", [
+    (pa.int8(), REAL(), ["float4"]),
+    (pa.int16(), REAL(), ["float4"]),
+    (pa.int32(), REAL(), None),
+    (pa.int64(), REAL(), None),
+    (pa.int32(), Float(), ["float8"]),
+    (pa.uint32(), Float(), ["float8"]),
+    (pa.int64(), Float(), None),
+    (pa.float64(), REAL(), ["float4"]),
+    (pa.int64(), BigInteger(), ["int8"]),
+    (pa.int64(), Integer(), ["int4"]),
+    (pa.int64(), String(), None),
+])
+def test_copy_kinds_only_accepts_lossless_integer_to_float(arrow_type, column_type, expected):
+    assert pg_binary.copy_kinds(pa.schema([("value", arrow_type)]), [column_type]) == expected
+
+
+def test_wide_integers_into_real_fall_back_to_csv():
+    table = pa.table({"value": pa.array([2 ** 30], pa.int32())})
+
+    assert pg_binary.copy_kinds(table.schema, [REAL()]) is None
+
+
+def test_encode_batch_narrow_integers_as_floats():
+    batch = pa.record_batch({"small": pa.array([-2 ** 15, None, 2 ** 15 - 1], pa.int16()),
+                             "wide": pa.array([2 ** 31 - 1, 0, None], pa.int32())})
+    kinds = pg_binary.copy_kinds(batch.schema, [REAL(), Float()])
+
+    assert decode(pg_binary.encode_batch(batch, kinds), [">f", ">d"]) == [
+        (-32768.0, 2147483647.0), (None, 0.0), (32767.0, None)]
@@ -0,0 +1,74 @@
+from datetime import datetime
+
+import pyarrow as pa
+import pytest
+
+from scripts.api.flights_api import clean_departures_extended
+from utils import timestamps
+
+
+@pytest.mark.parametrize("value, wall, offset", [
+    ("2025-07-01 06:05+02:00", datetime(2025, 7, 1, 6, 5), 7200),
+    ("2025-07-01 04:05Z", datetime(2025, 7, 1, 4, 5), 0),
+    ("2025-07-01T06:05+02:00", datetime(2025, 7, 1, 6, 5), 7200),
+    ("2025-07-01T06:05:30-03:30", datetime(2025, 7, 1, 6, 5, 30), -12600),
+    ("2025-07-01 06:05", datetime(2025, 7, 1, 6, 5), None),
+    ("2025-07-01T06:05", datetime(2025, 7, 1, 6, 5), None),
+    ("2025-13-01 06:05+02:00", None, None),
+    ("not a time", None, None),
+    ("", None, None),
+    (None, None, None),
+])
+def test_parse_offset_timestamps_single_values(value, wall, offset):
+    walls, offsets = timestamps.parse_offset_timestamps([value])
+
+    assert walls.to_pylist() == [wall]
+    assert offsets.to_pylist() == [offset]
+
+
+def test_parse_offset_timestamps_malformed_value_does_not_fail_column():
+    walls, offsets = timestamps.parse_offset_timestamps(["2025-07-01 06:05+02:00", "garbage", "2025-07-01T08:00Z"])
+
+    assert walls.type == pa.timestamp("s")
+    assert offsets.type == pa.int32()
+    assert timestamps.to_datetimes(timestamps.to_utc(walls, offsets)) == [
+        datetime(2025, 7, 1, 4, 5), None, datetime(2025, 7, 1, 8, 0)]
+
+
+def test_parse_offset_timestamps_empty_and_all_missing():
+    walls, offsets = timestamps.parse_offset_timestamps([])
+    assert len(walls) == len(offsets) == 0
+
+    walls, offsets = timestamps.parse_offset_timestamps([None, None])
+    assert timestamps.to_datetimes(timestamps.to_utc(walls, offsets)) == [None, None]
+
+
+def departure(number: str, utc: str, local: str) -> dict:
+    return {"number": number,
+            "movement": {"airport": {"iata": "BER"}, "scheduledTime": {"utc": utc, "local": local}}}
+
+
+def test_clean_departures_keeps_flights_with_malformed_times():
+    cleaned = clean_departures_extended({"departures": [
+        departure("AY 830", "2025-07-01 04:00Z", "2025-07-01 06:00+02:00"),
+        departure("SK 1", "2025-07-01T05:00Z", "2025-07-01T07:00+02:00"),
+        departure("DY 2", "soon", "2025-07-01 08:00"),
+    ]})
+
+    times = {flight["flight_number"]: (flight["scheduled_utc"], flight["scheduled_local"]) for flight in cleaned}
+    assert times == {
+        "AY 830": (datetime(2025, 7, 1, 4, 0), datetime(2025, 7, 1, 6, 0)),
+        "SK 1": (datetime(2025, 7, 1, 5, 0), datetime(2025, 7, 1, 7, 0)),
+        "DY 2": (None, datetime(2025, 7, 1, 8, 0)),
+    }
+    assert all(flight["revised_utc"] is None for flight in cleaned)
+
+
+@pytest.mark.parametrize("local, utc", [
+    (datetime(2025, 7, 1, 12), datetime(2025, 7, 1, 10)),
+    (datetime(2025, 1, 15, 0), datetime(2025, 1, 14, 23)),
+    (datetime(2025, 10, 26, 2, 30), datetime(2025, 10, 26, 0, 30)),
+])
+def test_local_and_utc_conversion(local, utc):
+    assert timestamps.local_to_utc(local) == utc
+    assert timestamps.utc_to_local(utc) == local
@@ -0,0 +1,97 @@
+from datetime import datetime
+
+import pytest
+
+from scripts.api import flights_api
+from scripts.upserts import upsert_flights
+
+
+def payload(status: str, gate: str, runway: str = None) -> dict:
+    movement = {"airport": {"iata": "BER"}, "gate": gate, "terminal": "3",
+                "scheduledTime": {"utc": "2025-07-01 04:00Z", "local": "2025-07-01 06:00+02:00"}}
+    if runway:
+        movement["runwayTime"] = {"utc": runway, "local": runway}
+    return {"departures": [{"number": "SK 1", "status": status, "airline": {"iata": "SK", "name": "SAS"},
+                            "movement": movement}]}
+
+
+@pytest.fixture
+def table(monkeypatch):
+    """
+    In-memory stand-in for cph_airport.flights and the watermark table, wired into upsert_flights.
+    Returns the stored rows keyed by transaction_id and a state dict whose `writes` lists each upserted batch
+    and `fetches` the (dt_from, dt_to) window bounds passed to the API.
+    """
+    rows = {}
+    state = {"payload": None, "watermark": None, "writes": [], "fetches": []}
+
+    def fetch(dt_from, dt_to, **kwargs):
+        state["fetches"].append((dt_from, dt_to))
+        return flights_api.clean_departures_extended(state["payload"])
+
+    def update_insert_dw(new_data, pk, **kwargs):
+        state["writes"].append(new_data)
+        for row in new_data:
+            rows[row[pk[0]]] = dict(row)
+        return {"inserted": 0, "updated": len(new_data), "unchanged": 0}
+
+    def get_data_from_db(params, **kwargs):
+        return [{"transaction_id": tx, "row_hash": rows[tx]["row_hash"]} for tx in params["ids"] if tx in rows]
+
+    monkeypatch.setattr(upsert_flights, "ensure_table_structure", lambda **kwargs: True)
+    monkeypatch.setattr(upsert_flights, "migrate_transaction_ids", lambda **kwargs: 0)
+    monkeypatch.setattr(upsert_flights, "update_insert_dw", update_insert_dw)
+    monkeypatch.setattr(upsert_flights, "get_data_from_db", get_data_from_db)
+    monkeypatch.setattr(upsert_flights, "get_watermark", lambda **kwargs: state["watermark"])
+    monkeypatch.setattr(upsert_flights, "set_watermark", lambda watermark, **kwargs: state.update(watermark=watermark))
+    monkeypatch.setattr(upsert_flights.flights_api, "main", fetch)
+    return rows, state
+
+
+def load(state: dict, data: dict, dt_to: datetime = datetime(2025, 7, 2)):
+    state["payload"] = data
+    upsert_flights.upsert(incremental=True, dt_from=datetime(2025, 7, 1), dt_to=dt_to)
+
+
+def test_reloaded_window_updates_flight_whose_status_changed(table):
+    rows, state = table
+
+    load(state, payload("Expected", gate="B1"))
+    load(state, payload("Departed", gate="B2", runway="2025-07-01 04:12Z"))
+
+    assert len(rows) == 1
+    (flight,) = rows.values()
+    assert (flight["status"], flight["gate"]) == ("Departed", "B2")
+    assert flight["runway_utc"] == datetime(2025, 7, 1, 4, 12)
+    assert [len(batch) for batch in state["writes"]] == [1, 1]
+
+
+def test_reloaded_window_without_changes_writes_nothing(table):
+    rows, state = table
+
+    load(state, payload("Expected", gate="B1"))
+    load(state, payload("Expected", gate="B1"))
+
+    assert len(rows) == 1
+    assert [len(batch) for batch in state["writes"]] == [1, 0]
+
+
+def test_transaction_id_ignores_status_gate_and_terminal():
+    first = flights_api.clean_departures_extended(payload("Expected", gate="B1"))
+    second = flights_api.clean_departures_extended(payload("Departed", gate="C7"))
+
+    assert first[0]["transaction_id"] == second[0]["transaction_id"]
+    assert first[0]["transaction_id"] == flights_api.generate_transaction_id("SK 1", datetime(2025, 7, 1, 4), "SK")
+
+
+def test_watermark_is_stored_in_utc_and_read_back_as_airport_time(table):
+    rows, state = table
+
+    # Midnight in Copenhagen (CEST, UTC+2) is 22:00 UTC the day before
+    load(state, payload("Expected", gate="B1"), dt_to=datetime(2025, 7, 2))
+    assert state["watermark"] == datetime(2025, 7, 1, 22)
+
+    load(state, payload("Expected", gate="B1"), dt_to=datetime(2025, 7, 3))
+    # The next run re-checks 48 hours before the watermark, floored to a local 12-hour window
+    assert state["fetches"][1] == (datetime(2025, 6, 30), datetime(2025, 7, 3))
+    assert state["watermark"] == datetime(2025, 7, 2, 22)
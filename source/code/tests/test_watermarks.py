@@ -0,0 +1,17 @@
+from datetime import datetime, timedelta, timezone
+
+from utils import orchestrator
+
+
+def test_set_watermark_stores_naive_utc_updatetime(monkeypatch):
+    calls = []
+    monkeypatch.setattr(orchestrator, "update_insert_dw", lambda **kwargs: calls.append(kwargs))
+
+    orchestrator.set_watermark(db_name="db", schema_name="cph_airport", source="aerodatabox", code="CPH",
+                               direction="Departure", watermark=datetime(2025, 7, 1, 12))
+
+    (row,) = calls[0]["new_data"]
+    utc_now = datetime.now(timezone.utc).replace(tzinfo=None)
+    assert row["updatetime"].tzinfo is None
+    assert abs(row["updatetime"] - utc_now) < timedelta(seconds=5)
+    assert row["watermark"] == datetime(2025, 7, 1, 12)
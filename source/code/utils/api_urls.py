@@ -1,2 +1,3 @@
 HISTORICAL_FLIGHTS_BASE_URL = "https://prod.api.market/api/v1/aedbx/aerodatabox/flights/airports"
-OPENDATASOFT = "https://data.opendatasoft.com/api/records/1.0/search/"
\ No newline at end of file
+OPENDATASOFT = "https://data.opendatasoft.com/api/records/1.0/search/"
+OPENDATASOFT_DOWNLOAD = "https://data.opendatasoft.com/api/records/1.0/download/"
\ No newline at end of file
@@ -0,0 +1,373 @@
+import asyncio
+import json
+import time
+
+from decimal import Decimal
+from datetime import datetime, date
+from typing import TYPE_CHECKING, AsyncIterable, AsyncIterator, Iterable
+from utils import metrics
+from utils import orchestrator
+from sqlalchemy import text, types as sqltypes
+from sqlalchemy.exc import OperationalError, TimeoutError
+from classes.async_db_engine import AsyncDatabaseEngine
+
+if TYPE_CHECKING:
+    from utils import columnar
+
+
+"""
+Asyncio versions of the database helpers in utils/orchestrator.py, on SQLAlchemy's async engine (asyncpg).
+Signatures match the synchronous functions, so independent reads and writes can be awaited together, e.g.
+    flights, passports = await asyncio.gather(get_data_from_db(...), get_data_from_db(...))
+SQL building, table reflection and structure checks are shared with orchestrator.py.
+"""
+
+_RETRYABLE = (OperationalError, TimeoutError, asyncio.TimeoutError)
+
+"""
+Executes a SQL query with optional timeout and retry logic and returns the rows as a list of dictionaries.
+The timeout is a server-side statement_timeout on PostgreSQL; if the query has not returned shortly after it,
+the awaiting task is cancelled, which makes asyncpg cancel the statement on the server.
+Retries use exponential backoff with jitter and every attempt's latency is reported.
+"""
+
+async def get_data_from_db(db_name: str,
+                           sql_query: str,
+                           username: str = None,
+                           password: str = None,
+                           server: str = None,
+                           port: int = None,
+                           db_type: str = 'postgresql',
+                           retries: int = 1,
+                           delay: int = 2,
+                           timeout: int = None,
+                           params: dict = None,
+                           pool_options: dict = None):
+    engine = AsyncDatabaseEngine(
+        db=db_name,
+        server=server,
+        username=username,
+        password=password,
+        port=port,
+        db_type=db_type,
+        **(pool_options or {}),
+    ).get_engine()
+
+    async def execute_query():
+        async with engine.connect() as connection:
+            if timeout and db_type == 'postgresql':
+                await connection.execute(text(f"SET LOCAL statement_timeout = {int(timeout * 1000)}"))
+            result = await connection.execute(text(sql_query), params or {})
+            columns = result.keys()
+            return [dict(zip(columns, row)) for row in result]
+
+    attempt = 0
+    call_started = time.perf_counter()
+    while True:
+        started = time.perf_counter()
+        try:
+            result_data = await asyncio.wait_for(
+                execute_query(),
+                timeout=None if timeout is None else timeout + orchestrator._CANCEL_GRACE_SECONDS,
+            )
+            print(f"⏱️ Query attempt {attempt+1} finished in {time.perf_counter() - started:.2f}s ({len(result_data)} rows)")
+            metrics.record("db.query", calls=1, seconds=time.perf_counter() - call_started, rows=len(result_data),
+                           round_trips=attempt + 1, retries=attempt, bytes_sent=len(sql_query))
+            return result_data
+        except _RETRYABLE as e:
+            print(f"⚠️ Query attempt {attempt+1} failed after {time.perf_counter() - started:.2f}s: {e}")
+            if attempt >= retries:
+                print(f"Query failed after {retries} retries. Raising error.")
+                metrics.record("db.query", calls=1, seconds=time.perf_counter() - call_started, errors=1,
+                               round_trips=attempt + 1, retries=attempt, bytes_sent=len(sql_query))
+                raise
+            wait = orchestrator._retry_delay(delay, attempt)
+            print(f"Database query failed (attempt {attempt+1}/{retries}). Retrying in {wait:.1f} seconds...")
+            await asyncio.sleep(wait)
+            attempt += 1
+
+"""
+Streams the result of a SQL query in batches through a server-side cursor, as an async generator.
+Yields lists of row tuples, or dicts of column lists when as_columns=True.
+Timeout and retries apply until the first batch arrives; errors after that are raised.
+"""
+
+async def iter_data_from_db(db_name: str,
+                            sql_query: str,
+                            username: str = None,
+                            password: str = None,
+                            server: str = None,
+                            port: int = None,
+                            db_type: str = 'postgresql',
+                            retries: int = 1,
+                            delay: int = 2,
+                            timeout: int = None,
+                            batch_size: int = 50000,
+                            as_columns: bool = False,
+                            params: dict = None,
+                            pool_options: dict = None) -> AsyncIterator:
+    engine = AsyncDatabaseEngine(
+        db=db_name,
+        server=server,
+        username=username,
+        password=password,
+        port=port,
+        db_type=db_type,
+        **(pool_options or {}),
+    ).get_engine()
+    attempt = 0
+    while True:
+        started = time.perf_counter()
+        streaming = False
+        try:
+            async with engine.connect() as connection:
+                if timeout and db_type == 'postgresql':
+                    # Applies to each FETCH of the server-side cursor, not to the whole stream
+                    await connection.execute(text(f"SET LOCAL statement_timeout = {int(timeout * 1000)}"))
+                result = await connection.stream(text(sql_query), params or {})
+                columns = list(result.keys())
+                partitions = result.partitions(batch_size)
+                partition = await asyncio.wait_for(
+                    anext(partitions, None),
+                    timeout=None if timeout is None else timeout + orchestrator._CANCEL_GRACE_SECONDS,
+                )
+                print(f"⏱️ Query attempt {attempt+1} returned its first batch in {time.perf_counter() - started:.2f}s")
+                streaming = True
+                while partition is not None:
+                    if as_columns:
+                        yield {column: list(values) for column, values in zip(columns, zip(*partition))}
+                    else:
+                        yield partition
+                    partition = await anext(partitions, None)
+            return
+        except _RETRYABLE as e:
+            if streaming or attempt >= retries:
+                raise
+            wait = orchestrator._retry_delay(delay, attempt)
+            print(f"Database query failed (attempt {attempt+1}/{retries}): {e}. Retrying in {wait:.1f} seconds...")
+            await asyncio.sleep(wait)
+            attempt += 1
+
+"""
+Ensures that a table exists in the specified schema with the correct columns and primary key.
+Runs the same checks as orchestrator.ensure_table_structure through AsyncConnection.run_sync.
+"""
+
+async def ensure_table_structure(db_name: str,
+                                 schema_name: str,
+                                 table_name: str,
+                                 fields_dict: dict,
+                                 username: str = None,
+                                 password: str = None,
+                                 server: str = None,
+                                 port: int = None,
+                                 db_type: str = 'postgresql',
+                                 create_table_if_not_exist: bool = False,
+                                 add_missing_columns: bool = False,
+                                 pool_options: dict = None):
+    engine = AsyncDatabaseEngine(
+        db=db_name,
+        server=server,
+        username=username,
+        password=password,
+        port=port,
+        db_type=db_type,
+        **(pool_options or {}),
+    ).get_engine()
+    async with engine.begin() as connection:
+        return await connection.run_sync(orchestrator._ensure_table_structure,
+                                         schema_name=schema_name,
+                                         table_name=table_name,
+                                         fields_dict=fields_dict,
+                                         create_table_if_not_exist=create_table_if_not_exist,
+                                         add_missing_columns=add_missing_columns)
+
+"""
+Converts a Python value to what asyncpg expects for a column of the given SQLAlchemy type.
+asyncpg binds typed parameters and does not parse strings the way psycopg2's literals do, so ISO timestamps
+become datetimes (offsets dropped for TIMESTAMP WITHOUT TIME ZONE, as PostgreSQL itself does), numerics
+become Decimal and nested JSON is serialized. NaN becomes NULL.
+"""
+
+def _coerce_value(value,
+                  column_type):
+    if value is None or (isinstance(value, float) and value != value):
+        return None
+    if isinstance(column_type, sqltypes.DateTime):
+        if isinstance(value, str):
+            value = datetime.fromisoformat(value)
+        if isinstance(value, datetime) and value.tzinfo is not None and not column_type.timezone:
+            value = value.replace(tzinfo=None)
+        return value
+    if isinstance(column_type, sqltypes.Date):
+        return date.fromisoformat(value[:10]) if isinstance(value, str) else value
+    if isinstance(column_type, sqltypes.Float):
+        return float(value)
+    if isinstance(column_type, sqltypes.Numeric):
+        return value if isinstance(value, Decimal) else Decimal(str(value))
+    if isinstance(column_type, sqltypes.Integer):
+        return int(value)
+    if isinstance(column_type, sqltypes.Boolean):
+        return bool(value)
+    if isinstance(column_type, sqltypes.JSON):
+        return value if isinstance(value, str) else json.dumps(value)
+    if isinstance(column_type, sqltypes.String):
+        return value if isinstance(value, str) else str(value)
+    return value
+
+def _coerce_rows(rows: list[dict],
+                 target) -> list[dict]:
+    column_types = {column.name: column.type for column in target.columns}
+    return [{column: _coerce_value(value, column_types[column]) if column in column_types else value
+             for column, value in row.items()}
+            for row in rows]
+
+"""
+Performs a bulk UPSERT like orchestrator.update_insert_dw, on the async engine.
+On PostgreSQL values are coerced to the reflected column types first. With method='copy' the rows are sent with asyncpg's
+copy_records_to_table into a temporary staging table and merged in one statement.
+row_hash_column and return_counts behave as in the synchronous version. Columnar new_data (Arrow or a dict of columns)
+is converted to rows, since asyncpg's COPY takes records.
+"""
+
+async def update_insert_dw(db_name: str,
+                           schema: str,
+                           table: str,
+                           new_data: "list[dict] | columnar.ColumnarData",
+                           pk: list[str],
+                           update_fields: list[str],
+                           not_included_in_update_fields: list = [],
+                           username: str = None,
+                           password: str = None,
+                           server: str = None,
+                           port: int = None,
+                           db_type: str = 'postgresql',
+                           method: str = 'values',
+                           row_hash_column: str = None,
+                           return_counts: bool = False,
+                           pool_options: dict = None) -> int | dict:
+    engine = AsyncDatabaseEngine(
+        db=db_name,
+        server=server,
+        username=username,
+        password=password,
+        port=port,
+        db_type=db_type,
+        **(pool_options or {}),
+    ).get_engine()
+
+    if return_counts and db_type != 'postgresql':
+        raise ValueError(f"return_counts is only supported for postgresql, got '{db_type}'")
+    if method == 'copy' and db_type != 'postgresql':
+        raise ValueError(f"method='copy' is only supported for postgresql, got '{db_type}'")
+    if method not in ('values', 'copy'):
+        raise ValueError(f"Unsupported method: {method}")
+    if not isinstance(new_data, list):
+        from utils import columnar
+        new_data = columnar.to_table(new_data).to_pylist()
+    if not new_data:
+        return orchestrator._upsert_counts([], 0) if return_counts else 0
+
+    new_data, update_fields = orchestrator._prepare_upsert_rows(new_data, update_fields,
+                                                                not_included_in_update_fields, row_hash_column)
+    with metrics.timed(f"db.upsert_{method}", rows=len(new_data), round_trips=3 if method == 'copy' else 1):
+        return await _upsert(engine, schema, table, new_data, pk, update_fields, not_included_in_update_fields,
+                             db_type, method, row_hash_column, return_counts)
+
+"""
+Runs the upsert of update_insert_dw on one pooled connection, after the input has been validated and hashed.
+"""
+
+async def _upsert(engine,
+                  schema: str,
+                  table: str,
+                  new_data: list[dict],
+                  pk: list[str],
+                  update_fields: list[str],
+                  not_included_in_update_fields: list,
+                  db_type: str,
+                  method: str,
+                  row_hash_column: str,
+                  return_counts: bool) -> int | dict:
+    async with engine.begin() as connection:
+        target = await connection.run_sync(orchestrator.get_table, schema, table)
+        missing = [column for column in pk + update_fields if column not in target.columns]
+        if missing:
+            raise RuntimeError(f"Missing column(s) {missing} in table '{schema}.{table}'.")
+        rows = _coerce_rows(new_data, target) if db_type == 'postgresql' else new_data
+
+        if method == 'copy':
+            columns = pk + update_fields
+            stage = f"_stage_{table}"
+            await connection.exec_driver_sql(
+                f"CREATE TEMP TABLE {stage} (LIKE {schema}.{table} INCLUDING DEFAULTS) ON COMMIT DROP"
+            )
+            raw_connection = await connection.get_raw_connection()
+            await raw_connection.driver_connection.copy_records_to_table(
+                stage,
+                records=[tuple(row.get(column) for column in columns) for row in rows],
+                columns=columns,
+            )
+            merge_stmt = orchestrator._stage_merge_statement(schema, table, stage, pk, update_fields,
+                                                             not_included_in_update_fields, row_hash_column, return_counts)
+            result = await connection.exec_driver_sql(merge_stmt)
+        else:
+            stmt, params_insert = orchestrator._values_upsert_statement(schema, table, rows, pk, update_fields,
+                                                                        not_included_in_update_fields, row_hash_column, return_counts)
+            result = await connection.execute(text(stmt), params_insert)
+
+        if return_counts:
+            return orchestrator._upsert_counts([row[0] for row in result], len(rows))
+    return len(rows)
+
+"""
+Runs update_insert_dw for every batch of a (sync or async) iterable with up to `concurrency` batches in flight,
+each on its own pooled connection. Batches must not share primary keys.
+Returns the total number of rows processed, or the summed counts when return_counts=True is passed through.
+"""
+
+async def update_insert_dw_batches(db_name: str,
+                                   schema: str,
+                                   table: str,
+                                   batches: Iterable[list[dict]] | AsyncIterable[list[dict]],
+                                   pk: list[str],
+                                   update_fields: list[str],
+                                   not_included_in_update_fields: list = [],
+                                   concurrency: int = 2,
+                                   **kwargs) -> int | dict:
+    pending = set()
+    results = []
+
+    async def batches_iter():
+        if hasattr(batches, "__aiter__"):
+            async for batch in batches:
+                yield batch
+        else:
+            for batch in batches:
+                yield batch
+
+    try:
+        async for batch in batches_iter():
+            if len(pending) >= concurrency:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                results.extend(task.result() for task in done)
+            pending.add(asyncio.create_task(update_insert_dw(db_name=db_name,
+                                                             schema=schema,
+                                                             table=table,
+                                                             new_data=batch,
+                                                             pk=pk,
+                                                             update_fields=update_fields,
+                                                             not_included_in_update_fields=not_included_in_update_fields,
+                                                             **kwargs)))
+        results.extend(await asyncio.gather(*pending))
+    finally:
+        for task in pending:
+            task.cancel()
+
+    if kwargs.get("return_counts"):
+        counts = orchestrator._upsert_counts([], 0)
+        for result in results:
+            for key, value in result.items():
+                counts[key] += value
+        return counts
+    return sum(results)
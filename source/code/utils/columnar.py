@@ -0,0 +1,169 @@
+import io
+import os
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+
+from pathlib import Path
+from typing import Iterable, Iterator
+
+"""
+Arrow/Parquet helpers for handing data between pipeline stages in columnar form.
+Producers emit pyarrow Tables or RecordBatches (built straight from the NumPy columns of the simulations),
+update_insert_dw accepts them directly and streams them into COPY without a row-wise copy,
+and intermediate datasets can be written to Parquet and memory-mapped on re-runs.
+"""
+
+ColumnarData = pa.Table | pa.RecordBatch | dict
+
+"""
+True for data update_insert_dw should treat as columnar: an Arrow Table, a RecordBatch or a dict of equally long columns.
+"""
+
+def is_columnar(data) -> bool:
+    return isinstance(data, (pa.Table, pa.RecordBatch, dict))
+
+"""
+Converts a Table, a RecordBatch or a dict of columns (NumPy arrays or lists) to a pyarrow Table,
+optionally keeping only `columns` in that order. NumPy NaT becomes null.
+"""
+
+def to_table(data: ColumnarData,
+             columns: list[str] = None) -> pa.Table:
+    if isinstance(data, pa.RecordBatch):
+        data = pa.Table.from_batches([data])
+    elif isinstance(data, dict):
+        data = pa.table(data)
+    elif not isinstance(data, pa.Table):
+        raise TypeError(f"Expected a pyarrow Table, RecordBatch or dict of columns, got {type(data).__name__}")
+    if columns is not None:
+        missing = [column for column in columns if column not in data.column_names]
+        if missing:
+            raise KeyError(f"Missing column(s) {missing} in columnar data")
+        data = data.select(columns)
+    return data
+
+"""
+Slices columnar data into RecordBatches of `batch_size` rows.
+The first `skip_batches` batches are yielded empty, keeping batch indexes aligned when resuming, as in iter_column_records.
+"""
+
+def iter_record_batches(data: ColumnarData,
+                        batch_size: int,
+                        skip_batches: int = 0) -> Iterator[pa.RecordBatch]:
+    table = to_table(data)
+    for index, start in enumerate(range(0, table.num_rows, batch_size)):
+        if index < skip_batches:
+            yield pa.RecordBatch.from_pylist([], schema=table.schema)
+            continue
+        yield table.slice(start, batch_size).combine_chunks().to_batches()[0]
+
+"""
+Columnar counterpart of rebatch: regroups an iterable of Tables, RecordBatches or dicts of columns
+(e.g. one per simulated flight block) into Tables of exactly `size` rows. The last one may be shorter.
+"""
+
+def rebatch_tables(blocks: Iterable[ColumnarData],
+                   size: int) -> Iterator[pa.Table]:
+    pending = []
+    pending_rows = 0
+    for block in blocks:
+        block = to_table(block)
+        if not block.num_rows:
+            continue
+        pending.append(block)
+        pending_rows += block.num_rows
+        while pending_rows >= size:
+            combined = pa.concat_tables(pending)
+            yield combined.slice(0, size)
+            rest = combined.slice(size)
+            pending = [rest] if rest.num_rows else []
+            pending_rows = rest.num_rows
+    if pending_rows:
+        yield pa.concat_tables(pending)
+
+"""
+File-like adapter that renders Arrow data as PostgreSQL CSV for COPY FROM STDIN, one slice of rows at a time.
+Arrow's CSV writer quotes every string and leaves nulls unquoted and empty, the same convention as _CopyRowStream.
+"""
+
+class CsvBatchStream:
+    def __init__(self, data: ColumnarData, columns: list[str], rows_per_fill: int = 50000):
+        self._batches = iter(to_table(data, columns).to_batches(max_chunksize=rows_per_fill))
+        self._options = pa_csv.WriteOptions(include_header=False)
+        self._pending = b""
+        # copy_expert reads in small pieces; a read position avoids re-copying the rest of the buffer on every read
+        self._position = 0
+        self._exhausted = False
+        self.bytes_read = 0
+
+    def _fill(self):
+        batch = next(self._batches, None)
+        if batch is None:
+            self._exhausted = True
+            return
+        buffer = io.BytesIO()
+        pa_csv.write_csv(batch, buffer, self._options)
+        self._pending = self._pending[self._position:] + buffer.getvalue()
+        self._position = 0
+
+    def read(self, size: int = -1) -> bytes:
+        while not self._exhausted and (size < 0 or len(self._pending) - self._position < size):
+            self._fill()
+        end = len(self._pending) if size < 0 else min(self._position + size, len(self._pending))
+        data = self._pending[self._position:end]
+        self._position = end
+        self.bytes_read += len(data)
+        return data
+
+    readline = read
+
+"""
+Writes a Table, RecordBatch, dict of columns or an iterable of them to a Parquet file, streaming batch by batch
+so the dataset never has to fit in memory at once. The file is written next to its target and renamed into place,
+so a crash never leaves a truncated dataset behind. Returns the number of rows written.
+"""
+
+def write_parquet(data: ColumnarData | Iterable[ColumnarData],
+                  path: Path,
+                  compression: str = "zstd") -> int:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + ".tmp")
+    blocks = [data] if is_columnar(data) else data
+    writer = None
+    rows = 0
+    try:
+        for block in blocks:
+            block = to_table(block)
+            if writer is None:
+                writer = pq.ParquetWriter(tmp_path, block.schema, compression=compression)
+            writer.write_table(block)
+            rows += block.num_rows
+    finally:
+        if writer is not None:
+            writer.close()
+    if writer is None:
+        return 0
+    os.replace(tmp_path, path)
+    return rows
+
+"""
+Reads a Parquet dataset written by write_parquet. With memory_map=True (default) the file is mapped
+instead of read into a buffer, so re-runs reuse the OS page cache.
+"""
+
+def read_parquet(path: Path,
+                 columns: list[str] = None,
+                 memory_map: bool = True) -> pa.Table:
+    return pq.read_table(path, columns=columns, memory_map=memory_map)
+
+"""
+Streams a Parquet dataset as RecordBatches of up to `batch_size` rows from a memory-mapped file.
+"""
+
+def iter_parquet_batches(path: Path,
+                         batch_size: int,
+                         columns: list[str] = None) -> Iterator[pa.RecordBatch]:
+    parquet_file = pq.ParquetFile(path, memory_map=True)
+    yield from parquet_file.iter_batches(batch_size=batch_size, columns=columns)
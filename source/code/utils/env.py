@@ -1,23 +1,50 @@
-from dotenv import load_dotenv
 import os
 
-load_dotenv(override=True, verbose=True)
-
-# POSTGRESQL DATABASE
-_POSTGRES_HOST = os.getenv("POSTGRES_HOST")
-_POSTGRES_PORT = os.getenv("POSTGRES_PORT")
-_POSTGRES_USERNAME = os.getenv("POSTGRES_USERNAME")
-_POSTGRES_PASSWORD = os.getenv("POSTGRES_PASSWORD")
-assert _POSTGRES_HOST
-assert _POSTGRES_PORT
-assert _POSTGRES_USERNAME
-assert _POSTGRES_PASSWORD
-POSTGRES_HOST = _POSTGRES_HOST
-POSTGRES_PORT = _POSTGRES_PORT
-POSTGRES_USERNAME = _POSTGRES_USERNAME
-POSTGRES_PASSWORD = _POSTGRES_PASSWORD
-
-# ZYLA_API_KEY
-_API_MARKET_KEY = os.getenv("API_MARKET_KEY")
-assert _API_MARKET_KEY
-API_MARKET_KEY = _API_MARKET_KEY
\ No newline at end of file
+# Settings are resolved on first access (PEP 562 module __getattr__) instead of at import, so a step only
+# needs the variables it actually uses (e.g. a passports-only run does not need API_MARKET_KEY).
+# Each value is read once and then cached as a module attribute.
+
+_DOTENV_LOADED = False
+
+def _load_dotenv():
+    global _DOTENV_LOADED
+    if not _DOTENV_LOADED:
+        from dotenv import load_dotenv
+        load_dotenv(override=True, verbose=True)
+        _DOTENV_LOADED = True
+
+def _required(name: str) -> str:
+    value = os.getenv(name)
+    assert value, f"Environment variable {name} is not set"
+    return value
+
+def _flag(value: str) -> bool:
+    return value.lower() in ("1", "true", "yes")
+
+_SETTINGS = {
+    # POSTGRESQL DATABASE
+    "POSTGRES_HOST": lambda: _required("POSTGRES_HOST"),
+    "POSTGRES_PORT": lambda: _required("POSTGRES_PORT"),
+    "POSTGRES_USERNAME": lambda: _required("POSTGRES_USERNAME"),
+    "POSTGRES_PASSWORD": lambda: _required("POSTGRES_PASSWORD"),
+    # ZYLA_API_KEY
+    "API_MARKET_KEY": lambda: _required("API_MARKET_KEY"),
+    # CONNECTION POOL (optional, defaults below)
+    "POSTGRES_POOL_SIZE": lambda: int(os.getenv("POSTGRES_POOL_SIZE") or 5),
+    "POSTGRES_MAX_OVERFLOW": lambda: int(os.getenv("POSTGRES_MAX_OVERFLOW") or 10),
+    "POSTGRES_POOL_TIMEOUT": lambda: int(os.getenv("POSTGRES_POOL_TIMEOUT") or 30),
+    "POSTGRES_POOL_RECYCLE": lambda: int(os.getenv("POSTGRES_POOL_RECYCLE") or 1800),
+    "POSTGRES_POOL_PRE_PING": lambda: _flag(os.getenv("POSTGRES_POOL_PRE_PING") or "true"),
+    "POSTGRES_STATEMENT_TIMEOUT_MS": lambda: int(os.getenv("POSTGRES_STATEMENT_TIMEOUT_MS") or 0),  # 0 = no timeout
+}
+
+def __getattr__(name: str):
+    if name not in _SETTINGS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    _load_dotenv()
+    value = _SETTINGS[name]()
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(list(globals()) + list(_SETTINGS))
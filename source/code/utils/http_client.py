@@ -0,0 +1,198 @@
+import codecs
+import json
+import random
+import threading
+import time
+import requests
+
+from typing import Iterable, Iterator
+from requests.adapters import HTTPAdapter
+from classes.rate_limiter import TokenBucket
+from classes.response_cache import ResponseCache
+from utils import metrics
+from utils.path_config import FILES_DIR
+
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+RESPONSE_CACHE_DIR = FILES_DIR / "cache"
+
+_RESPONSE_CACHE = None
+_RESPONSE_CACHE_LOCK = threading.Lock()
+
+"""
+Builds a requests.Session with a connection pool sized for `pool_size` concurrent requests, 
+so parallel calls to the same host reuse TCP/TLS connections instead of handshaking every time.
+"""
+
+def build_session(pool_size: int = 10) -> requests.Session:
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+"""
+Returns the process-wide response cache under FILES_DIR/cache, created on first use.
+"""
+
+def default_response_cache() -> ResponseCache:
+    global _RESPONSE_CACHE
+    with _RESPONSE_CACHE_LOCK:
+        if _RESPONSE_CACHE is None:
+            _RESPONSE_CACHE = ResponseCache(RESPONSE_CACHE_DIR)
+        return _RESPONSE_CACHE
+
+"""
+Sends a GET, waiting on the optional token-bucket limiter before every attempt, and retries 429/5xx responses 
+and connection errors with exponential backoff plus jitter, honouring Retry-After when the server sends it. 
+Returns the successful response; raises for other error statuses or once retries are exhausted.
+"""
+
+def _get_with_retries(url: str,
+                      params: dict,
+                      headers: dict,
+                      session: requests.Session,
+                      limiter: TokenBucket,
+                      timeout: int,
+                      retries: int,
+                      backoff: float,
+                      stream: bool = False) -> requests.Response:
+    http = session or requests
+    attempt = 0
+    started = time.perf_counter()
+    while True:
+        if limiter is not None:
+            limiter.acquire()
+        try:
+            resp = http.get(url, headers=headers, params=params, timeout=timeout, stream=stream)
+        except (requests.ConnectionError, requests.Timeout):
+            if attempt >= retries:
+                metrics.record("http.get", calls=1, seconds=time.perf_counter() - started, errors=1,
+                               round_trips=attempt + 1, retries=attempt)
+                raise
+            resp = None
+
+        if resp is not None and (resp.status_code not in RETRY_STATUS_CODES or attempt >= retries):
+            # Time to response headers (limiter waits included); streamed bodies are counted by the caller
+            metrics.record("http.get", calls=1, seconds=time.perf_counter() - started, round_trips=attempt + 1,
+                           retries=attempt, errors=int(resp.status_code >= 400),
+                           bytes_received=0 if stream else len(resp.content))
+            resp.raise_for_status()
+            return resp
+
+        retry_after = resp.headers.get("Retry-After") if resp is not None else None
+        if resp is not None:
+            resp.close()
+        if retry_after is not None and retry_after.isdigit():
+            wait = float(retry_after)
+        else:
+            wait = backoff * (2 ** attempt) * random.uniform(0.5, 1.5)
+        status = resp.status_code if resp is not None else "connection error"
+        print(f"⚠️ {status} from {url}, retrying in {wait:.1f}s ({attempt+1}/{retries})")
+        time.sleep(wait)
+        attempt += 1
+
+"""
+GET a URL and return the decoded JSON body, with rate limiting and retries as in _get_with_retries. 
+With a `cache`, the payload is read from it when present (no network call at all) and stored 
+after a successful fetch for `ttl` seconds (None = forever). Headers are not part of the cache key.
+"""
+
+def get_json(url: str,
+             params: dict = None,
+             headers: dict = None,
+             session: requests.Session = None,
+             limiter: TokenBucket = None,
+             timeout: int = 30,
+             retries: int = 4,
+             backoff: float = 1.0,
+             cache: ResponseCache = None,
+             ttl: float = None):
+    if cache is not None:
+        cached = cache.get(url, params)
+        if cached is not None:
+            metrics.record("http.get", cache_hits=1)
+            return cached
+
+    resp = _get_with_retries(url, params, headers, session, limiter, timeout, retries, backoff)
+    data = resp.json()
+    if cache is not None:
+        cache.put(url, params, data, ttl=ttl)
+    return data
+
+"""
+Incrementally decodes a top-level JSON array from an iterable of byte chunks, yielding each element 
+as soon as it is complete, so a large download never has to be held in memory as one document. 
+Elements are expected to be objects, arrays or strings (a bare number split across chunks would be cut short).
+"""
+
+def iter_json_array(chunks: Iterable[bytes]) -> Iterator:
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder("utf-8")()
+    buffer = ""
+    started = False
+    for chunk in chunks:
+        buffer += utf8.decode(chunk)
+        position = 0
+        while True:
+            while position < len(buffer) and buffer[position] in " \t\r\n,":
+                position += 1
+            if position >= len(buffer):
+                break
+            if not started:
+                if buffer[position] != "[":
+                    raise ValueError("Expected a JSON array")
+                started = True
+                position += 1
+                continue
+            if buffer[position] == "]":
+                return
+            try:
+                element, position = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                break  # element continues in the next chunk
+            yield element
+        buffer = buffer[position:]
+    if started:
+        raise ValueError("JSON array ended unexpectedly")
+
+"""
+Streams a JSON array endpoint (e.g. a bulk export) and yields its elements as they arrive. 
+Connection setup is rate limited and retried like get_json; the body itself is decoded incrementally. 
+With a `cache`, a cached copy is replayed instead, and a fully received download is stored for `ttl` seconds.
+"""
+
+def stream_json_array(url: str,
+                      params: dict = None,
+                      headers: dict = None,
+                      session: requests.Session = None,
+                      limiter: TokenBucket = None,
+                      timeout: int = 60,
+                      retries: int = 4,
+                      backoff: float = 1.0,
+                      chunk_size: int = 64 * 1024,
+                      cache: ResponseCache = None,
+                      ttl: float = None) -> Iterator:
+    if cache is not None:
+        cached = cache.get(url, params)
+        if cached is not None:
+            metrics.record("http.get", cache_hits=1)
+            yield from cached
+            return
+
+    def counted(chunks):
+        received_bytes = 0
+        try:
+            for chunk in chunks:
+                received_bytes += len(chunk)
+                yield chunk
+        finally:
+            metrics.record("http.get", bytes_received=received_bytes)
+
+    received = [] if cache is not None else None
+    with _get_with_retries(url, params, headers, session, limiter, timeout, retries, backoff, stream=True) as resp:
+        for element in iter_json_array(counted(resp.iter_content(chunk_size=chunk_size))):
+            if received is not None:
+                received.append(element)
+            yield element
+    if cache is not None:
+        cache.put(url, params, received, ttl=ttl)
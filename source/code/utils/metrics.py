@@ -0,0 +1,169 @@
+import json
+import os
+import sys
+import time
+
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Iterable, Iterator
+from classes.metrics_registry import MetricsRegistry
+
+"""
+Lightweight performance instrumentation shared by the database helpers, the API fetchers, the simulators and the
+pipeline scheduler. Instrumented code calls record() (or the timed() context manager) once per call or batch;
+the totals end up in a JSON run report and, optionally, a Prometheus/OpenMetrics text file.
+"""
+
+_REGISTRY = MetricsRegistry()
+
+"""
+Returns the process-wide registry every instrumented helper records into.
+"""
+
+def registry() -> MetricsRegistry:
+    return _REGISTRY
+
+"""
+Adds counter values to an operation, e.g. record("db.query", calls=1, seconds=0.2, rows=120, round_trips=1).
+"""
+
+def record(operation: str,
+           **values):
+    _REGISTRY.record(operation, **values)
+
+"""
+Times a block and records it as one call of `operation`. The yielded dict collects the other counters of the call
+(rows, bytes_sent, ...); a block that raises is recorded with errors=1.
+"""
+
+@contextmanager
+def timed(operation: str,
+          **values):
+    sample = dict(values)
+    started = time.perf_counter()
+    try:
+        yield sample
+    except BaseException:
+        sample["errors"] = sample.get("errors", 0) + 1
+        raise
+    finally:
+        _REGISTRY.record(operation, calls=1, seconds=time.perf_counter() - started, **sample)
+
+"""
+Wraps a generator and records, once it is exhausted or closed, one call of `operation` with the time spent producing
+its items (time the consumer spends between items is excluded) and the rows produced: one per item,
+or `count(item)` for items that are batches.
+"""
+
+def timed_iter(operation: str,
+               items: Iterable,
+               count: Callable = None) -> Iterator:
+    rows = 0
+    seconds = 0.0
+    started = time.perf_counter()
+    try:
+        for item in items:
+            seconds += time.perf_counter() - started
+            rows += 1 if count is None else count(item)
+            yield item
+            started = time.perf_counter()
+    finally:
+        _REGISTRY.record(operation, calls=1, seconds=seconds, rows=rows)
+
+"""
+Peak resident set size in bytes of this process and, separately, of its largest finished child
+(ProcessPoolExecutor workers). Returns None values where the platform has no getrusage (Windows).
+"""
+
+def peak_rss_bytes() -> dict:
+    try:
+        import resource
+    except ImportError:
+        return {"self": None, "children": None}
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    scale = 1 if sys.platform == "darwin" else 1024
+    return {
+        "self": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale,
+        "children": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * scale,
+    }
+
+"""
+Builds the run report: start/end time, peak RSS, the totals per operation and, when given,
+the per-step results of a PipelineScheduler run (status, duration, rows, rows/s).
+"""
+
+def build_report(steps: dict = None,
+                 **extra) -> dict:
+    finished_at = time.time()
+    report = {
+        "started_at": datetime.fromtimestamp(_REGISTRY.started_at).isoformat(),
+        "finished_at": datetime.fromtimestamp(finished_at).isoformat(),
+        "wall_seconds": finished_at - _REGISTRY.started_at,
+        "pid": os.getpid(),
+        "peak_rss_bytes": peak_rss_bytes(),
+        **extra,
+    }
+    if steps is not None:
+        report["steps"] = {}
+        for name, result in steps.items():
+            step = {key: value for key, value in result.items() if key != "error" or value is not None}
+            if result.get("rows") and result.get("duration"):
+                step["rows_per_second"] = result["rows"] / result["duration"]
+            report["steps"][name] = step
+    report["operations"] = _REGISTRY.snapshot()
+    return report
+
+"""
+Writes the run report as JSON and returns it.
+"""
+
+def write_report(path: Path,
+                 steps: dict = None,
+                 **extra) -> dict:
+    report = build_report(steps, **extra)
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(report, indent=2, default=str), encoding="utf-8")
+    return report
+
+"""
+Escapes a label value for the text exposition format.
+"""
+
+def _label(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+"""
+Writes the totals in the OpenMetrics text format (also readable by Prometheus' textfile collector):
+one counter family per counter name labelled by operation, per-step duration and row gauges, and peak RSS.
+"""
+
+def write_openmetrics(path: Path,
+                      steps: dict = None,
+                      prefix: str = "cph_pipeline"):
+    lines = []
+    operations = _REGISTRY.snapshot()
+    counters = sorted({key for totals in operations.values() for key in totals if key != "rows_per_second"})
+    for counter in counters:
+        family = f"{prefix}_operation_{counter}"
+        lines.append(f"# TYPE {family} counter")
+        for operation, totals in sorted(operations.items()):
+            if counter in totals:
+                lines.append(f'{family}_total{{operation="{_label(operation)}"}} {totals[counter]}')
+    if steps:
+        for field, family in (("duration", "step_seconds"), ("rows", "step_rows")):
+            lines.append(f"# TYPE {prefix}_{family} gauge")
+            for name, result in steps.items():
+                if result.get(field) is not None:
+                    lines.append(f'{prefix}_{family}{{step="{_label(name)}",status="{_label(result["status"])}"}} '
+                                 f'{result[field]}')
+    rss = peak_rss_bytes()
+    lines.append(f"# TYPE {prefix}_peak_rss_bytes gauge")
+    for process, value in rss.items():
+        if value is not None:
+            lines.append(f'{prefix}_peak_rss_bytes{{process="{process}"}} {value}')
+    lines.append("# EOF")
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
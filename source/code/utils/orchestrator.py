@@ -1,17 +1,26 @@
+import hashlib
 import json
 import os
-import pandas as pd
+import queue
+import random
 import time
 import threading
 
 from tqdm import tqdm
-from datetime import datetime, time
-from utils import env
+from typing import TYPE_CHECKING, Iterable, Iterator
+from datetime import datetime, date, timezone
+from utils import metrics
+from utils.db_types import TEXT, TIMESTAMP
 from sqlalchemy import MetaData, text, Table, Column
 from sqlalchemy.exc import OperationalError, TimeoutError, NoSuchTableError
 from sqlalchemy.schema import CreateSchema
 from classes.db_engine import DatabaseEngine
 
+if TYPE_CHECKING:
+    # pyarrow is only imported when columnar data is actually passed in
+    from utils import columnar
+
+_CANCEL_GRACE_SECONDS = 5
 
 """
 Loads a JSON file containing a list of dictionaries from the specified folder.  
@@ -35,7 +44,7 @@ def load_json_file(folder_path:str,
 
 """
 Transforms a list of dictionaries by selecting and renaming keys, 
-optionally adding extra fields and timestamps for creation and update. 
+optionally adding extra fields and timestamps for creation and update (one UTC datetime per call). 
 Returns the processed list of standardized dictionaries.
 """
 
@@ -43,36 +52,197 @@ def select_columns(data_list: list[dict],
                    selected_keys_with_rename: dict, 
                    extra_fields=None,
                    with_update_and_created_time: bool=True) -> list[dict]:
-    current_time = datetime.now().strftime('%Y-%m-%dT%H:%M:%SZ')
     processed_list = []
-    extra_fields = extra_fields or {} 
+    extra_fields = dict(extra_fields or {})
+    if with_update_and_created_time:
+        # One load timestamp for the whole call, as a native UTC datetime rather than a string per row
+        current_time = datetime.now(timezone.utc).replace(tzinfo=None, microsecond=0)
+        extra_fields.update({'updatetime': current_time, 'createdtime': current_time})
     for row in tqdm(data_list):
         if isinstance(row, dict):
             new_row = {new_key: row.get(old_key, None) for old_key, new_key in selected_keys_with_rename.items()}
             new_row.update(extra_fields)
-            if with_update_and_created_time:
-                current_time = datetime.now().strftime('%Y-%m-%dT%H:%M:%SZ')
-                new_row['updatetime'] = current_time
-                new_row['createdtime'] = current_time
             processed_list.append(new_row)
     return processed_list
 
+"""
+Delay before retry number `attempt` (0-based): exponential backoff from `delay` seconds with ±50% jitter, 
+so concurrent callers do not retry against a struggling database in lockstep.
+"""
+
+def _retry_delay(delay: float, 
+                 attempt: int) -> float:
+    return delay * (2 ** attempt) * random.uniform(0.5, 1.5)
+
+"""
+Cancels the statement currently running on a DBAPI connection from another thread. 
+psycopg2 connections expose cancel(), which asks the server to abort the query (like pg_cancel_backend), 
+and sqlite3 connections expose interrupt(); the blocked execute() then raises and the connection is 
+returned to the pool instead of staying busy.
+"""
+
+def _cancel_query(dbapi_connection) -> bool:
+    cancel = getattr(dbapi_connection, "cancel", None) or getattr(dbapi_connection, "interrupt", None)
+    if cancel is None:
+        return False
+    try:
+        cancel()
+        return True
+    except Exception as e:
+        print(f"⚠️ Could not cancel query: {e}")
+        return False
+
 """
 Executes a SQL query with optional timeout and retry logic. 
-Handles transient database errors and enforces timeout using a separate thread. 
+On PostgreSQL the timeout is enforced by the server through SET LOCAL statement_timeout; if the query still 
+has not returned shortly after the timeout, it is cancelled from the client, so no attempt is left running. 
+A query that cannot be cancelled raises TimeoutError without a retry, since the next attempt would run next to it. 
+Retries use exponential backoff with jitter and every attempt's latency is reported. 
+Bind parameters for the query can be passed as `params`. 
 Returns the result as a list of dictionaries 
 """
 
 def get_data_from_db(db_name: str,
                      sql_query: str,
-                     username: str = env.POSTGRES_USERNAME,
-                     password: str = env.POSTGRES_PASSWORD,
-                     server: str = env.POSTGRES_HOST,
-                     port: int = env.POSTGRES_PORT,
+                     username: str = None,
+                     password: str = None,
+                     server: str = None,
+                     port: int = None,
                      db_type: str = 'postgresql',
                      retries: int = 1,  
                      delay: int = 2,
-                     timeout: int = None):  # Timeout in seconds (default: None, no timeout)
+                     timeout: int = None,  # Timeout in seconds (default: None, no timeout)
+                     params: dict = None,
+                     pool_options: dict = None):
+    engine = DatabaseEngine(
+        db=db_name,
+        server=server,
+        username=username,
+        password=password,
+        port=port,
+        db_type=db_type,
+        **(pool_options or {}),
+    ).get_engine()
+    attempt = 0
+    call_started = time.perf_counter()
+    while True:
+        result_data = []
+        query_exception = None
+        dbapi_connection = None
+        started = time.perf_counter()
+
+        def execute_query():
+            nonlocal result_data, query_exception, dbapi_connection
+            try:
+                with engine.connect() as connection:
+                    dbapi_connection = connection.connection.dbapi_connection
+                    if timeout and db_type == 'postgresql':
+                        connection.execute(text(f"SET LOCAL statement_timeout = {int(timeout * 1000)}"))
+                    result = connection.execute(text(sql_query), params or {})
+                    columns = result.keys()
+                    result_data = [dict(zip(columns, row)) for row in result]
+            except Exception as e:
+                query_exception = e
+
+        query_thread = threading.Thread(target=execute_query, daemon=True)
+        query_thread.start()
+        # The server-side timeout should fire first; the grace period covers a stuck network
+        query_thread.join(timeout=None if timeout is None else timeout + _CANCEL_GRACE_SECONDS)
+        abandoned = False
+        if query_thread.is_alive():
+            cancelled = _cancel_query(dbapi_connection)
+            query_thread.join(timeout=_CANCEL_GRACE_SECONDS)
+            # A query that could not be cancelled, or is still running, must not be run a second time next to it
+            abandoned = dbapi_connection is None or query_thread.is_alive()
+            if query_exception is None or abandoned:
+                query_exception = TimeoutError(
+                    f"Query did not finish within {timeout} seconds"
+                    + (" and could not be cancelled" if abandoned else " and was cancelled" if cancelled else "")
+                )
+        elapsed = time.perf_counter() - started
+
+        if query_exception is None:
+            print(f"⏱️ Query attempt {attempt+1} finished in {elapsed:.2f}s ({len(result_data)} rows)")
+            metrics.record("db.query", calls=1, seconds=time.perf_counter() - call_started, rows=len(result_data),
+                           round_trips=attempt + 1, retries=attempt, bytes_sent=len(sql_query))
+            return result_data
+
+        print(f"⚠️ Query attempt {attempt+1} failed after {elapsed:.2f}s: {query_exception}")
+        if abandoned or not isinstance(query_exception, (OperationalError, TimeoutError)) or attempt >= retries:
+            if abandoned:
+                print("Query is still running and was not retried. Raising error.")
+            elif attempt >= retries:
+                print(f"Query failed after {retries} retries. Raising error.")
+            metrics.record("db.query", calls=1, seconds=time.perf_counter() - call_started, errors=1,
+                           round_trips=attempt + 1, retries=attempt, bytes_sent=len(sql_query))
+            raise query_exception
+        wait = _retry_delay(delay, attempt)
+        print(f"Database query failed (attempt {attempt+1}/{retries}). Retrying in {wait:.1f} seconds...")
+        time.sleep(wait)
+        attempt += 1
+
+_TABLES: dict[tuple, Table] = {}
+_TABLES_LOCK = threading.Lock()
+
+"""
+Returns the reflected Table for schema.table, reflecting only that table on first use. 
+Entries are cached process-wide per (engine, schema, table), so repeated upserts skip the catalog round-trip. 
+`bind` is an Engine or an open Connection (reflection then runs on that connection). 
+Raises NoSuchTableError if the table does not exist; missing tables are never cached.
+"""
+
+def get_table(bind, 
+              schema_name: str, 
+              table_name: str) -> Table:
+    key = (bind.engine, schema_name, table_name)
+    with _TABLES_LOCK:
+        table = _TABLES.get(key)
+    if table is None:
+        table = Table(table_name, MetaData(schema=schema_name), autoload_with=bind)
+        with _TABLES_LOCK:
+            table = _TABLES.setdefault(key, table)
+    return table
+
+"""
+Drops cached table metadata so the next get_table call reflects again. 
+Call after DDL; arguments left as None match everything, so no arguments clears the whole cache.
+"""
+
+def invalidate_table_cache(engine=None, 
+                           schema_name: str = None, 
+                           table_name: str = None):
+    with _TABLES_LOCK:
+        for key in list(_TABLES):
+            cached_engine, cached_schema, cached_table = key
+            if engine is not None and cached_engine is not engine:
+                continue
+            if schema_name is not None and cached_schema != schema_name:
+                continue
+            if table_name is not None and cached_table != table_name:
+                continue
+            del _TABLES[key]
+
+"""
+Streams the result of a SQL query in batches through a server-side cursor (stream_results / yield_per). 
+Yields lists of lightweight row tuples, or dicts of column lists when as_columns=True, keeping memory bounded. 
+Timeout and retries behave like get_data_from_db until the first batch arrives (statement_timeout applies per fetch 
+and a first batch that never comes is cancelled); a stalled stream afterwards raises.
+"""
+
+def iter_data_from_db(db_name: str,
+                      sql_query: str,
+                      username: str = None,
+                      password: str = None,
+                      server: str = None,
+                      port: int = None,
+                      db_type: str = 'postgresql',
+                      retries: int = 1,
+                      delay: int = 2,
+                      timeout: int = None,
+                      batch_size: int = 50000,
+                      as_columns: bool = False,
+                      params: dict = None,
+                      pool_options: dict = None):
     engine = DatabaseEngine(
         db=db_name,
         server=server,
@@ -80,49 +250,93 @@ def get_data_from_db(db_name: str,
         password=password,
         port=port,
         db_type=db_type,
+        **(pool_options or {}),
     ).get_engine()
+    end_of_stream = object()
     attempt = 0
     while attempt <= retries:
-        try:
-            result_data = []
-            query_exception = None
+        batches = queue.Queue(maxsize=2)
+        stop = threading.Event()
+        dbapi_connection = None
 
-            def execute_query():
-                nonlocal result_data, query_exception
+        def put(item):
+            while not stop.is_set():
                 try:
-                    with engine.connect() as connection:
-                        result = connection.execute(text(sql_query))
-                        columns = result.keys()
-                        result_data = [dict(zip(columns, row)) for row in result]
-                except Exception as e:
-                    query_exception = e
-
-            query_thread = threading.Thread(target=execute_query)
-            query_thread.start()
-            query_thread.join(timeout=timeout)
-
-            if query_thread.is_alive():
-                print(f"Query attempt {attempt+1} timed out after {timeout} seconds. Retrying...")
+                    batches.put(item, timeout=0.5)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def produce_batches():
+            nonlocal dbapi_connection
+            try:
+                with engine.connect() as connection:
+                    dbapi_connection = connection.connection.dbapi_connection
+                    if timeout and db_type == 'postgresql':
+                        # Applies to each FETCH of the server-side cursor, not to the whole stream
+                        connection.execute(text(f"SET LOCAL statement_timeout = {int(timeout * 1000)}"))
+                    result = connection.execution_options(stream_results=True, yield_per=batch_size).execute(text(sql_query), params or {})
+                    columns = list(result.keys())
+                    fetch_started = time.perf_counter()
+                    for partition in result.partitions(batch_size):
+                        # One server-side FETCH per batch; time spent waiting on the consumer is not counted
+                        metrics.record("db.stream", seconds=time.perf_counter() - fetch_started,
+                                       rows=len(partition), round_trips=1)
+                        if as_columns:
+                            batch = {column: list(values) for column, values in zip(columns, zip(*partition))}
+                        else:
+                            batch = partition
+                        if not put(batch):
+                            return
+                        fetch_started = time.perf_counter()
+            except Exception as e:
+                put(e)
+            finally:
+                put(end_of_stream)
+
+        producer = threading.Thread(target=produce_batches, daemon=True)
+        producer.start()
+        try:
+            started = time.perf_counter()
+            try:
+                item = batches.get(timeout=None if timeout is None else timeout + _CANCEL_GRACE_SECONDS)
+            except queue.Empty:
+                _cancel_query(dbapi_connection)
+                metrics.record("db.stream", retries=1)
+                wait = _retry_delay(delay, attempt)
+                print(f"Query attempt {attempt+1} timed out after {timeout} seconds and was cancelled. Retrying in {wait:.1f} seconds...")
                 attempt += 1
-                time.sleep(delay)
+                time.sleep(wait)
                 continue
+            print(f"⏱️ Query attempt {attempt+1} returned its first batch in {time.perf_counter() - started:.2f}s")
+            metrics.record("db.stream", calls=1, bytes_sent=len(sql_query))
 
-            if query_exception:
-                raise query_exception
-            return result_data
-
-        except (OperationalError, TimeoutError) as e:
-            if attempt < retries:
-                print(f"Database query failed (attempt {attempt+1}/{retries}). Retrying in {delay} seconds...")
-                time.sleep(delay)
+            if isinstance(item, (OperationalError, TimeoutError)) and attempt < retries:
+                metrics.record("db.stream", retries=1)
+                wait = _retry_delay(delay, attempt)
+                print(f"Database query failed (attempt {attempt+1}/{retries}): {item}. Retrying in {wait:.1f} seconds...")
                 attempt += 1
-            else:
-                print(f"Query failed after {retries} retries. Raising error.")
-                raise
+                time.sleep(wait)
+                continue
+
+            while item is not end_of_stream:
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+                try:
+                    item = batches.get(timeout=timeout)
+                except queue.Empty:
+                    raise TimeoutError(f"No batch received within {timeout} seconds while streaming query results.")
+            return
+        finally:
+            stop.set()
+    raise TimeoutError(f"Query failed after {retries} retries.")
 
 """
 Ensures that a table exists in the specified schema with the correct columns and primary key. 
 Creates the schema/table if allowed and validates the structure if it already exists. 
+With add_missing_columns=True, non-key columns missing from an existing table are added with ALTER TABLE. 
 Raises errors for mismatches unless auto-creation is enabled.
 """
 
@@ -130,12 +344,14 @@ def ensure_table_structure(db_name: str,
                            schema_name: str,
                            table_name: str,
                            fields_dict: dict,
-                            username: str = env.POSTGRES_USERNAME,
-                            password: str = env.POSTGRES_PASSWORD,
-                            server: str = env.POSTGRES_HOST,
-                            port: int = env.POSTGRES_PORT,
+                            username: str = None,
+                            password: str = None,
+                            server: str = None,
+                            port: int = None,
                             db_type: str = 'postgresql',
-                            create_table_if_not_exist: bool = False):
+                            create_table_if_not_exist: bool = False,
+                            add_missing_columns: bool = False,
+                            pool_options: dict = None):
 
     engine = DatabaseEngine(
             db=db_name,
@@ -144,22 +360,39 @@ def ensure_table_structure(db_name: str,
             password=password,
             port=port,
             db_type=db_type,
+            **(pool_options or {}),
         ).get_engine()
-    with engine.connect() as connection:
-        result = connection.execute(text("""
-                        SELECT schema_name FROM information_schema.schemata WHERE schema_name = :schema
-                    """), {"schema": schema_name})
+    with engine.begin() as connection:
+        return _ensure_table_structure(connection,
+                                       schema_name=schema_name,
+                                       table_name=table_name,
+                                       fields_dict=fields_dict,
+                                       create_table_if_not_exist=create_table_if_not_exist,
+                                       add_missing_columns=add_missing_columns)
+
+"""
+Body of ensure_table_structure on an open connection inside a transaction. 
+Kept separate so the async orchestrator can run the same checks through AsyncConnection.run_sync.
+"""
+
+def _ensure_table_structure(connection,
+                            schema_name: str,
+                            table_name: str,
+                            fields_dict: dict,
+                            create_table_if_not_exist: bool = False,
+                            add_missing_columns: bool = False) -> bool:
+    result = connection.execute(text("""
+                    SELECT schema_name FROM information_schema.schemata WHERE schema_name = :schema
+                """), {"schema": schema_name})
     if result.fetchone() is None:
         if not create_table_if_not_exist:
             raise RuntimeError(f"Schema '{schema_name}' does not exist.")
         else:
-            with engine.begin() as connection:
-                connection.execute(CreateSchema(schema_name))
+            connection.execute(CreateSchema(schema_name))
             print(f"-- Schema '{schema_name}' created.")
     
-    metadata =  MetaData(schema=schema_name)
     try:
-        existing_table = Table(table_name, metadata, autoload_with=engine)
+        existing_table = get_table(connection, schema_name, table_name)
         existing_columns = {col.name.lower(): type(col.type) for col in existing_table.columns}
         existing_primary_keys = {col.name.lower() for col in existing_table.primary_key.columns}
 
@@ -171,6 +404,19 @@ def ensure_table_structure(db_name: str,
             if isinstance(col_info, dict) and col_info.get("primary_key", False):
                 input_primary_keys.add(col_name.lower())
 
+        missing_columns = [name for name in fields_dict
+                           if name.lower() not in existing_columns and name.lower() not in input_primary_keys]
+        if add_missing_columns and missing_columns:
+            for name in missing_columns:
+                col_info = fields_dict[name]
+                col_type = col_info["type"] if isinstance(col_info, dict) else col_info
+                connection.execute(text(
+                    f"ALTER TABLE {schema_name}.{table_name} ADD COLUMN {name} {col_type.compile(dialect=connection.dialect)}"
+                ))
+                existing_columns[name.lower()] = type(col_type)
+            invalidate_table_cache(connection.engine, schema_name, table_name)
+            print(f"-- Added column(s) {missing_columns} to '{schema_name}.{table_name}'.")
+
         for col, col_type in input_columns.items():
             if col not in existing_columns:
                 raise RuntimeError(f"Missing column '{col}' in table '{schema_name}.{table_name}'.")
@@ -197,67 +443,259 @@ def ensure_table_structure(db_name: str,
                     kwargs["autoincrement"] = col_info["autoincrement"]
                 columns.append(Column(name, col_type, **kwargs))
 
-            new_table = Table(table_name, metadata, *columns)
-            new_table.create(bind=engine)
+            new_table = Table(table_name, MetaData(schema=schema_name), *columns)
+            new_table.create(bind=connection)
+            invalidate_table_cache(connection.engine, schema_name, table_name)
             print(f"-- Table '{schema_name}.{table_name}' created with fields: {list(fields_dict.keys())}")
             return True
 
 """
-Performs bulk UPSERT into a target table using a list of dictionaries as input. 
-Builds a dynamic SQL statement with conflict handling on primary keys, optionally updating specified fields. 
-Handles nested structures and nulls, and returns the number of rows processed.
+True for None and for values that are not equal to themselves (float NaN, NumPy NaN/NaT), 
+which are written as NULL. Replaces pandas.isna so the orchestrator does not need to import pandas.
 """
 
-def update_insert_dw(db_name: str,
-                     schema: str,
-                     table: str,
-                     new_data: list[dict],
-                     pk: list[str],
-                     update_fields: list[str],
-                     not_included_in_update_fields: list = [],
-                     username: str = env.POSTGRES_USERNAME,
-                     password: str = env.POSTGRES_PASSWORD,
-                     server: str = env.POSTGRES_HOST,
-                     port: int = env.POSTGRES_PORT,
-                     db_type: str = 'postgresql',) -> int:
-    
-    db_instance = DatabaseEngine(db=db_name, 
-                                 server=server, 
-                                 username=username, 
-                                 password=password,
-                                 port=port,
-                                 db_type=db_type)
-    source = db_instance.get_engine()
-    meta = MetaData(schema=schema)
-    meta.reflect(bind=source)
+def _is_missing(value) -> bool:
+    if value is None:
+        return True
+    try:
+        return bool(value != value)
+    except (TypeError, ValueError):
+        return False
 
-    if not new_data:
-        return 0
+"""
+Renders a single value as a PostgreSQL CSV field for COPY FROM STDIN.
+Strings are always quoted so that an unquoted empty field can mean NULL.
+Nested dicts are serialized as JSON and plain lists as array literals.
+"""
+
+def _copy_field(value) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (int, float)):
+        return "" if _is_missing(value) else str(value)
+    if isinstance(value, dict):
+        value = json.dumps(value)
+    elif isinstance(value, list):
+        if all(isinstance(item, dict) for item in value):
+            value = json.dumps(value)
+        else:
+            items = ["NULL" if item is None else '"' + str(item).replace("\\", "\\\\").replace('"', '\\"') + '"'
+                     for item in value]
+            value = "{" + ",".join(items) + "}"
+    elif isinstance(value, (datetime, date)):
+        value = value.isoformat()
+    elif _is_missing(value):
+        return ""
+    return '"' + str(value).replace('"', '""') + '"'
+
+"""
+File-like adapter that renders rows as CSV lines on demand.
+Lets psycopg2's copy_expert stream a batch into COPY FROM STDIN 
+without building the whole payload in memory first.
+"""
+
+class _CopyRowStream:
+    def __init__(self, rows: list[dict], columns: list[str], rows_per_fill: int = 5000):
+        self._rows = iter(rows)
+        self._columns = columns
+        self._rows_per_fill = rows_per_fill
+        self._pending = ""
+        # copy_expert reads in small pieces; a read position avoids re-copying the rest of the buffer on every read
+        self._position = 0
+        self._exhausted = False
+        self.bytes_read = 0
+
+    def _fill(self):
+        lines = []
+        for row in self._rows:
+            lines.append(",".join(_copy_field(row.get(column)) for column in self._columns))
+            if len(lines) >= self._rows_per_fill:
+                break
+        if not lines:
+            self._exhausted = True
+            return
+        self._pending = self._pending[self._position:] + "\n".join(lines) + "\n"
+        self._position = 0
 
+    def read(self, size: int = -1) -> str:
+        while not self._exhausted and (size < 0 or len(self._pending) - self._position < size):
+            self._fill()
+        end = len(self._pending) if size < 0 else min(self._position + size, len(self._pending))
+        data = self._pending[self._position:end]
+        self._position = end
+        self.bytes_read += len(data)
+        return data
+
+    readline = read
+
+"""
+Builds the ON CONFLICT clause shared by the VALUES and COPY upserts. 
+With a row_hash_column the update only fires when the stored fingerprint differs, 
+so unchanged rows are neither rewritten nor WAL-logged. The target table is aliased as `target`.
+"""
+
+def _on_conflict_clause(pk: list[str],
+                        update_fields: list[str],
+                        not_included_in_update_fields: list,
+                        row_hash_column: str = None) -> str:
+    pk_clause = ", ".join(pk)
+    only_update_fields = [item for item in update_fields if item not in not_included_in_update_fields]
+    if not only_update_fields:
+        return f"ON CONFLICT ({pk_clause}) DO NOTHING"
+    update_clause = ", ".join([f"{field} = EXCLUDED.{field}" for field in only_update_fields])
+    clause = f"ON CONFLICT ({pk_clause}) DO UPDATE SET {update_clause}"
+    if row_hash_column is not None:
+        clause += f" WHERE target.{row_hash_column} IS DISTINCT FROM EXCLUDED.{row_hash_column}"
+    return clause
+
+"""
+Turns the flags returned by `RETURNING (xmax = 0)` into inserted/updated/unchanged counts. 
+Rows skipped by the conflict clause return nothing, so they make up the difference to `total`.
+"""
+
+def _upsert_counts(inserted_flags: list, 
+                   total: int) -> dict:
+    inserted = sum(1 for flag in inserted_flags if flag)
+    updated = len(inserted_flags) - inserted
+    return {"inserted": inserted, "updated": updated, "unchanged": total - inserted - updated}
+
+"""
+Builds the statement that merges a staging table filled by COPY into the target table.
+"""
+
+def _stage_merge_statement(schema: str,
+                           table: str,
+                           stage: str,
+                           pk: list[str],
+                           update_fields: list[str],
+                           not_included_in_update_fields: list,
+                           row_hash_column: str = None,
+                           return_counts: bool = False) -> str:
+    column_clause = ", ".join(pk + update_fields)
+    conflict_clause = _on_conflict_clause(pk, update_fields, not_included_in_update_fields, row_hash_column)
+    merge_stmt = f"""
+        INSERT INTO {schema}.{table} AS target ({column_clause})
+        SELECT {column_clause} FROM {stage}
+        {conflict_clause}
+    """
+    if return_counts:
+        merge_stmt += " RETURNING (xmax = 0) AS inserted"
+    return merge_stmt
+
+"""
+Picks the COPY payload for a batch: binary COPY (utils/pg_binary.py) when every column has a binary encoding 
+for its target column type, otherwise CSV. Rows are converted to Arrow for the binary path; 
+columns Arrow cannot type consistently (mixed values, nested JSON) keep the row-wise CSV stream. 
+Returns the stream and its COPY format.
+"""
+
+def _copy_stream(source,
+                 schema: str,
+                 table: str,
+                 new_data,
+                 columns: list[str]):
+    from utils import columnar, pg_binary
+    data = pg_binary.rows_to_table(new_data, columns) if isinstance(new_data, list) else columnar.to_table(new_data, columns)
+    if data is not None:
+        target = get_table(source, schema, table)
+        kinds = pg_binary.copy_kinds(data.schema, [target.columns[column].type for column in columns])
+        if kinds is not None:
+            return pg_binary.BinaryCopyStream(data, kinds), "binary"
+    if isinstance(new_data, list):
+        return _CopyRowStream(new_data, columns), "csv"
+    return columnar.CsvBatchStream(data, columns), "csv"
+
+"""
+Bulk UPSERT through COPY: streams the rows into an unlogged (temporary) staging table 
+and merges them into the target with a single INSERT ... SELECT ... ON CONFLICT. 
+`new_data` is a list of dicts or a pyarrow Table. Both are sent in PostgreSQL's binary COPY format when the 
+column types allow it (native timestamps and integers are then never rendered or parsed as text), else as CSV.
+The staging table is dropped on commit. Only supported for PostgreSQL.
+"""
+
+def _copy_upsert(source,
+                 schema: str,
+                 table: str,
+                 new_data,
+                 pk: list[str],
+                 update_fields: list[str],
+                 not_included_in_update_fields: list,
+                 row_hash_column: str = None,
+                 return_counts: bool = False):
+    columns = pk + update_fields
+    rows, copy_format = _copy_stream(source, schema, table, new_data, columns)
+    column_clause = ", ".join(columns)
+    stage = f"_stage_{table}"
+    merge_stmt = _stage_merge_statement(schema, table, stage, pk, update_fields, 
+                                        not_included_in_update_fields, row_hash_column, return_counts)
+    result = len(new_data)
+    # Three statements per batch: create the staging table, COPY, merge
+    with metrics.timed("db.upsert_copy", rows=len(new_data), round_trips=3,
+                       binary_batches=int(copy_format == "binary")) as sample:
+        with source.begin() as connection:
+            cursor = connection.connection.dbapi_connection.cursor()
+            try:
+                cursor.execute(f"CREATE TEMP TABLE {stage} (LIKE {schema}.{table} INCLUDING DEFAULTS) ON COMMIT DROP")
+                cursor.copy_expert(f"COPY {stage} ({column_clause}) FROM STDIN WITH (FORMAT {copy_format})",
+                                   rows)
+                cursor.execute(merge_stmt)
+                if return_counts:
+                    result = _upsert_counts([row[0] for row in cursor.fetchall()], len(new_data))
+            finally:
+                cursor.close()
+                sample["bytes_sent"] = rows.bytes_read + len(merge_stmt)
+    return result
+
+"""
+Adds the row fingerprint to every row when row_hash_column is set (rows that already carry one keep it) 
+and makes sure the fingerprint column is written. Returns the rows and the effective update fields.
+"""
+
+def _prepare_upsert_rows(new_data: list[dict],
+                         update_fields: list[str],
+                         not_included_in_update_fields: list,
+                         row_hash_column: str = None) -> tuple[list[dict], list[str]]:
+    if row_hash_column is None:
+        return new_data, update_fields
+    hashed_fields = [field for field in update_fields 
+                     if field != row_hash_column and field not in not_included_in_update_fields]
+    new_data = [row if row.get(row_hash_column) is not None 
+                else {**row, row_hash_column: compute_row_hash(row, hashed_fields)} 
+                for row in new_data]
+    if row_hash_column not in update_fields:
+        update_fields = update_fields + [row_hash_column]
+    return new_data, update_fields
+
+"""
+Builds the multi-row INSERT ... VALUES ... ON CONFLICT statement and its bind parameters for the 'values' method. 
+Nested dicts (and lists of dicts) are sent as JSON text and NaN/None as NULL.
+"""
+
+def _values_upsert_statement(schema: str,
+                             table: str,
+                             new_data: list[dict],
+                             pk: list[str],
+                             update_fields: list[str],
+                             not_included_in_update_fields: list,
+                             row_hash_column: str = None,
+                             return_counts: bool = False) -> tuple[str, dict]:
     Upserts = len(new_data)
     columns = new_data[0].keys()
     insert_values = ", ".join([
         f"({', '.join([f':{column}_{i}' for column in columns])})"
         for i in range(1, Upserts + 1)
     ])
-    pk_clause = ", ".join(pk)
     insert_clause = ", ".join(pk + update_fields)
-    if not update_fields:
-        stmt = f"""
-            INSERT INTO {schema}.{table} ({insert_clause})
-            VALUES {insert_values}
-            ON CONFLICT ({pk_clause})
-            DO NOTHING
-        """
-    else:
-        only_update_fields = [item for item in update_fields if item not in not_included_in_update_fields] 
-        update_clause = ", ".join([f"{field} = EXCLUDED.{field}" for field in only_update_fields])
-        stmt = f"""
-            INSERT INTO {schema}.{table} ({insert_clause})
-            VALUES {insert_values}
-            ON CONFLICT ({pk_clause})
-            DO UPDATE SET {update_clause}
-        """
+    conflict_clause = _on_conflict_clause(pk, update_fields, not_included_in_update_fields, row_hash_column)
+    stmt = f"""
+        INSERT INTO {schema}.{table} AS target ({insert_clause})
+        VALUES {insert_values}
+        {conflict_clause}
+    """
+    if return_counts:
+        stmt += " RETURNING (xmax = 0) AS inserted"
     params_insert = {}
     for i, row in enumerate(new_data, start=1):
         for column, value in row.items():
@@ -268,12 +706,273 @@ def update_insert_dw(db_name: str,
                     params_insert[f"{column}_{i}"] = json.dumps(value)
                 else:
                     params_insert[f"{column}_{i}"] = value
-            elif pd.isna(value):
+            elif _is_missing(value):
                 params_insert[f"{column}_{i}"] = None
             else:
                 params_insert[f"{column}_{i}"] = value
-    with source.begin() as connection:
-        connection.execute(text(stmt), params_insert)
+    return stmt, params_insert
+
+"""
+Performs bulk UPSERT into a target table using a list of dictionaries as input. 
+Builds a dynamic SQL statement with conflict handling on primary keys, optionally updating specified fields. 
+Handles nested structures and nulls, and returns the number of rows processed.
+new_data may also be columnar (a pyarrow Table or RecordBatch, or a dict of equally long columns, see utils/columnar.py): 
+with method='copy' it is streamed into COPY as is, otherwise (or with row_hash_column) it is converted to rows first.
+With method='copy' the rows are streamed through COPY into a staging table and merged in one statement.
+With row_hash_column, rows are fingerprinted with compute_row_hash over the updatable columns (rows that already 
+carry a hash keep it) and conflicting rows with an identical stored hash are left untouched. 
+return_counts=True (postgresql only) returns {"inserted", "updated", "unchanged"} instead of the row count. 
+pool_options (pool_size, max_overflow, pool_timeout, pool_recycle, pool_pre_ping, statement_timeout) override 
+the DatabaseEngine pool defaults for this call site, as in the other database helpers.
+"""
+
+def update_insert_dw(db_name: str,
+                     schema: str,
+                     table: str,
+                     new_data: "list[dict] | columnar.ColumnarData",
+                     pk: list[str],
+                     update_fields: list[str],
+                     not_included_in_update_fields: list = [],
+                     username: str = None,
+                     password: str = None,
+                     server: str = None,
+                     port: int = None,
+                     db_type: str = 'postgresql',
+                     method: str = 'values',
+                     row_hash_column: str = None,
+                     return_counts: bool = False,
+                     pool_options: dict = None) -> int | dict:
+    
+    db_instance = DatabaseEngine(db=db_name, 
+                                 server=server, 
+                                 username=username, 
+                                 password=password,
+                                 port=port,
+                                 db_type=db_type,
+                                 **(pool_options or {}))
+    source = db_instance.get_engine()
+
+    if return_counts and db_type != 'postgresql':
+        raise ValueError(f"return_counts is only supported for postgresql, got '{db_type}'")
+    if not isinstance(new_data, list):
+        from utils import columnar
+        new_data = columnar.to_table(new_data)
+        if method != 'copy' or row_hash_column is not None:
+            new_data = new_data.to_pylist()
+    if not new_data:
+        return _upsert_counts([], 0) if return_counts else 0
+
+    if isinstance(new_data, list):
+        new_data, update_fields = _prepare_upsert_rows(new_data, update_fields, not_included_in_update_fields, row_hash_column)
+    target = get_table(source, schema, table)
+    missing = [column for column in pk + update_fields if column not in target.columns]
+    if missing:
+        raise RuntimeError(f"Missing column(s) {missing} in table '{schema}.{table}'.")
+
+    if method == 'copy':
+        if db_type != 'postgresql':
+            raise ValueError(f"method='copy' is only supported for postgresql, got '{db_type}'")
+        return _copy_upsert(source=source,
+                            schema=schema,
+                            table=table,
+                            new_data=new_data,
+                            pk=pk,
+                            update_fields=update_fields,
+                            not_included_in_update_fields=not_included_in_update_fields,
+                            row_hash_column=row_hash_column,
+                            return_counts=return_counts)
+    if method != 'values':
+        raise ValueError(f"Unsupported method: {method}")
+
+    Upserts = len(new_data)
+    stmt, params_insert = _values_upsert_statement(schema, table, new_data, pk, update_fields, 
+                                                   not_included_in_update_fields, row_hash_column, return_counts)
+    # bytes_sent approximates the payload as the SQL text plus the rendered bind values
+    with metrics.timed("db.upsert_values", rows=Upserts, round_trips=1,
+                       bytes_sent=len(stmt) + sum(len(str(value)) for value in params_insert.values())):
+        with source.begin() as connection:
+            result = connection.execute(text(stmt), params_insert)
+            if return_counts:
+                return _upsert_counts([row[0] for row in result], Upserts)
         
     return Upserts
 
+"""
+Regroups an iterable of row lists (e.g. one list per simulated flight block) into lists of exactly `size` rows. 
+The last batch may be shorter. Only one batch is held at a time.
+"""
+
+def rebatch(blocks: Iterable[list], 
+            size: int) -> Iterator[list]:
+    batch = []
+    for block in blocks:
+        for row in block:
+            batch.append(row)
+            if len(batch) >= size:
+                yield batch
+                batch = []
+    if batch:
+        yield batch
+
+"""
+Yields a dict of equally long column arrays (e.g. NumPy output of the simulations) as lists of row dicts, 
+`batch_size` rows at a time, so the full row-wise copy never exists in memory. 
+The first `skip_batches` batches are yielded as empty lists, keeping batch indexes aligned when resuming.
+"""
+
+def iter_column_records(columns: dict, 
+                        batch_size: int,
+                        skip_batches: int = 0) -> Iterator[list[dict]]:
+    keys = list(columns)
+    total = len(columns[keys[0]]) if keys else 0
+    for index, start in enumerate(range(0, total, batch_size)):
+        if index < skip_batches:
+            yield []
+            continue
+        values = [columns[key][start:start + batch_size] for key in keys]
+        values = [value.tolist() if hasattr(value, "tolist") else value for value in values]
+        yield [dict(zip(keys, row)) for row in zip(*values)]
+
+"""
+Runs update_insert_dw for every batch (a list of dicts or columnar Arrow data) from a generator while the generator keeps producing. 
+Batches pass through a bounded queue to a writer thread, so DB writes overlap with production 
+and at most `queue_size` batches wait in memory. Returns the total number of rows processed, 
+or the summed inserted/updated/unchanged counts when return_counts=True is passed through. 
+To resume an interrupted load, the first `skip_batches` batches are consumed but not written, and 
+`on_batch_committed(index)` is called in order after each batch has been committed.
+"""
+
+def update_insert_dw_batches(db_name: str,
+                             schema: str,
+                             table: str,
+                             batches: "Iterable[list[dict] | columnar.ColumnarData]",
+                             pk: list[str],
+                             update_fields: list[str],
+                             not_included_in_update_fields: list = [],
+                             queue_size: int = 2,
+                             skip_batches: int = 0,
+                             on_batch_committed=None,
+                             **kwargs) -> int:
+    pending = queue.Queue(maxsize=queue_size)
+    end_of_stream = object()
+    total = 0
+    counts = _upsert_counts([], 0)
+    writer_exception = None
+
+    def write_batches():
+        nonlocal total, writer_exception
+        while True:
+            item = pending.get()
+            if item is end_of_stream:
+                return
+            if writer_exception is not None:
+                continue
+            index, batch = item
+            try:
+                result = update_insert_dw(db_name=db_name,
+                                          schema=schema,
+                                          table=table,
+                                          new_data=batch,
+                                          pk=pk,
+                                          update_fields=update_fields,
+                                          not_included_in_update_fields=not_included_in_update_fields,
+                                          **kwargs)
+                if isinstance(result, dict):
+                    for key, value in result.items():
+                        counts[key] = counts.get(key, 0) + value
+                    total += len(batch)
+                else:
+                    total += result
+                if on_batch_committed is not None:
+                    on_batch_committed(index)
+            except Exception as e:
+                writer_exception = e
+
+    writer = threading.Thread(target=write_batches, daemon=True)
+    writer.start()
+    try:
+        for index, batch in enumerate(tqdm(batches)):
+            if writer_exception is not None:
+                break
+            if index < skip_batches:
+                continue
+            pending.put((index, batch))
+    finally:
+        pending.put(end_of_stream)
+        writer.join()
+    if writer_exception is not None:
+        raise writer_exception
+    return counts if kwargs.get("return_counts") else total
+
+"""
+Hashes the given columns of a row so unchanged rows can be skipped before an upsert. 
+The order of `columns` is part of the hash; values that are not JSON-native (dates, decimals) are rendered with str().
+"""
+
+def compute_row_hash(row: dict, 
+                     columns: list[str]) -> str:
+    payload = json.dumps([row.get(column) for column in columns], default=str, separators=(",", ":"))
+    return hashlib.md5(payload.encode("utf-8")).hexdigest()
+
+WATERMARK_TABLE = "ingestion_watermarks"
+WATERMARK_FIELDS = {
+    "source": {"type": TEXT(), "primary_key": True, "autoincrement": False},
+    "code": {"type": TEXT(), "primary_key": True, "autoincrement": False},
+    "direction": {"type": TEXT(), "primary_key": True, "autoincrement": False},
+    "watermark": {"type": TIMESTAMP()},
+    "updatetime": {"type": TIMESTAMP()},
+}
+
+"""
+Reads the high-water mark for an incremental source (e.g. AeroDataBox departures from CPH) 
+from the control table schema.ingestion_watermarks. Watermarks are naive UTC, like the *_utc columns.
+Returns None when nothing has been loaded yet.
+"""
+
+def get_watermark(db_name: str,
+                  schema_name: str,
+                  source: str,
+                  code: str,
+                  direction: str,
+                  create_table_if_not_exist: bool = False,
+                  **kwargs) -> datetime | None:
+    ensure_table_structure(db_name=db_name,
+                           schema_name=schema_name,
+                           table_name=WATERMARK_TABLE,
+                           fields_dict=WATERMARK_FIELDS,
+                           create_table_if_not_exist=create_table_if_not_exist,
+                           **kwargs)
+    rows = get_data_from_db(db_name=db_name,
+                            sql_query=f"""
+                                SELECT watermark FROM {schema_name}.{WATERMARK_TABLE}
+                                WHERE source = :source AND code = :code AND direction = :direction
+                            """,
+                            params={"source": source, "code": code, "direction": direction},
+                            **kwargs)
+    return rows[0]["watermark"] if rows else None
+
+"""
+Stores the high-water mark (naive UTC) for an incremental source once everything before it has been loaded.
+updatetime is naive UTC too, like the load timestamps written by select_columns.
+"""
+
+def set_watermark(db_name: str,
+                  schema_name: str,
+                  source: str,
+                  code: str,
+                  direction: str,
+                  watermark: datetime,
+                  **kwargs):
+    update_insert_dw(db_name=db_name,
+                     schema=schema_name,
+                     table=WATERMARK_TABLE,
+                     new_data=[{
+                         "source": source,
+                         "code": code,
+                         "direction": direction,
+                         "watermark": watermark,
+                         "updatetime": datetime.now(timezone.utc).replace(tzinfo=None),
+                     }],
+                     pk=["source", "code", "direction"],
+                     update_fields=["watermark", "updatetime"],
+                     **kwargs)
@@ -0,0 +1,200 @@
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from sqlalchemy.sql import sqltypes
+
+"""
+Encoder for PostgreSQL's binary COPY format (COPY ... FROM STDIN WITH (FORMAT binary)) from Arrow data.
+Values are sent in the server's internal representation (integers and floats in network byte order,
+timestamps as microseconds since 2000-01-01), so neither side formats or parses text. Whole columns are encoded
+with NumPy; only the column types listed in copy_kinds are supported, anything else falls back to CSV.
+"""
+
+SIGNATURE = b"PGCOPY\n\xff\r\n\x00"
+# Signature, flags (no OIDs) and an empty header extension
+HEADER = SIGNATURE + (0).to_bytes(4, "big") + (0).to_bytes(4, "big")
+TRAILER = (-1).to_bytes(2, "big", signed=True)
+# PostgreSQL counts timestamps and dates from 2000-01-01
+POSTGRES_EPOCH_US = 946_684_800_000_000
+POSTGRES_EPOCH_DAYS = 10_957
+
+# Binary kind -> (Arrow type values are cast to, NumPy big-endian dtype of the wire value)
+FIXED_WIDTH = {
+    "int2": (pa.int16(), ">i2"),
+    "int4": (pa.int32(), ">i4"),
+    "int8": (pa.int64(), ">i8"),
+    "float4": (pa.float32(), ">f4"),
+    "float8": (pa.float64(), ">f8"),
+    "bool": (pa.uint8(), "u1"),
+    "timestamp": (pa.int64(), ">i8"),
+    "date": (pa.int32(), ">i4"),
+}
+# Widest integer type every value of which a float kind represents exactly (24- and 53-bit mantissas)
+LOSSLESS_INT_BITS = {"float4": 16, "float8": 32}
+
+"""
+The binary kind of a reflected SQLAlchemy column type, or None when it has no encoder here (NUMERIC, JSON, arrays, ...).
+"""
+
+def _column_kind(column_type) -> str | None:
+    if isinstance(column_type, sqltypes.String):
+        return "text"
+    if isinstance(column_type, sqltypes.BigInteger):
+        return "int8"
+    if isinstance(column_type, sqltypes.SmallInteger):
+        return "int2"
+    if isinstance(column_type, sqltypes.Integer):
+        return "int4"
+    if isinstance(column_type, sqltypes.Float):
+        return "float4" if isinstance(column_type, sqltypes.REAL) else "float8"
+    if isinstance(column_type, sqltypes.Boolean):
+        return "bool"
+    if isinstance(column_type, sqltypes.DateTime):
+        return "timestamptz" if column_type.timezone else "timestamp"
+    if isinstance(column_type, sqltypes.Date):
+        return "date"
+    return None
+
+"""
+True when Arrow values of `arrow_type` can be sent as `kind` without changing their meaning: strings as text,
+integers as integers, floats and integers narrow enough to convert exactly as floats, naive timestamps into TIMESTAMP
+and zoned ones into TIMESTAMPTZ. All-null columns fit any kind.
+"""
+
+def _compatible(arrow_type: pa.DataType, kind: str) -> bool:
+    if pa.types.is_null(arrow_type):
+        return True
+    if kind == "text":
+        return pa.types.is_string(arrow_type) or pa.types.is_large_string(arrow_type)
+    if kind in ("int2", "int4", "int8"):
+        return pa.types.is_integer(arrow_type)
+    if kind in ("float4", "float8"):
+        # Integers only when every value fits the float's mantissa exactly, since the cast is a safe one
+        return pa.types.is_floating(arrow_type) or (pa.types.is_integer(arrow_type)
+                                                    and arrow_type.bit_width <= LOSSLESS_INT_BITS[kind])
+    if kind == "bool":
+        return pa.types.is_boolean(arrow_type)
+    if kind == "timestamp":
+        return pa.types.is_timestamp(arrow_type) and arrow_type.tz is None
+    if kind == "timestamptz":
+        return pa.types.is_timestamp(arrow_type) and arrow_type.tz is not None
+    if kind == "date":
+        return pa.types.is_date32(arrow_type)
+    return False
+
+"""
+Binary kinds for the columns of an Arrow schema given the target column types (in the same order),
+or None when any column cannot be sent in binary, in which case the caller uses CSV.
+"""
+
+def copy_kinds(schema: pa.Schema,
+               column_types: list) -> list[str] | None:
+    kinds = []
+    for field, column_type in zip(schema, column_types):
+        kind = _column_kind(column_type)
+        if kind is None or not _compatible(field.type, kind):
+            return None
+        kinds.append("timestamp" if kind == "timestamptz" else kind)
+    return kinds
+
+"""
+Converts a list of row dicts to an Arrow table with `columns`, inferring one type per column (NaN becomes null,
+as in the CSV path). Returns None when a column mixes types Arrow cannot reconcile.
+"""
+
+def rows_to_table(rows: list[dict],
+                  columns: list[str]) -> pa.Table | None:
+    try:
+        return pa.table({column: pa.array([row.get(column) for row in rows], from_pandas=True) for column in columns})
+    except (pa.ArrowInvalid, pa.ArrowTypeError, OverflowError):
+        return None
+
+"""
+Fixed-size binary Arrow array of n items from a contiguous byte buffer, cast to variable-size binary for joining.
+"""
+
+def _binary_array(raw: bytes, n: int, width: int) -> pa.Array:
+    return pa.FixedSizeBinaryArray.from_buffers(pa.binary(width), n, [None, pa.py_buffer(raw)]).cast(pa.binary())
+
+"""
+Wire fields of one column as two binary arrays: the 4-byte length of every field (-1 for NULL) and its value bytes
+(empty for NULL).
+"""
+
+def _encode_column(array: pa.Array, kind: str) -> tuple[pa.Array, pa.Array]:
+    n = len(array)
+    valid = np.ones(n, dtype=bool) if array.null_count == 0 else ~np.asarray(array.is_null())
+    if pa.types.is_null(array.type):
+        return _binary_array(np.full(n, -1, dtype=">i4").tobytes(), n, 4), pa.array([b""] * n, pa.binary())
+    if kind == "text":
+        values = pc.fill_null(array.cast(pa.string()), "").cast(pa.binary())
+        lengths = np.asarray(pc.binary_length(values), dtype=np.int64)
+        return _binary_array(np.where(valid, lengths, -1).astype(">i4").tobytes(), n, 4), values
+    arrow_type, dtype = FIXED_WIDTH[kind]
+    if kind == "timestamp":
+        values = pc.subtract(array.cast(pa.timestamp("us", tz=array.type.tz)).cast(pa.int64()), POSTGRES_EPOCH_US)
+    elif kind == "date":
+        values = pc.subtract(array.cast(pa.int32()), POSTGRES_EPOCH_DAYS)
+    else:
+        values = array.cast(arrow_type)
+    width = np.dtype(dtype).itemsize
+    values = _binary_array(np.asarray(pc.fill_null(values, 0)).astype(dtype).tobytes(), n, width)
+    lengths = np.where(valid, width, -1).astype(">i4")
+    if not valid.all():
+        values = pc.if_else(pa.array(valid), values, pa.scalar(b"", pa.binary()))
+    return _binary_array(lengths.tobytes(), n, 4), values
+
+"""
+Encodes a RecordBatch as binary COPY tuples (without the file header and trailer). Every row is a field count
+followed by a length-prefixed field per column; the parts of each row are concatenated by Arrow's
+binary_join_element_wise, so no Python code runs per value.
+"""
+
+def encode_batch(batch: pa.RecordBatch,
+                 kinds: list[str]) -> bytes:
+    n = batch.num_rows
+    if not n:
+        return b""
+    parts = [_binary_array(np.full(n, len(kinds), dtype=">i2").tobytes(), n, 2)]
+    for index, kind in enumerate(kinds):
+        parts.extend(_encode_column(batch.column(index), kind))
+    tuples = pc.binary_join_element_wise(*parts, pa.scalar(b"", pa.binary()))
+    offsets = np.frombuffer(tuples.buffers()[1], dtype=np.int32)[tuples.offset:tuples.offset + n + 1]
+    return tuples.buffers()[2].slice(offsets[0], offsets[-1] - offsets[0]).to_pybytes()
+
+"""
+File-like adapter that streams Arrow data as binary COPY for psycopg2's copy_expert, one slice of rows at a time,
+with the header before the first tuple and the trailer after the last. Counterpart of columnar.CsvBatchStream.
+"""
+
+class BinaryCopyStream:
+    def __init__(self, table: pa.Table, kinds: list[str], rows_per_fill: int = 50000):
+        self._batches = iter(table.to_batches(max_chunksize=rows_per_fill))
+        self._kinds = kinds
+        self._pending = HEADER
+        # copy_expert reads in small pieces; a read position avoids re-copying the rest of the buffer on every read
+        self._position = 0
+        self._exhausted = False
+        self.bytes_read = 0
+
+    def _fill(self):
+        batch = next(self._batches, None)
+        rest = self._pending[self._position:]
+        self._position = 0
+        if batch is None:
+            self._pending = rest + TRAILER
+            self._exhausted = True
+            return
+        self._pending = rest + encode_batch(batch, self._kinds)
+
+    def read(self, size: int = -1) -> bytes:
+        while not self._exhausted and (size < 0 or len(self._pending) - self._position < size):
+            self._fill()
+        end = len(self._pending) if size < 0 else min(self._position + size, len(self._pending))
+        data = self._pending[self._position:end]
+        self._position = end
+        self.bytes_read += len(data)
+        return data
+
+    readline = read
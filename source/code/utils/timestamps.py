@@ -0,0 +1,105 @@
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from datetime import datetime, timezone
+from zoneinfo import ZoneInfo
+
+"""
+Vectorized timestamp handling. Timestamps travel through the pipeline as native values (NumPy datetime64,
+Arrow timestamp arrays, datetime objects) instead of ISO strings, so nothing is formatted only to be parsed again.
+Warehouse columns are TIMESTAMP without time zone; the convention is explicit in the column name:
+*_utc columns hold UTC and *_local columns hold the airport's wall-clock time.
+"""
+
+AIRPORT_TIMEZONE = ZoneInfo("Europe/Copenhagen")
+
+# Date, a "T" or space separator, hours and minutes with optional seconds, and an optional "Z" or ±HH:MM offset
+_OFFSET_TIMESTAMP = (r"^(?P<date>\d{4}-\d{2}-\d{2})[T ](?P<time>\d{2}:\d{2})(?::(?P<seconds>\d{2}))?"
+                     r"(?P<offset>Z|[+-]\d{2}:\d{2})?$")
+
+"""
+Parses AeroDataBox times such as "2025-07-01 06:05+02:00", "2025-07-01 04:05Z" or "2025-07-01T06:05:30+02:00"
+in one pass over the whole column. Returns the wall-clock time as written and its UTC offset,
+as an Arrow timestamp[s] array and an int32 array of offset seconds.
+Parsing is per value: missing or malformed values are null in both arrays, and a value without an offset
+keeps its wall-clock time but has a null offset, so one odd value never fails the whole column.
+"""
+
+def parse_offset_timestamps(values: list) -> tuple[pa.Array, pa.Array]:
+    parts = pc.extract_regex(pa.array(values, type=pa.string()), _OFFSET_TIMESTAMP)
+    matched = parts.is_valid()
+
+    def part(name: str) -> pa.Array:
+        # Rows that did not match are null, not the empty strings extract_regex leaves in the children
+        return pc.if_else(matched, pc.struct_field(parts, name), pa.scalar(None, pa.string()))
+
+    seconds = part("seconds")
+    seconds = pc.if_else(pc.equal(seconds, ""), "00", seconds)
+    wall = pc.strptime(pc.binary_join_element_wise(part("date"), part("time"), seconds, ":"),
+                       format="%Y-%m-%d:%H:%M:%S", unit="s", error_is_null=True)
+    suffix = part("offset")
+    suffix = pc.if_else(pc.equal(suffix, "Z"), "+00:00", suffix)
+    suffix = pc.if_else(pc.equal(suffix, ""), pa.scalar(None, pa.string()), suffix)
+    hours = pc.cast(pc.utf8_slice_codeunits(suffix, 1, 3), pa.int32())
+    minutes = pc.cast(pc.utf8_slice_codeunits(suffix, 4, 6), pa.int32())
+    sign = pc.if_else(pc.equal(pc.utf8_slice_codeunits(suffix, 0, 1), "-"), -1, 1)
+    offsets = pc.multiply(sign, pc.add(pc.multiply(hours, 3600), pc.multiply(minutes, 60)))
+    return wall, pc.if_else(wall.is_valid(), offsets.cast(pa.int32()), pa.scalar(None, pa.int32()))
+
+"""
+Converts wall-clock times and their UTC offsets (as returned by parse_offset_timestamps) to UTC.
+"""
+
+def to_utc(wall: pa.Array,
+           offsets: pa.Array) -> pa.Array:
+    seconds = pc.subtract(pc.cast(wall, pa.int64()), pc.cast(offsets, pa.int64()))
+    return pc.cast(seconds, pa.timestamp("s"))
+
+"""
+Converts a naive wall-clock time in `tz` to naive UTC. An ambiguous time at the end of summer time
+resolves to the earlier (summer time) instant.
+"""
+
+def local_to_utc(value: datetime,
+                 tz: ZoneInfo = AIRPORT_TIMEZONE) -> datetime:
+    return value.replace(tzinfo=tz).astimezone(timezone.utc).replace(tzinfo=None)
+
+"""
+Converts a naive UTC time to naive wall-clock time in `tz`.
+"""
+
+def utc_to_local(value: datetime,
+                 tz: ZoneInfo = AIRPORT_TIMEZONE) -> datetime:
+    return value.replace(tzinfo=timezone.utc).astimezone(tz).replace(tzinfo=None)
+
+"""
+Converts an Arrow timestamp array (or datetime64 array) to naive datetime objects, None for null/NaT,
+through NumPy rather than Arrow's per-value to_pylist.
+"""
+
+def to_datetimes(values: pa.Array | np.ndarray) -> list:
+    if isinstance(values, (pa.Array, pa.ChunkedArray)):
+        values = values.to_numpy(zero_copy_only=False)
+    return values.astype("datetime64[us]").astype(object).tolist()
+
+"""
+UTC offsets of a time zone for an array of datetime64[s], as timedelta64[s]. `local` says whether the times are
+wall-clock times in that zone or UTC. Offsets are looked up once per distinct hour rather than per row;
+NaT entries get a zero offset, so they stay NaT when the offset is applied.
+"""
+
+def utc_offsets(times: np.ndarray,
+                local: bool,
+                tz: ZoneInfo = AIRPORT_TIMEZONE) -> np.ndarray:
+    missing = np.isnat(times)
+    hours, inverse = np.unique(np.where(missing, np.datetime64(0, "s"), times).astype("datetime64[h]"),
+                               return_inverse=True)
+    seconds = np.empty(len(hours), dtype=np.int64)
+    for index, hour in enumerate(hours.astype(datetime)):
+        if local:
+            offset = hour.replace(tzinfo=tz).utcoffset()
+        else:
+            offset = hour.replace(tzinfo=timezone.utc).astimezone(tz).utcoffset()
+        seconds[index] = offset.total_seconds()
+    return np.where(missing, 0, seconds[inverse]).astype("timedelta64[s]")